@@ -1,34 +1,69 @@
-from agent.adventofcode.aoc_problem import AoCProblem
-from agent.adventofcode.contextualize_examples import (
-    ExamplesContext,
-    contextualize_examples,
-)
-from agent.adventofcode.execute_generated_code import (
-    TestResults,
-    execute_generated_solution,
-    execute_tests,
-)
-from agent.adventofcode.extract_examples import (
-    AoCProblemExtractedExamples,
-    extract_examples_from_problem_html,
-)
-from agent.adventofcode.generate_code.generate_implementation import (
-    generate_implementation,
-)
-from agent.adventofcode.generate_code.GeneratedImplementation import (
-    GeneratedImplementation,
-)
-from agent.adventofcode.problem_part import ProblemPart
-from agent.adventofcode.scrape_problems import scrape_aoc
-from agent.adventofcode.write_and_commit_changes import (
-    FileToCommit,
-    write_and_commit_changes,
-)
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from agent.adventofcode.aoc_problem import AoCProblem
+    from agent.adventofcode.contextualize_examples import (
+        ExamplesContext,
+        contextualize_examples,
+    )
+    from agent.adventofcode.execution_workspace import ExecutionWorkspace, ephemeral_workspace
+    from agent.adventofcode.execute_generated_code import (
+        TestResults,
+        execute_generated_solution,
+        execute_tests,
+    )
+    from agent.adventofcode.extract_examples import (
+        AoCProblemExtractedExamples,
+        extract_examples_from_problem_html,
+    )
+    from agent.adventofcode.generate_code.generate_implementation import (
+        generate_implementation,
+    )
+    from agent.adventofcode.generate_code.GeneratedImplementation import (
+        GeneratedImplementation,
+    )
+    from agent.adventofcode.problem_part import ProblemPart
+    from agent.adventofcode.scrape_problems import scrape_aoc
+    from agent.adventofcode.write_and_commit_changes import (
+        FileToCommit,
+        write_and_commit_changes,
+    )
+
+# Re-exported lazily, since the processes that run generated code import submodules of this package
+# too, and eagerly importing everything here would drag `agent.settings` (and with it the secrets
+# lookups and LLM clients) into every one of them.
+_MODULE_BY_EXPORT = {
+    "AoCProblem": "agent.adventofcode.aoc_problem",
+    "AoCProblemExtractedExamples": "agent.adventofcode.extract_examples",
+    "ExamplesContext": "agent.adventofcode.contextualize_examples",
+    "ExecutionWorkspace": "agent.adventofcode.execution_workspace",
+    "FileToCommit": "agent.adventofcode.write_and_commit_changes",
+    "GeneratedImplementation": "agent.adventofcode.generate_code.GeneratedImplementation",
+    "ProblemPart": "agent.adventofcode.problem_part",
+    "TestResults": "agent.adventofcode.execute_generated_code",
+    "execute_generated_solution": "agent.adventofcode.execute_generated_code",
+    "execute_tests": "agent.adventofcode.execute_generated_code",
+    "contextualize_examples": "agent.adventofcode.contextualize_examples",
+    "ephemeral_workspace": "agent.adventofcode.execution_workspace",
+    "extract_examples_from_problem_html": "agent.adventofcode.extract_examples",
+    "generate_implementation": "agent.adventofcode.generate_code.generate_implementation",
+    "scrape_aoc": "agent.adventofcode.scrape_problems",
+    "write_and_commit_changes": "agent.adventofcode.write_and_commit_changes",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _MODULE_BY_EXPORT:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_MODULE_BY_EXPORT[name]), name)
+
 
 __all__ = [
     "AoCProblem",
     "AoCProblemExtractedExamples",
     "ExamplesContext",
+    "ExecutionWorkspace",
     "FileToCommit",
     "GeneratedImplementation",
     "ProblemPart",
@@ -36,6 +71,7 @@ __all__ = [
     "execute_generated_solution",
     "execute_tests",
     "contextualize_examples",
+    "ephemeral_workspace",
     "extract_examples_from_problem_html",
     "generate_implementation",
     "scrape_aoc",
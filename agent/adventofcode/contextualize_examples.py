@@ -14,6 +14,12 @@ from agent.adventofcode.scrape_problems import ProblemPart, scrape_aoc
 from agent.llm.gemini.configure_genai import configure_genai
 from agent.llm.gemini.models import GeminiModel
 from agent.llm.gemini.prompt import prompt
+from agent.llm.usage.LLMRouter import route_model
+from agent.llm.usage.TokenEstimator import estimate_prompt_tokens, pick_by_prompt_size
+
+# Problems this big (e.g. with enormous examples inlined into the HTML) would take the most capable
+# model far too long to get through, so only the faster model is an option for them.
+_MAX_CONTEXTUALIZING_PRO_MODEL_PROMPT_TOKENS = 32_000
 
 
 class ExamplesContext(BaseModel):
@@ -55,18 +61,33 @@ Ignore all HTML tags and focus solely on the input/output data. Do not attempt t
  """ if solve_part_2 else ""}
 You MUST respond with the specified JSON format.
 """  # noqa: E501
-    return (
-        await prompt(
-            model=GeminiModel.GEMINI_1_5_PRO,
-            subtask_name="contextualize-examples",
-            system_prompt=system_prompt_text,
-            prompt=f"""
+    contextualize_examples_prompt = f"""
 ### Problem HTML:
 {problem_html}
 
 ### Input/Output Examples:
 {examples.model_dump_json(indent=2)}
-""",
+"""
+    candidate_models = pick_by_prompt_size(
+        estimate_prompt_tokens(
+            system_prompt=system_prompt_text, prompt=contextualize_examples_prompt
+        ),
+        tiers=[
+            (
+                _MAX_CONTEXTUALIZING_PRO_MODEL_PROMPT_TOKENS,
+                [GeminiModel.GEMINI_1_5_PRO, GeminiModel.GEMINI_1_5_FLASH],
+            )
+        ],
+        default=[GeminiModel.GEMINI_1_5_FLASH],
+    )
+    return (
+        await prompt(
+            model=await route_model(
+                "contextualize-examples", candidates=candidate_models, default=candidate_models[0]
+            ),
+            subtask_name="contextualize-examples",
+            system_prompt=system_prompt_text,
+            prompt=contextualize_examples_prompt,
             response_type=ExamplesContext,
         )
     ).unwrap()
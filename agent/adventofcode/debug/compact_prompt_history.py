@@ -0,0 +1,83 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from agent import settings
+from agent.adventofcode.debug.DebuggingPrompt import DebuggingPrompt
+from agent.llm.gemini.prompt import ModelMessage, UserMessage
+from agent.llm.usage.LLMUsage import prompt_compaction_scope
+from agent.llm.usage.TokenEstimator import estimate_prompt_tokens
+
+# What the code in superseded model responses gets replaced with.
+_ELIDED_CODE = "<elided, superseded by a later version further below>"
+# Only long strings (i.e. whole files of code) get elided, short fields are kept as is.
+_MIN_ELIDED_CHARS = 200
+
+
+@dataclass
+class CompactedPromptHistory:
+    prompt_history: list[UserMessage | ModelMessage]
+    # Estimated, see `estimate_msg_tokens()`.
+    tokens_saved: int
+
+
+def estimate_msg_tokens(msg: UserMessage | ModelMessage) -> int:
+    """Estimated locally, since the real count is only known once the prompt has been sent."""
+    return estimate_prompt_tokens(system_prompt="", prompt=[msg])
+
+
+def compact_prompt_history(
+    prompt_history: list[UserMessage | ModelMessage],
+    token_budget: int | None = settings.DEBUGGING_PROMPT_HISTORY_TOKEN_BUDGET,
+) -> CompactedPromptHistory:
+    """Compacts the history of a debugging conversation to fit within the token budget, since every
+    debugging iteration appends another request and another whole copy of the code.
+
+    The original problem prompt and the latest turn (with the latest code) are always kept verbatim.
+    In between, the code in the older model responses is elided first (oldest first), since it's all
+    been superseded by the latest code anyway. If that's still not enough, the oldest debugging
+    turns are dropped entirely. Either way the history still alternates between user and model.
+    """
+    compacted = list(prompt_history)
+    orig_tokens = sum(map(estimate_msg_tokens, compacted))
+    if token_budget is None or orig_tokens <= token_budget:
+        return CompactedPromptHistory(prompt_history=compacted, tokens_saved=0)
+
+    def total_tokens() -> int:
+        return sum(map(estimate_msg_tokens, compacted))
+
+    # Everything but the first and the last 2 msgs (the latest request and the latest response).
+    for i in range(1, len(compacted) - 2):
+        if total_tokens() <= token_budget:
+            break
+        if isinstance(msg := compacted[i], ModelMessage):
+            compacted[i] = ModelMessage(msg=_elide_code(msg.msg))
+    # Dropped a whole (request, response) turn at a time, right after the original (prompt,
+    # response) turn, so that the roles keep alternating.
+    while total_tokens() > token_budget and len(compacted) > 4:
+        del compacted[2:4]
+
+    return CompactedPromptHistory(
+        prompt_history=compacted, tokens_saved=orig_tokens - total_tokens()
+    )
+
+
+def _elide_code(response: dict[str, Any]) -> dict[str, Any]:
+    return {
+        k: _ELIDED_CODE if isinstance(v, str) and len(v) >= _MIN_ELIDED_CHARS else v
+        for k, v in response.items()
+    }
+
+
+@contextmanager
+def compacted_debugging_prompt(
+    debugging_prompt: DebuggingPrompt | None,
+) -> Iterator[DebuggingPrompt | None]:
+    """The debugging prompt with its prior msg history compacted. LLM calls made within this context
+    get logged with the (estimated) input tokens that the compaction saved."""
+    if debugging_prompt is None:
+        yield None
+        return
+    compacted = compact_prompt_history(debugging_prompt.prior_msg_history)
+    with prompt_compaction_scope(tokens_saved=compacted.tokens_saved):
+        yield debugging_prompt.model_copy(update={"prior_msg_history": compacted.prompt_history})
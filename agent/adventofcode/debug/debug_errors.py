@@ -9,6 +9,13 @@ from agent.adventofcode.generate_code.GeneratedImplementation import (
 from agent.adventofcode.generate_code.GeneratedUnitTests import GeneratedUnitTests
 from agent.llm.gemini.models import GeminiModel
 from agent.llm.gemini.prompt import prompt
+from agent.llm.usage.LLMRouter import route_model
+from agent.llm.usage.TokenEstimator import estimate_prompt_tokens, pick_by_prompt_size
+
+# Theorizing defaults to the most capable model, unless the prompt is so big (e.g. an enormous error
+# message) that the model would take far too long to get through it, in which case the faster model
+# is the only option.
+_MAX_THEORIZING_PRO_MODEL_PROMPT_TOKENS = 32_000
 
 THEORIZING_SYSTEM_PROMPT_TEXT = """
 You are a skilled software engineer tasked with analyzing error messages raised from running Python 3.12 code and finding the problems/bugs in the code that caused the error.
@@ -73,10 +80,25 @@ IMPORTANT: The solution() function MUST RETURN THE RESULT VALUE. Do not just pri
                 f"Invalid TheorizedSolution should come up with at least one actionable code change.\n{theorized_solution}"  # noqa: E501
             )
 
+    candidate_models = pick_by_prompt_size(
+        estimate_prompt_tokens(
+            system_prompt=THEORIZING_SYSTEM_PROMPT_TEXT, prompt=theorize_solution_prompt
+        ),
+        tiers=[
+            (
+                _MAX_THEORIZING_PRO_MODEL_PROMPT_TOKENS,
+                [GeminiModel.GEMINI_1_5_PRO, GeminiModel.GEMINI_1_5_FLASH],
+            )
+        ],
+        default=[GeminiModel.GEMINI_1_5_FLASH],
+    )
+    model = await route_model(
+        "theorize-solution", candidates=candidate_models, default=candidate_models[0]
+    )
     while True:
         attempts += 1
         theorized_solution = await prompt(
-            model=GeminiModel.GEMINI_1_5_PRO,
+            model=model,
             subtask_name="theorize-solution",
             system_prompt=THEORIZING_SYSTEM_PROMPT_TEXT,
             prompt=theorize_solution_prompt,
@@ -122,7 +144,11 @@ async def get_refactoring_plan(
 ) -> RefactoringPlan:
     refactoring_plan = (
         await prompt(
-            model=GeminiModel.GEMINI_1_5_PRO,
+            model=await route_model(
+                "get-refactoring-plan",
+                candidates=[GeminiModel.GEMINI_1_5_PRO, GeminiModel.GEMINI_1_5_FLASH],
+                default=GeminiModel.GEMINI_1_5_PRO,
+            ),
             subtask_name="get-refactoring-plan",
             system_prompt=THEORIZING_SYSTEM_PROMPT_TEXT,
             prompt=f"""
@@ -0,0 +1,161 @@
+from result import Err, Ok, Result
+
+from agent.adventofcode.debug.compact_prompt_history import compact_prompt_history
+from agent.adventofcode.execute_generated_code import (
+    RuntimePrediction,
+    SolutionProfile,
+    SolutionWatchdogReport,
+)
+from agent.adventofcode.generate_code.GeneratedImplementation import (
+    GeneratedImplementation,
+)
+from agent.adventofcode.generate_code.generate_implementation import (
+    GenerateImplementationOutput,
+)
+from agent.llm.gemini.models import GeminiModel
+from agent.llm.gemini.prompt import ModelMessage, UserMessage, prompt
+from agent.llm.usage.LLMUsage import prompt_compaction_scope
+
+OPTIMIZING_SYSTEM_PROMPT_TEXT = """
+You are a skilled software engineer, proficient at finding and fixing performance problems in Python 3.12 code, especially algorithmic ones.
+
+Another engineer's solution (solution.py) to a coding problem already passes all of its unit tests, but it is far too slow to finish running on the real problem input. You will be given a profile of the solution running on the real input, showing which functions and lines it spends its time on.
+
+Your goal is to provide a faster version of the solution that computes EXACTLY the same results, so that it still passes all of the same unit tests.
+
+Focus on the hot spots in the profile. Prefer algorithmic improvements (e.g. a better algorithm or data structure, memoization, avoiding redundant work) over micro-optimizations, since a solution that times out is usually doing asymptotically too much work.
+
+You MUST respond with a single complete Python 3.12 program with full type annotations.
+IMPORTANT: ONLY use imports from Python's stdlib. DO NOT use any third party libraries whatsoever in your implementation.
+IMPORTANT: Your implementation MUST ONLY do I/O to read the problem input from stdin. You MUST NOT open any files.
+IMPORTANT: Keep every function that the unit tests call, with exactly the same signature and behavior.
+IMPORTANT: The solution() function MUST take no args and read the input from stdin.
+IMPORTANT: The solution() function MUST RETURN THE RESULT VALUE. Do not print anything to stdout.
+"""  # noqa: E501
+
+
+async def optimize_implementation(
+    implementation: GenerateImplementationOutput,
+    solution_profile: SolutionProfile,
+    timeout_secs: int,
+    runtime_prediction: RuntimePrediction | None = None,
+    watchdog_report: SolutionWatchdogReport | None = None,
+) -> GenerateImplementationOutput:
+    """Continues the implementation's own prompt history, so that the LLM has the full context of
+    the problem that the slow solution was solving."""
+    prev_impl_src = implementation.generated_implementation.generated_implementation_file_content
+    compacted_prompt_history = compact_prompt_history(implementation.prompt_history)
+    optimize_implementation_prompt = [
+        *compacted_prompt_history.prompt_history,
+        UserMessage(
+            msg=f"""
+The solution you previously generated passes all of the unit tests, but it is too slow to finish within {timeout_secs} seconds when run on the real problem input.
+Make the solution MUCH faster, using the profile below to find where it spends its time.
+
+### Slow Implementation (solution.py, with line numbers):
+```python
+{"\n".join(f"{n:>4}  {line}" for n, line in enumerate(prev_impl_src.splitlines(), start=1))}
+```
+
+### Profile:
+{_fmt_solution_profile(solution_profile)}
+{_fmt_runtime_prediction(runtime_prediction) if runtime_prediction else ""}
+{_fmt_watchdog_report(watchdog_report) if watchdog_report else ""}
+"""  # noqa: E501
+        ),
+    ]
+
+    def _validate_implementation_is_updated(
+        optimized_impl: GeneratedImplementation,
+    ) -> Result[None, str]:
+        if optimized_impl.generated_implementation_file_content != prev_impl_src:
+            return Ok(None)
+        else:
+            return Err("The implementation was not actually optimized.")
+
+    attempts = 0
+    MAX_RETRIES = 3
+    with prompt_compaction_scope(tokens_saved=compacted_prompt_history.tokens_saved):
+        while True:
+            attempts += 1
+            match await prompt(
+                model=GeminiModel.GEMINI_1_5_PRO,
+                subtask_name="optimize-implementation",
+                system_prompt=OPTIMIZING_SYSTEM_PROMPT_TEXT,
+                prompt=optimize_implementation_prompt,
+                response_type=GeneratedImplementation,
+                extra_validation_fn=_validate_implementation_is_updated,
+            ):
+                case Ok(optimized_impl):
+                    break
+                case Err(_):
+                    if attempts >= MAX_RETRIES:
+                        raise Exception(
+                            f"Failed to optimize the implementation after {MAX_RETRIES} attempts."
+                        )
+
+    return GenerateImplementationOutput(
+        prompt_history=[
+            *optimize_implementation_prompt,
+            ModelMessage(msg=optimized_impl.model_dump()),
+        ],
+        generated_implementation=optimized_impl,
+    )
+
+
+def _fmt_solution_profile(solution_profile: SolutionProfile) -> str:
+    if solution_profile.completed:
+        status = "The solution finished while being profiled"
+    elif solution_profile.exception is not None:
+        status = f"The solution raised an exception while being profiled:\n{solution_profile.exception}"  # noqa: E501
+    else:
+        status = "The solution was stopped before it could finish"
+    hot_functions = "\n".join(
+        f"| {f.function} | {f.lineno} | {f.calls} | {f.self_secs:.3f} | {f.cumulative_secs:.3f} |"
+        for f in solution_profile.hot_functions
+    )
+    hot_lines = "\n".join(
+        f"| {line.lineno} | {100 * line.samples / solution_profile.total_samples:.1f}% | `{line.source}` |"  # noqa: E501
+        for line in solution_profile.hot_lines
+    )
+    return f"""
+{status} after {solution_profile.profiled_secs} seconds.
+
+#### Hottest functions (by time spent in the function itself):
+| Function | Line | Calls | Self Time (s) | Cumulative Time (s) |
+|---|---|---|---|---|
+{hot_functions}
+
+#### Hottest lines (by share of samples taken while running the solution's own code):
+| Line | Samples | Source |
+|---|---|---|
+{hot_lines}
+"""
+
+
+def _fmt_runtime_prediction(runtime_prediction: RuntimePrediction) -> str:
+    samples = "\n".join(
+        f"| {sample.input_lines} | {f">{sample.secs}" if sample.timed_out else sample.secs} |"
+        for sample in runtime_prediction.samples
+    )
+    return f"""
+### Scaling (timings of the solution on growing prefixes of the {runtime_prediction.total_input_lines} line input):
+| Input Lines | Time (s) |
+|---|---|
+{samples}
+{f"""
+The runtime grows roughly like O(n^{runtime_prediction.growth_exponent}) in the number of input lines, so it's predicted to take {runtime_prediction.predicted_secs} seconds on the full input.""" if runtime_prediction.growth_exponent is not None else ""}
+"""  # noqa: E501
+
+
+def _fmt_watchdog_report(watchdog_report: SolutionWatchdogReport) -> str:
+    hot_stacks = "\n".join(
+        f"| {100 * stack.samples / watchdog_report.total_samples:.1f}% | {' -> '.join(stack.frames)} | `{stack.source}` |"  # noqa: E501
+        for stack in watchdog_report.hot_stacks
+    )
+    return f"""
+### Where the solution was stuck when it was stopped after {watchdog_report.elapsed_secs} seconds on the full input (peak memory usage {watchdog_report.peak_rss_mb} MB, of which {watchdog_report.baseline_rss_mb} MB was used before the solution started):
+| Samples | Call Stack (function:line, outermost first) | Source |
+|---|---|---|
+{hot_stacks}
+"""  # noqa: E501
@@ -1,9 +1,25 @@
+import ast
+import asyncio
+import atexit
+import cProfile
 import io
 import json
+import linecache
+import math
+import os
+import pstats
+import signal
+import statistics
 import subprocess
 import sys
+import sysconfig
+import tempfile
+import time
+import traceback
+from collections import Counter
 from importlib import import_module
-from typing import Any, Literal, cast
+from types import FrameType
+from typing import Any, Callable, Literal
 
 import asyncclick as click
 import pytest
@@ -11,7 +27,29 @@ from pydantic import BaseModel
 from pytest_jsonreport.plugin import JSONReport
 from result import Err, Ok, Result
 
-from agent.adventofcode.problem_part import ProblemPart
+from agent.adventofcode.execution_cache import (
+    get_execution_cache_key,
+    lookup_execution_result,
+    store_execution_result,
+)
+from agent.adventofcode.execution_workspace import ExecutionWorkspace, ephemeral_workspace
+from agent.adventofcode.precheck_generated_code import precheck_generated_code
+from agent.adventofcode.process_group import kill_process_group
+from agent.adventofcode.resource_limits import (
+    ResourceAccounting,
+    ResourceLimits,
+    ResourceUsage,
+    get_peak_rss_mb,
+    get_resource_limits,
+    limited_resources,
+)
+from agent.adventofcode.unit_test_outcomes import (
+    get_previously_failing_tests,
+    get_unit_test_outcomes,
+    record_unit_test_outcomes,
+    set_unit_test_outcomes,
+)
+from agent.adventofcode.warm_test_runner_pool import TestRunnerPool
 
 
 @click.group()
@@ -19,52 +57,618 @@ def cli_group():
     pass
 
 
-def execute_generated_solution(
-    year: int, day: int, part: ProblemPart
-) -> Result[str, subprocess.CalledProcessError]:
+class SolutionWatchdogReport(BaseModel):
+    """What the solution was up to while it ran, as seen by the watchdog that runs alongside it."""
+
+    class HotStack(BaseModel):
+        # The solution's own frames, outermost first, e.g. `["solution:20", "count_pairs:12"]`. Any
+        # run of recursive calls is collapsed into a single frame like `"fib:5 (recursive)"`.
+        frames: list[str]
+        # The source of the innermost frame's line.
+        source: str
+        samples: int
+
+    timed_out: bool
+    elapsed_secs: float
+    peak_rss_mb: float
+    # How much of the peak was already used by the runner itself before the solution even started.
+    baseline_rss_mb: float
+    # The stacks that the solution was most often found executing, most frequent first.
+    hot_stacks: list[HotStack]
+    total_samples: int
+
+
+class SolutionOutput(BaseModel):
+    output: str
+    resource_usage: ResourceUsage | None
+
+
+class SolutionExecutionError(subprocess.CalledProcessError):
+    def __init__(
+        self,
+        returncode: int,
+        cmd: list[str],
+        output: str,
+        stderr: str,
+        watchdog_report: SolutionWatchdogReport | None,
+        resource_usage: ResourceUsage | None,
+    ):
+        super().__init__(returncode, cmd, output=output, stderr=stderr)
+        # Both None if the solution crashed hard enough to not even report (e.g. `os._exit()`).
+        self.watchdog_report = watchdog_report
+        self.resource_usage = resource_usage
+
+
+class _SolutionRunReport(BaseModel):
+    watchdog_report: SolutionWatchdogReport
+    resource_usage: ResourceUsage | None
+
+
+# The solution gets interrupted by its watchdog after this long, comfortably before the hard 4
+# minute timeout, so that it still has time to report where it was stuck.
+_SOLUTION_TIME_BUDGET_SECS = 220
+_SOLUTION_HARD_TIMEOUT_SECS = 240
+_SOLUTION_TIMED_OUT_EXIT_CODE = 124
+
+
+async def execute_generated_solution(
+    workspace: ExecutionWorkspace, resource_limits: ResourceLimits | None = None
+) -> Result[SolutionOutput, SolutionExecutionError]:
     """Execute the solution in a subprocess so that this process can make programmatic edits to the
     tests/implementations according to the agent's fixes and have the changes reflected in
-    subsequent test runs."""
-    result = subprocess.run(
-        [
+    subsequent test runs.
+
+    A solution that runs out of its time budget fails with a watchdog report of where it was stuck.
+    Raises TimeoutError if the solution still hasn't exited after 4 minutes (e.g. it's stuck in some
+    C code that never lets the watchdog interrupt it). Either way, a solution that times out or
+    whose caller gets cancelled is killed along with anything it spawned.
+    """
+    assert workspace.input_file is not None, "Can't execute a solution without the problem input."
+    resource_limits = resource_limits or get_resource_limits()
+    # The tests aren't involved, the solution only ever runs against the problem input.
+    cache_key = get_execution_cache_key(
+        "solution", [workspace.solution_file, workspace.input_file], resource_limits
+    )
+    if (cached_result := lookup_execution_result(cache_key)) is not None:
+        return _relocate_solution_result(cached_result, workspace.from_portable_paths)
+
+    result = await _execute_generated_solution_uncached(workspace, resource_limits)
+    match result:
+        case Err(SolutionExecutionError(watchdog_report=None)):
+            # Crashed too hard to even report, which may well have been the machine rather than the
+            # solution (e.g. the OOM killer), so it's worth actually running it again next time.
+            pass
+        case _:
+            # Including the solution running out of its time budget, which it will just do again.
+            store_execution_result(
+                cache_key, _relocate_solution_result(result, workspace.to_portable_paths)
+            )
+    return result
+
+
+def _relocate_solution_result(
+    result: Result[SolutionOutput, SolutionExecutionError], relocate_paths: Callable[[str], str]
+) -> Result[SolutionOutput, SolutionExecutionError]:
+    """Rewrites the workspace paths in a failed solution's tracebacks, since a cached result may be
+    served to a run of the same solution from a different workspace."""
+    match result:
+        case Err(err):
+            return Err(
+                SolutionExecutionError(
+                    err.returncode,
+                    [relocate_paths(arg) for arg in err.cmd],
+                    relocate_paths(err.output),
+                    relocate_paths(err.stderr),
+                    watchdog_report=err.watchdog_report,
+                    resource_usage=err.resource_usage,
+                )
+            )
+        case _:
+            return result
+
+
+async def _execute_generated_solution_uncached(
+    workspace: ExecutionWorkspace, resource_limits: ResourceLimits
+) -> Result[SolutionOutput, SolutionExecutionError]:
+    assert workspace.input_file is not None, "Can't execute a solution without the problem input."
+    with tempfile.TemporaryDirectory(prefix="aoc-solution-run-") as report_dir:
+        report_file = os.path.join(report_dir, "report.json")
+        cmd = [
             "python",
             "-m",
             "agent.adventofcode.execute_generated_code",
             "execute-problem-solution",
-            f"--year={year}",
-            f"--day={day}",
-            f"--part={part}",
-        ],
-        capture_output=True,
-        text=True,
-        timeout=240,  # 4 minutes.
+            f"--workspace-dir={workspace.root_dir}",
+            f"--input-file={workspace.input_file}",
+            f"--time-budget-secs={_SOLUTION_TIME_BUDGET_SECS}",
+            f"--report-file={report_file}",
+            *_fmt_resource_limits_options(resource_limits),
+        ]
+        stdout, stderr, returncode = await _run_subprocess(
+            cmd, timeout=_SOLUTION_HARD_TIMEOUT_SECS
+        )
+        report: _SolutionRunReport | None = None
+        if os.path.exists(report_file):
+            with open(report_file) as f:
+                report = _SolutionRunReport.model_validate_json(f.read())
+    if returncode != 0:
+        return Err(
+            SolutionExecutionError(
+                returncode,
+                cmd,
+                stdout,
+                stderr,
+                watchdog_report=report.watchdog_report if report else None,
+                resource_usage=report.resource_usage if report else None,
+            )
+        )
+    return Ok(
+        SolutionOutput(
+            output=stdout.strip(), resource_usage=report.resource_usage if report else None
+        )
+    )
+
+
+def _fmt_resource_limits_options(resource_limits: ResourceLimits) -> list[str]:
+    options = []
+    if resource_limits.max_memory_mb is not None:
+        options.append(f"--max-memory-mb={resource_limits.max_memory_mb}")
+    if resource_limits.max_cpu_secs is not None:
+        options.append(f"--max-cpu-secs={resource_limits.max_cpu_secs}")
+    return options
+
+
+async def _run_subprocess(cmd: list[str], timeout: float | None) -> tuple[str, str, int]:
+    """Runs the command to completion without blocking the event loop, returning its stdout, stderr
+    and exit code."""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        # Its own process group, so that it can be killed along with anything it spawns.
+        start_new_session=True,
     )
     try:
-        return Ok(result.stdout.strip())
-    except subprocess.CalledProcessError as e:
-        return Err(e)
+        # Drains both pipes as output arrives, so a chatty process can't fill one up and deadlock.
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except BaseException:
+        kill_process_group(proc)
+        raise
+    assert proc.returncode is not None, "The process should've exited by now."
+    return stdout.decode(errors="replace"), stderr.decode(errors="replace"), proc.returncode
 
 
 @cli_group.command()
-@click.option("--year", required=True)
-@click.option("--day", required=True)
-@click.option("--part", type=click.Choice(["1", "2"]), default="1")
+@click.option("--workspace-dir", required=True)
+@click.option("--input-file", required=True)
+@click.option(
+    "--time-budget-secs",
+    type=float,
+    default=None,
+    help="Interrupt the solution if it's still running after this long.",
+)
+@click.option(
+    "--report-file",
+    default=None,
+    help="Sample the solution's stack while it runs, writing a report here once it's done.",
+)
+@click.option("--max-memory-mb", type=int, default=None)
+@click.option("--max-cpu-secs", type=int, default=None)
 def execute_problem_solution(
-    year: int,
-    day: int,
-    part: str,  # type: ignore - Need to redeclare with a cast after parsing into an int.
+    workspace_dir: str,
+    input_file: str,
+    time_budget_secs: float | None,
+    report_file: str | None,
+    max_memory_mb: int | None,
+    max_cpu_secs: int | None,
 ) -> None:
-    part: ProblemPart = cast(ProblemPart, part)
-
-    with open(f"advent_of_code/year{year}/day{day}/input.txt") as f:
+    with open(input_file) as f:
         # Patch stdin to return the contents of the input file without needing to actually have the
         # file contents piped into the program from the cli.
         sys.stdin = io.StringIO(f.read())
 
-    solution_module = import_module(f"advent_of_code.year{year}.day{day}.part{part}.solution")
+    # Import the solution the same way that its tests do, as a top-level module of its workspace.
+    workspace_dir = os.path.abspath(workspace_dir)
+    sys.path.insert(0, workspace_dir)
+    solution_module = import_module("solution")
+
+    watchdog = _StackSamplingWatchdog(
+        solution_file=os.path.join(workspace_dir, "solution.py"),
+        time_budget_secs=time_budget_secs,
+        sample_stacks=report_file is not None,
+    )
+    accounting: ResourceAccounting | None = None
+    timed_out = False
+    try:
+        with (
+            limited_resources(
+                ResourceLimits(max_memory_mb=max_memory_mb, max_cpu_secs=max_cpu_secs)
+            ) as accounting,
+            watchdog,
+        ):
+            # Execute the actual implementation!
+            result = solution_module.solution()
+    except _TimeBudgetExhausted:
+        timed_out = True
+    finally:
+        # Even (especially) if the solution crashed.
+        if report_file is not None:
+            with open(report_file, "w") as f:
+                f.write(
+                    _SolutionRunReport(
+                        watchdog_report=watchdog.get_report(timed_out=timed_out),
+                        resource_usage=accounting.usage if accounting else None,
+                    ).model_dump_json()
+                )
+    if timed_out:
+        print(f"The solution ran out of its {time_budget_secs}s time budget.", file=sys.stderr)
+        sys.exit(_SOLUTION_TIMED_OUT_EXIT_CODE)
+    print(str(result))
+
+
+class _TimeBudgetExhausted(BaseException):
+    # Not an Exception, so that the solution can't accidentally swallow it.
+    pass
+
+
+_WATCHDOG_SAMPLING_INTERVAL_SECS = 0.01
+_MAX_HOT_STACKS = 5
 
-    # Execute the actual implementation!
-    print(str(solution_module.solution()))
+
+class _StackSamplingWatchdog:
+    """Periodically samples the solution's stack while it's running, and interrupts it by raising
+    `_TimeBudgetExhausted` once it's out of time.
+
+    This all runs in the solution's own process via signals, which only get handled between Python
+    bytecodes, so it's cheap but it can't interrupt a solution that's stuck in a single long call
+    into C code.
+    """
+
+    def __init__(self, solution_file: str, time_budget_secs: float | None, sample_stacks: bool):
+        self._solution_file = solution_file
+        self._time_budget_secs = time_budget_secs
+        self._sample_stacks = sample_stacks
+        # Keyed by stacks of (function, lineno, is_recursive) frames.
+        self._stack_samples: Counter[tuple[tuple[str, int, bool], ...]] = Counter()
+        self._start = 0.0
+        self._end: float | None = None
+        self._baseline_rss_mb = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.monotonic()
+        self._baseline_rss_mb = get_peak_rss_mb()
+        if self._sample_stacks:
+            signal.signal(signal.SIGPROF, self._sample_stack)
+            signal.setitimer(
+                signal.ITIMER_PROF,
+                _WATCHDOG_SAMPLING_INTERVAL_SECS,
+                _WATCHDOG_SAMPLING_INTERVAL_SECS,
+            )
+        if self._time_budget_secs is not None:
+            signal.signal(signal.SIGALRM, self._exhaust_time_budget)
+            signal.setitimer(signal.ITIMER_REAL, self._time_budget_secs)
+
+    def __exit__(self, *exc_info: object) -> None:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        self._end = time.monotonic()
+
+    def _sample_stack(self, signum: int, frame: FrameType | None) -> None:
+        stack: list[tuple[str, int, bool]] = []
+        while frame is not None:
+            if frame.f_code.co_filename == self._solution_file:
+                function_line = (frame.f_code.co_name, frame.f_lineno)
+                if stack and stack[-1][:2] == function_line:
+                    # Otherwise every recursion depth would be counted as a different stack.
+                    stack[-1] = (*function_line, True)
+                else:
+                    stack.append((*function_line, False))
+            frame = frame.f_back
+        if stack:
+            self._stack_samples[tuple(reversed(stack))] += 1
+
+    def _exhaust_time_budget(self, signum: int, frame: FrameType | None) -> None:
+        raise _TimeBudgetExhausted()
+
+    def get_report(self, timed_out: bool) -> SolutionWatchdogReport:
+        return SolutionWatchdogReport(
+            timed_out=timed_out,
+            elapsed_secs=round((self._end or time.monotonic()) - self._start, 2),
+            peak_rss_mb=round(get_peak_rss_mb(), 1),
+            baseline_rss_mb=round(self._baseline_rss_mb, 1),
+            hot_stacks=[
+                SolutionWatchdogReport.HotStack(
+                    frames=[
+                        f"{function}:{lineno}{' (recursive)' if is_recursive else ''}"
+                        for function, lineno, is_recursive in stack
+                    ],
+                    source=linecache.getline(self._solution_file, stack[-1][1]).strip(),
+                    samples=samples,
+                )
+                for stack, samples in self._stack_samples.most_common(_MAX_HOT_STACKS)
+            ],
+            total_samples=self._stack_samples.total(),
+        )
+
+
+class RuntimePrediction(BaseModel):
+    class Sample(BaseModel):
+        input_lines: int
+        secs: float
+        # The run was killed after `secs`, so it's only a lower bound on the actual runtime.
+        timed_out: bool = False
+
+    total_input_lines: int
+    samples: list[Sample]
+    # The fitted exponent k of `secs ~ input_lines^k`, e.g. ~2 for a quadratic solution. None if
+    # there weren't enough usable samples to fit a curve to.
+    growth_exponent: float | None = None
+    predicted_secs: float | None = None
+
+
+# The input is scaled down by halving it, from 1/32 up to 1/2 of the full input.
+_SCALING_PROBE_INPUT_DIVISORS = (32, 16, 8, 4, 2)
+# Inputs too small to meaningfully scale down just aren't probed.
+_MIN_SCALING_PROBE_INPUT_LINES = 16
+# Stop scaling up once a single run takes this long, since that's plenty of signal already.
+_SCALING_PROBE_STOP_SECS = 5
+_SCALING_PROBE_RUN_TIMEOUT_SECS = 30
+# Runs faster than this are dominated by noise, so they're left out of the fitted curve.
+_MIN_SCALING_PROBE_FIT_SECS = 0.02
+
+
+async def predict_solution_runtime(workspace: ExecutionWorkspace) -> RuntimePrediction:
+    """Predicts how long the solution will take on the full problem input, without actually running
+    it on the full input.
+
+    The solution is run on progressively larger prefixes of the input's lines (most AoC inputs are a
+    list of records or the rows of a grid, so a prefix is usually still a valid, smaller input), and
+    then a power law is fit to the timings to extrapolate out to the full input. Prefixes that the
+    solution can't handle are just skipped.
+    """
+    assert workspace.input_file is not None, "Can't probe a solution without the problem input."
+    with open(workspace.input_file) as f:
+        input_lines = f.read().splitlines(keepends=True)
+    with open(workspace.solution_file) as f:
+        solution_src = f.read()
+
+    samples: list[RuntimePrediction.Sample] = []
+    if len(input_lines) >= _MIN_SCALING_PROBE_INPUT_LINES:
+        for divisor in _SCALING_PROBE_INPUT_DIVISORS:
+            num_lines = len(input_lines) // divisor
+            with ephemeral_workspace(
+                solution_src=solution_src, problem_input="".join(input_lines[:num_lines])
+            ) as prefix_workspace:
+                assert prefix_workspace.input_file is not None
+                try:
+                    stdout, _, returncode = await _run_subprocess(
+                        [
+                            "python",
+                            "-m",
+                            "agent.adventofcode.execute_generated_code",
+                            "time-problem-solution",
+                            f"--workspace-dir={prefix_workspace.root_dir}",
+                            f"--input-file={prefix_workspace.input_file}",
+                            *_fmt_resource_limits_options(get_resource_limits()),
+                        ],
+                        timeout=_SCALING_PROBE_RUN_TIMEOUT_SECS,
+                    )
+                except TimeoutError:
+                    samples.append(
+                        RuntimePrediction.Sample(
+                            input_lines=num_lines,
+                            secs=_SCALING_PROBE_RUN_TIMEOUT_SECS,
+                            timed_out=True,
+                        )
+                    )
+                    break
+            if returncode != 0:
+                continue  # Most likely this prefix just isn't a valid input.
+            samples.append(
+                RuntimePrediction.Sample(input_lines=num_lines, secs=round(float(stdout), 4))
+            )
+            if samples[-1].secs >= _SCALING_PROBE_STOP_SECS:
+                break
+
+    prediction = RuntimePrediction(total_input_lines=len(input_lines), samples=samples)
+    fit_samples = [s for s in samples if s.secs >= _MIN_SCALING_PROBE_FIT_SECS]
+    if len({s.input_lines for s in fit_samples}) >= 2:
+        # A straight line in log-log space is a power law.
+        growth_exponent, intercept = statistics.linear_regression(
+            [math.log(s.input_lines) for s in fit_samples], [math.log(s.secs) for s in fit_samples]
+        )
+        prediction.growth_exponent = round(growth_exponent, 2)
+        prediction.predicted_secs = round(
+            math.exp(intercept + growth_exponent * math.log(len(input_lines))), 2
+        )
+    if samples and samples[-1].timed_out:
+        # Scaling linearly from a run that timed out is the least that the full input will take.
+        lower_bound_secs = samples[-1].secs * len(input_lines) / samples[-1].input_lines
+        prediction.predicted_secs = round(max(prediction.predicted_secs or 0, lower_bound_secs), 2)
+    return prediction
+
+
+@cli_group.command()
+@click.option("--workspace-dir", required=True)
+@click.option("--input-file", required=True)
+@click.option("--max-memory-mb", type=int, default=None)
+@click.option("--max-cpu-secs", type=int, default=None)
+def time_problem_solution(
+    workspace_dir: str, input_file: str, max_memory_mb: int | None, max_cpu_secs: int | None
+) -> None:
+    """Like `execute-problem-solution`, but prints how many seconds the solution took to run instead
+    of its result."""
+    # Anything the solution prints goes to stderr instead, so that only the timing is on stdout.
+    report = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    with open(input_file) as f:
+        sys.stdin = io.StringIO(f.read())
+    sys.path.insert(0, os.path.abspath(workspace_dir))
+    solution_module = import_module("solution")
+
+    start = time.perf_counter()
+    with limited_resources(ResourceLimits(max_memory_mb=max_memory_mb, max_cpu_secs=max_cpu_secs)):
+        solution_module.solution()
+    report.write(str(time.perf_counter() - start))
+    report.flush()
+
+
+class SolutionProfile(BaseModel):
+    """Where a solution spends its time, restricted to the solution's own code."""
+
+    class HotFunction(BaseModel):
+        function: str
+        lineno: int
+        calls: int
+        # Time spent in the function itself, excluding any functions it called.
+        self_secs: float
+        cumulative_secs: float
+
+    class HotLine(BaseModel):
+        lineno: int
+        source: str
+        # How many of the profiler's periodic samples found the solution executing this line.
+        samples: int
+
+    profiled_secs: float
+    # False if the solution was still running when the profiling budget ran out.
+    completed: bool
+    # The solution's traceback, if it raised an exception before the budget ran out.
+    exception: str | None = None
+    hot_functions: list[HotFunction]
+    hot_lines: list[HotLine]
+    total_samples: int
+
+
+# Solutions that time out on the real problem input get profiled for this long, which is plenty to
+# find the hot spots without making the agent wait out another full timeout.
+_PROFILING_BUDGET_SECS = 30
+_PROFILER_SAMPLING_INTERVAL_SECS = 0.005
+_MAX_HOT_FUNCTIONS = 10
+_MAX_HOT_LINES = 15
+
+
+async def execute_profiled_solution(
+    workspace: ExecutionWorkspace, budget_secs: float = _PROFILING_BUDGET_SECS
+) -> SolutionProfile:
+    """Execute the solution in a subprocess under a profiler, stopping it once the budget runs out
+    (rather than waiting for it to finish) since it only needs to run long enough to find where the
+    time is going."""
+    assert workspace.input_file is not None, "Can't profile a solution without the problem input."
+    stdout, stderr, _ = await _run_subprocess(
+        [
+            "python",
+            "-m",
+            "agent.adventofcode.execute_generated_code",
+            "profile-problem-solution",
+            f"--workspace-dir={workspace.root_dir}",
+            f"--input-file={workspace.input_file}",
+            f"--budget-secs={budget_secs}",
+            *_fmt_resource_limits_options(get_resource_limits()),
+        ],
+        # Plenty of slack for the profiler to write its report after the budget runs out.
+        timeout=budget_secs + 60,
+    )
+    if not stdout.strip():
+        raise RuntimeError(f"The profiled solution crashed without reporting a profile:\n{stderr}")
+    return SolutionProfile.model_validate_json(stdout)
+
+
+@cli_group.command()
+@click.option("--workspace-dir", required=True)
+@click.option("--input-file", required=True)
+@click.option("--budget-secs", type=float, required=True)
+@click.option("--max-memory-mb", type=int, default=None)
+@click.option("--max-cpu-secs", type=int, default=None)
+def profile_problem_solution(
+    workspace_dir: str,
+    input_file: str,
+    budget_secs: float,
+    max_memory_mb: int | None,
+    max_cpu_secs: int | None,
+) -> None:
+    """Profile the solution for up to `budget_secs`, printing a `SolutionProfile` as JSON."""
+    # Anything the solution prints goes to stderr instead, so that only the report is on stdout.
+    report = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    with open(input_file) as f:
+        sys.stdin = io.StringIO(f.read())
+    workspace_dir = os.path.abspath(workspace_dir)
+    sys.path.insert(0, workspace_dir)
+
+    # cProfile gets exact call counts and per-function timings, while periodically sampling the
+    # solution's current line pins down exactly which lines within those functions are hot.
+    line_samples: Counter[int] = Counter()
+    solution_file = os.path.join(workspace_dir, "solution.py")
+
+    def sample_line(signum: int, frame: FrameType | None) -> None:
+        # Walk out of any library code to the solution's own line that called into it.
+        while frame is not None and frame.f_code.co_filename != solution_file:
+            frame = frame.f_back
+        if frame is not None:
+            line_samples[frame.f_lineno] += 1
+
+    def exhaust_budget(signum: int, frame: FrameType | None) -> None:
+        raise _TimeBudgetExhausted()
+
+    signal.signal(signal.SIGPROF, sample_line)
+    signal.signal(signal.SIGALRM, exhaust_budget)
+    profiler = cProfile.Profile()
+    completed = False
+    exception: str | None = None
+    start = time.monotonic()
+    signal.setitimer(signal.ITIMER_REAL, budget_secs)
+    signal.setitimer(
+        signal.ITIMER_PROF, _PROFILER_SAMPLING_INTERVAL_SECS, _PROFILER_SAMPLING_INTERVAL_SECS
+    )
+    try:
+        with limited_resources(
+            ResourceLimits(max_memory_mb=max_memory_mb, max_cpu_secs=max_cpu_secs)
+        ):
+            profiler.enable()
+            import_module("solution").solution()
+        completed = True
+    except _TimeBudgetExhausted:
+        pass
+    except Exception:
+        exception = traceback.format_exc()
+    finally:
+        profiler.disable()
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    profiled_secs = time.monotonic() - start
+
+    hot_functions = [
+        SolutionProfile.HotFunction(
+            function=function,
+            lineno=lineno,
+            calls=calls,
+            self_secs=round(self_secs, 4),
+            cumulative_secs=round(cumulative_secs, 4),
+        )
+        for (filename, lineno, function), (_, calls, self_secs, cumulative_secs, _) in (
+            pstats.Stats(profiler).stats.items()  # type: ignore[attr-defined]
+        )
+        if filename == solution_file
+    ]
+    hot_functions.sort(key=lambda f: f.self_secs, reverse=True)
+    profile = SolutionProfile(
+        profiled_secs=round(profiled_secs, 2),
+        completed=completed,
+        exception=exception,
+        hot_functions=hot_functions[:_MAX_HOT_FUNCTIONS],
+        hot_lines=[
+            SolutionProfile.HotLine(
+                lineno=lineno,
+                source=linecache.getline(solution_file, lineno).strip(),
+                samples=samples,
+            )
+            for lineno, samples in line_samples.most_common(_MAX_HOT_LINES)
+        ],
+        total_samples=line_samples.total(),
+    )
+    report.write(profile.model_dump_json())
+    report.flush()
 
 
 class TestResults(BaseModel):
@@ -75,37 +679,276 @@ class TestResults(BaseModel):
         err_msg: str
 
     result: Success | Failure
+    # None if the tests crashed hard enough to not even report (e.g. `os._exit()`).
+    resource_usage: ResourceUsage | None = None
 
 
-def execute_tests(year: int, day: int, part: ProblemPart) -> TestResults:
+# A full test run gets sharded by test function across up to this many test runners at once, so
+# that one slow example doesn't hold up the feedback on all of the others.
+_MAX_TEST_SHARDS = max(1, min(4, os.cpu_count() or 1))
+# Each debugging iteration runs the tests again, so keep a few test runner processes warm instead
+# of paying to re-import pytest (and everything else) in a brand-new subprocess every single time.
+_TEST_RUNNER_POOL = TestRunnerPool(
+    worker_cmd=["python", "-m", "agent.adventofcode.execute_generated_code", "test-runner-worker"],
+    max_workers=max(2, _MAX_TEST_SHARDS),
+    max_runs_per_worker=20,
+)
+atexit.register(_TEST_RUNNER_POOL.shutdown)
+
+
+async def warm_test_runner_pool() -> None:
+    await _TEST_RUNNER_POOL.warm()
+
+
+async def execute_tests(
+    workspace: ExecutionWorkspace,
+    resource_limits: ResourceLimits | None = None,
+    tested_function_name: str | None = None,
+    quick: bool = False,
+) -> TestResults:
     """Execute the tests in a subprocess so that this process can make programmatic edits to the
     tests/implementations according to the agent's fixes and have the changes reflected in
-    subsequent test runs."""
-    result = subprocess.run(
-        [
-            "python",
-            "-m",
-            "agent.adventofcode.execute_generated_code",
-            "get-test-report",
-            f"--year={year}",
-            f"--day={day}",
-            f"--part={part}",
-        ],
-        capture_output=True,
-        text=True,
+    subsequent test runs.
+
+    In quick mode (i.e. while debugging), the tests that failed last time get rerun on their own
+    first, stopping at the first failure. The full suite only runs once they all pass.
+
+    The code is statically prechecked first, failing immediately without running anything at all if
+    it's broken in a way that doesn't need execution to find (e.g. a syntax error).
+
+    Results are cached by the content of the tests and the implementation, since debugging often
+    comes back around to code that's already been run (e.g. rolling back a failed fix). A cached
+    full run is at least as informative as a quick one, so it's returned even in quick mode, with
+    its unit test outcomes recorded for this workspace as if the tests had just run in it.
+    """
+    with open(workspace.solution_file) as f:
+        solution_src = f.read()
+    with open(workspace.tests_file) as f:
+        tests_src = f.read()
+    match precheck_generated_code(solution_src, tests_src, tested_function_name):
+        case Err(precheck_failure_msg):
+            return TestResults(result=TestResults.Failure(err_msg=precheck_failure_msg))
+
+    resource_limits = resource_limits or get_resource_limits()
+    cache_key = get_execution_cache_key(
+        "tests", [workspace.tests_file, workspace.solution_file], resource_limits
+    )
+    match lookup_execution_result(cache_key):
+        case (TestResults() as cached_test_results, dict(cached_outcomes)):
+            set_unit_test_outcomes(workspace.tests_file, cached_outcomes)
+            return _relocate_test_results(cached_test_results, workspace.from_portable_paths)
+
+    if quick and (failing_tests := get_previously_failing_tests(workspace.tests_file, tests_src)):
+        quick_test_results = await _execute_tests_uncached(
+            workspace, resource_limits, test_names=failing_tests, exit_first=True
+        )
+        match quick_test_results.result:
+            case TestResults.Failure(err_msg=err_msg):
+                quick_test_results.result.err_msg = f"""(Quick run: only reran the {len(failing_tests)} previously failing tests, stopping at the first failure.)
+
+{err_msg}"""  # noqa: E501
+                return quick_test_results
+
+    test_results = await _execute_tests_uncached(
+        workspace, resource_limits, test_names=_get_test_function_names(tests_src)
+    )
+    # Not cached if the tests crashed too hard to even report, which may not be the code's fault.
+    if test_results.resource_usage is not None:
+        store_execution_result(
+            cache_key,
+            (
+                _relocate_test_results(test_results, workspace.to_portable_paths),
+                get_unit_test_outcomes(workspace.tests_file),
+            ),
+        )
+    return test_results
+
+
+def _relocate_test_results(
+    test_results: TestResults, relocate_paths: Callable[[str], str]
+) -> TestResults:
+    """A copy of the test results with the workspace paths in any failure message rewritten, since
+    cached results get served to runs of the same code from different workspaces. Being a copy, the
+    caller also can't modify the cached results out from under later hits."""
+    relocated = test_results.model_copy(deep=True)
+    if isinstance(relocated.result, TestResults.Failure):
+        relocated.result.err_msg = relocate_paths(relocated.result.err_msg)
+    return relocated
+
+
+async def _execute_tests_uncached(
+    workspace: ExecutionWorkspace,
+    resource_limits: ResourceLimits,
+    test_names: list[str],
+    exit_first: bool = False,
+) -> TestResults:
+    """Runs the named tests. When not stopping at the first failure, the order doesn't matter, so
+    they're sharded across test runners to run in parallel."""
+    if exit_first:
+        report_json = await _TEST_RUNNER_POOL.get_test_report(
+            workspace.tests_file,
+            resource_limits=resource_limits,
+            timeout=240,
+            test_names=test_names,
+            exit_first=True,
+        )
+    else:
+        report_json = await _get_sharded_test_report(
+            workspace.tests_file, resource_limits=resource_limits, test_names=test_names
+        )
+    if report_json is None:
+        # The warm worker crashed, so fallback to a fresh subprocess to get an actual report.
+        stdout, stderr, _ = await _run_subprocess(
+            [
+                "python",
+                "-m",
+                "agent.adventofcode.execute_generated_code",
+                "get-test-report",
+                f"--test-file={workspace.tests_file}",
+                # Unsharded, so only needs to narrow down the tests for a partial run.
+                *(
+                    [f"--test-name={test_name}" for test_name in test_names] + ["--exit-first"]
+                    if exit_first
+                    else []
+                ),
+                *_fmt_resource_limits_options(resource_limits),
+            ],
+            timeout=240,
+        )
+        try:
+            report_json = json.loads(stdout)
+        except json.JSONDecodeError:
+            # Even a fresh process died before reporting (e.g. the generated code called
+            # `os._exit()`), which is still something that the agent needs to go fix.
+            return TestResults(
+                result=TestResults.Failure(
+                    err_msg=f"The test process crashed without reporting any test results:\n{stderr}"  # noqa: E501
+                )
+            )
+
+    record_unit_test_outcomes(workspace.tests_file, report_json, partial=exit_first)
+    test_results = _parse_test_report(report_json)
+    # Added to the pytest report by the test runner itself.
+    if report_json.get("resource_usage") is not None:
+        test_results.resource_usage = ResourceUsage.model_validate(report_json["resource_usage"])
+    return test_results
+
+
+def _get_test_function_names(tests_src: str) -> list[str]:
+    """The tests (or test classes) that pytest would collect from the tests file, in order."""
+    return [
+        stmt.name
+        for stmt in ast.parse(tests_src).body
+        if (
+            isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef))
+            and stmt.name.startswith("test")
+        )
+        or (isinstance(stmt, ast.ClassDef) and stmt.name.startswith("Test"))
+    ]
+
+
+async def _get_sharded_test_report(
+    test_file: str, resource_limits: ResourceLimits, test_names: list[str]
+) -> dict[str, Any] | None:
+    """Runs the tests split into shards across the test runner pool, merging the shards' reports
+    back into a single report as if all the tests had run in one pytest process. None if any shard's
+    test runner crashed before reporting."""
+    num_shards = min(len(test_names), _MAX_TEST_SHARDS)
+    if num_shards <= 1:
+        # Nothing to gain from sharding, and this still runs everything pytest would collect even
+        # if the tests couldn't be listed statically.
+        return await _TEST_RUNNER_POOL.get_test_report(
+            test_file, resource_limits=resource_limits, timeout=240
+        )
+    shard_reports = await asyncio.gather(
+        *(
+            _TEST_RUNNER_POOL.get_test_report(
+                test_file,
+                resource_limits=resource_limits,
+                timeout=240,
+                test_names=test_names[shard::num_shards],
+            )
+            for shard in range(num_shards)
+        )
     )
-    report_json = json.loads(result.stdout)
+    if any(shard_report is None for shard_report in shard_reports):
+        return None
+    return _merge_test_reports([r for r in shard_reports if r is not None], test_names)
+
+
+def _merge_test_reports(
+    shard_reports: list[dict[str, Any]], test_names: list[str]
+) -> dict[str, Any]:
+    """Keeps the exit code semantics that `_parse_test_report()` relies on: 2 if the tests couldn't
+    even be collected (in which case every shard fails the same way), else 1 if any test failed."""
+    if collection_failure := next((r for r in shard_reports if r["exitcode"] == 2), None):
+        return collection_failure
+    # Any other shard that pytest couldn't run at all (e.g. a usage error) must not be masked by the
+    # test failures in the rest of the shards, just as it wouldn't have been in a single run.
+    if broken_shard := next((r for r in shard_reports if r["exitcode"] not in (0, 1, 5)), None):
+        return broken_shard
+
+    def test_order(test: dict[str, Any]) -> int:
+        test_name = test["nodeid"].split("::", 1)[1].split("::")[0].split("[")[0]
+        return test_names.index(test_name) if test_name in test_names else len(test_names)
+
+    summary: Counter[str] = Counter()
+    for shard_report in shard_reports:
+        summary.update(shard_report["summary"])
+    shard_usages = [
+        ResourceUsage.model_validate(r["resource_usage"])
+        for r in shard_reports
+        if r.get("resource_usage") is not None
+    ]
+    return {
+        # A shard with nothing to collect (e.g. an empty test class) exits with 5, which is fine.
+        "exitcode": 1 if any(r["exitcode"] == 1 for r in shard_reports) else 0,
+        "summary": dict(summary),
+        "collectors": [c for r in shard_reports for c in r.get("collectors", [])],
+        # Stable sort, so parametrized cases stay in order within each test.
+        "tests": sorted((t for r in shard_reports for t in r["tests"]), key=test_order),
+        "resource_usage": ResourceUsage(
+            cpu_user_secs=round(sum(u.cpu_user_secs for u in shard_usages), 3),
+            cpu_system_secs=round(sum(u.cpu_system_secs for u in shard_usages), 3),
+            # Each shard ran in its own process, so the peak of any single one of them.
+            peak_rss_mb=max(u.peak_rss_mb for u in shard_usages),
+            major_page_faults=sum(u.major_page_faults for u in shard_usages),
+            minor_page_faults=sum(u.minor_page_faults for u in shard_usages),
+            exceeded_limit=next((u.exceeded_limit for u in shard_usages if u.exceeded_limit), None),
+        ).model_dump()
+        if shard_usages
+        else None,
+    }
+
+
+async def execute_candidate_tests(
+    unit_tests_src: str,
+    implementation_src: str,
+    resource_limits: ResourceLimits | None = None,
+    tested_function_name: str | None = None,
+) -> TestResults:
+    """Execute the given tests against a candidate implementation in its own ephemeral workspace, so
+    that multiple candidate implementations for the same problem part can be tested concurrently."""
+    with ephemeral_workspace(
+        solution_src=implementation_src, tests_src=unit_tests_src
+    ) as workspace:
+        return await execute_tests(
+            workspace, resource_limits=resource_limits, tested_function_name=tested_function_name
+        )
+
 
+def _parse_test_report(report_json: dict[str, Any]) -> TestResults:
     match report_json["exitcode"]:
         case 0:
             return TestResults(result=TestResults.Success())
         case 2:
             # The tests themselves are broken.
-            test_file = f"advent_of_code/year{year}/day{day}/part{part}/tests.py"
             return TestResults(
                 result=TestResults.Failure(
                     err_msg=next(
-                        x["longrepr"] for x in report_json["collectors"] if x["nodeid"] == test_file
+                        x["longrepr"]
+                        for x in report_json["collectors"]
+                        if x["outcome"] == "failed"
                     )
                 )
             )
@@ -138,36 +981,132 @@ def _fmt_unit_test_failure_msg(unit_test_failure: dict[str, Any]) -> str:
 
 
 @cli_group.command()
-@click.option("--year", required=True)
-@click.option("--day", required=True)
-@click.option("--part", type=click.Choice(["1", "2"]), default="1")
+@click.option("--test-file", required=True)
+@click.option(
+    "--test-name",
+    "test_names",
+    multiple=True,
+    help="Only run these tests, in order. Defaults to all of them.",
+)
+@click.option("--exit-first", is_flag=True, help="Stop at the first failing test.")
+@click.option("--max-memory-mb", type=int, default=None)
+@click.option("--max-cpu-secs", type=int, default=None)
 def get_test_report(
-    year: int,
-    day: int,
-    part: str,  # type: ignore - Need to redeclare with a cast after parsing into an int.
+    test_file: str,
+    test_names: tuple[str, ...],
+    exit_first: bool,
+    max_memory_mb: int | None,
+    max_cpu_secs: int | None,
 ) -> None:
-    part: ProblemPart = cast(ProblemPart, part)
+    report = _run_pytest_with_limits(
+        test_file,
+        ResourceLimits(max_memory_mb=max_memory_mb, max_cpu_secs=max_cpu_secs),
+        test_names=list(test_names) or None,
+        exit_first=exit_first,
+    )
+    print(json.dumps(report, indent=4))
+
+
+@cli_group.command()
+def test_runner_worker() -> None:
+    """Serve test runs to a `TestRunnerPool` until stdin is closed.
+
+    Requests are single JSON lines like `{"test_file": "...", "resource_limits": {...},
+    "test_names": [...], "exit_first": false}` on stdin, and each is answered with the pytest JSON
+    report as a single line on stdout. The test names are optional, see `_run_pytest()`.
+    """
+    # The generated code is free to print whatever it wants, or even read stdin, so move the actual
+    # protocol pipes out of its way.
+    requests = os.fdopen(os.dup(sys.stdin.fileno()), "r")
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(os.open(os.devnull, os.O_RDONLY), sys.stdin.fileno())
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    orig_cwd = os.getcwd()
+    orig_sys_path = list(sys.path)
+    orig_modules = set(sys.modules)
+    for request in requests:
+        request = json.loads(request)
+        report = _run_pytest_with_limits(
+            request["test_file"],
+            ResourceLimits.model_validate(request["resource_limits"]),
+            test_names=request.get("test_names"),
+            exit_first=request.get("exit_first", False),
+        )
+        responses.write(json.dumps(report) + "\n")
+        responses.flush()
+
+        # Forget everything the tests imported so that the next run picks up the latest changes.
+        for module_name in set(sys.modules) - orig_modules:
+            if _is_generated_code_module(module_name):
+                del sys.modules[module_name]
+        sys.path[:] = orig_sys_path
+        os.chdir(orig_cwd)
+
+
+_INSTALLED_CODE_DIRS = tuple(
+    {sysconfig.get_path(p) for p in ("stdlib", "platstdlib", "purelib", "platlib")}
+)
+
 
+def _is_generated_code_module(module_name: str) -> bool:
+    if module_name.split(".")[0] in ("advent_of_code", "solution", "tests", "conftest"):
+        return True
+    # Also catch any other local modules that the generated code may have imported, but leave any
+    # installed libraries loaded since that's the whole point of keeping the worker warm.
+    module_file = getattr(sys.modules[module_name], "__file__", None)
+    return module_file is not None and not module_file.startswith(_INSTALLED_CODE_DIRS)
+
+
+def _run_pytest_with_limits(
+    test_file: str,
+    resource_limits: ResourceLimits,
+    test_names: list[str] | None = None,
+    exit_first: bool = False,
+) -> dict[str, Any]:
+    with limited_resources(resource_limits) as accounting:
+        report = _run_pytest(test_file, test_names=test_names, exit_first=exit_first)
+    assert accounting.usage is not None, "Usage is always accounted for on exit."
+    report["resource_usage"] = accounting.usage.model_dump()
+    return report
+
+
+def _run_pytest(
+    test_file: str, test_names: list[str] | None = None, exit_first: bool = False
+) -> dict[str, Any]:
+    """Runs every test in the file, or if given, only the named tests in the given order."""
     # I need to prevent Pytest from writing useless logs to stdout, I literally just want the JSON
     # report from the plugin.
     orig_stdout = sys.stdout
     sys.stdout = io.StringIO()  # Throw away any output.
 
     plugin = JSONReport()
-    pytest.main(
-        [
-            "--quiet",
-            # Make sure that the tests get timed out and terminated. Don't want to let some
-            # complicated AoC problem hang forever.
-            "--timeout=60",
-            "--json-report-file=none",
-            f"advent_of_code/year{year}/day{day}/part{part}/tests.py",
-        ],
-        plugins=[plugin],
-    )
-
-    sys.stdout = orig_stdout  # Return to writing to stdout.
-    print(json.dumps(plugin.report, indent=4))
+    try:
+        pytest.main(
+            [
+                "--quiet",
+                # Make sure that the tests get timed out and terminated. Don't want to let some
+                # complicated AoC problem hang forever.
+                "--timeout=60",
+                "--json-report-file=none",
+                *(["--exitfirst"] if exit_first else []),
+                *(
+                    [f"{test_file}::{test_name}" for test_name in test_names]
+                    if test_names
+                    else [test_file]
+                ),
+            ],
+            plugins=[plugin],
+        )
+    finally:
+        sys.stdout = orig_stdout  # Return to writing to stdout.
+    report = plugin.report
+    if report["exitcode"] == 4 and any(c["outcome"] == "failed" for c in report["collectors"]):
+        # When asked for specific tests that couldn't be collected (e.g. the tests file raises on
+        # import), pytest reports a usage error rather than the collection error it'd report if it
+        # had been asked for the whole file.
+        report["exitcode"] = 2
+    return report
 
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+import hashlib
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+
+@dataclass
+class ExecutionCacheConfig:
+    # Least recently used results get evicted past this many. Results are small (the biggest are
+    # test failure messages), so this is more about bounding memory than about any real pressure.
+    max_entries: int = 512
+
+
+@dataclass
+class ExecutionCacheMetrics:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = 100 * self.hits / lookups if lookups else 0
+        return (
+            f"{self.hits} hits, {self.misses} misses ({hit_rate:.0f}% hit rate), "
+            f"{self.evictions} evictions"
+        )
+
+
+_CONFIG = ExecutionCacheConfig()
+_METRICS = ExecutionCacheMetrics()
+# Keyed by `get_execution_cache_key(...)`, ordered from least to most recently used.
+_CACHE: OrderedDict[str, Any] = OrderedDict()
+
+
+def configure_execution_cache(config: ExecutionCacheConfig) -> None:
+    global _CONFIG
+    _CONFIG = config
+    _evict()
+
+
+def get_execution_cache_metrics() -> ExecutionCacheMetrics:
+    return _METRICS
+
+
+def get_execution_cache_key(
+    kind: Literal["tests", "solution"],
+    files: list[str | None],
+    resource_limits: BaseModel,
+) -> str:
+    """Content-addressed key over everything that determines the outcome of running generated code:
+    the contents of every file involved, the limits it runs under, and the Python version.
+
+    None stands in for a file that isn't involved at all.
+    """
+    key = hashlib.sha256()
+    for part in (kind, sys.version, resource_limits.model_dump_json()):
+        key.update(part.encode())
+        key.update(b"\0")
+    for path in files:
+        if path is None:
+            key.update(b"<none>")
+        else:
+            with open(path, "rb") as f:
+                key.update(hashlib.sha256(f.read()).digest())
+        key.update(b"\0")
+    return key.hexdigest()
+
+
+def lookup_execution_result(cache_key: str) -> Any | None:
+    if cache_key not in _CACHE:
+        _METRICS.misses += 1
+        return None
+    _METRICS.hits += 1
+    _CACHE.move_to_end(cache_key)
+    return _CACHE[cache_key]
+
+
+def store_execution_result(cache_key: str, result: Any) -> None:
+    _CACHE[cache_key] = result
+    _CACHE.move_to_end(cache_key)
+    _evict()
+
+
+def _evict() -> None:
+    while len(_CACHE) > _CONFIG.max_entries:
+        _CACHE.popitem(last=False)
+        _METRICS.evictions += 1
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+from pydantic import BaseModel
+
+from agent.adventofcode.problem_part import ProblemPart
+
+# Generated code gets written and then immediately executed (often many times over while debugging),
+# so put ephemeral workspaces on tmpfs when it's available to keep all of that off the disk.
+_EPHEMERAL_WORKSPACES_PARENT_DIR = (
+    "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+)
+# Stands in for a workspace's root dir in anything that outlives the workspace (e.g. cached
+# results), since the exact same code often gets run again later from a different workspace.
+_WORKSPACE_DIR_PLACEHOLDER = "<workspace>"
+
+
+class ExecutionWorkspace(BaseModel):
+    """A self-contained dir to execute generated code in.
+
+    Holds its own `solution.py` and `tests.py`, with the tests importing the implementation as the
+    top-level `solution` module. Nothing outside of the workspace is referenced by module path, so
+    any number of workspaces can be executed concurrently without clobbering each other.
+    """
+
+    root_dir: str
+    # The problem input lives outside of the part's dir for the committed solutions, since it's
+    # shared between part 1 and part 2.
+    input_file: str | None = None
+
+    @property
+    def solution_file(self) -> str:
+        return os.path.join(self.root_dir, "solution.py")
+
+    @property
+    def tests_file(self) -> str:
+        return os.path.join(self.root_dir, "tests.py")
+
+    def to_portable_paths(self, text: str) -> str:
+        """Replaces this workspace's paths in the text (e.g. in a traceback) with a placeholder, so
+        that they can be pointed at another workspace with its `from_portable_paths()`."""
+        for root_dir in dict.fromkeys([os.path.abspath(self.root_dir), self.root_dir]):
+            text = text.replace(root_dir, _WORKSPACE_DIR_PLACEHOLDER)
+        return text
+
+    def from_portable_paths(self, text: str) -> str:
+        return text.replace(_WORKSPACE_DIR_PLACEHOLDER, self.root_dir)
+
+    @staticmethod
+    def for_problem_part(year: int, day: int, part: ProblemPart) -> "ExecutionWorkspace":
+        """The workspace for the solution that's actually committed to `advent_of_code/`."""
+        return ExecutionWorkspace(
+            root_dir=f"advent_of_code/year{year}/day{day}/part{part}",
+            input_file=f"advent_of_code/year{year}/day{day}/input.txt",
+        )
+
+
+@contextmanager
+def ephemeral_workspace(
+    solution_src: str, tests_src: str | None = None, problem_input: str | None = None
+) -> Iterator[ExecutionWorkspace]:
+    """Writes the given generated code into a brand new throwaway workspace."""
+    workspace = ExecutionWorkspace(
+        root_dir=tempfile.mkdtemp(prefix="aoc-workspace-", dir=_EPHEMERAL_WORKSPACES_PARENT_DIR)
+    )
+    try:
+        _write_file(workspace.solution_file, solution_src)
+        if tests_src is not None:
+            _write_file(workspace.tests_file, tests_src)
+        if problem_input is not None:
+            workspace.input_file = os.path.join(workspace.root_dir, "input.txt")
+            _write_file(workspace.input_file, problem_input)
+        yield workspace
+    finally:
+        shutil.rmtree(workspace.root_dir, ignore_errors=True)
+
+
+def _write_file(path: str, content: str) -> None:
+    with open(path, "w") as f:
+        f.write(content)
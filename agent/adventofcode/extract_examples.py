@@ -10,6 +10,7 @@ from agent.adventofcode.scrape_problems import ProblemPart, scrape_aoc
 from agent.llm.gemini.configure_genai import configure_genai
 from agent.llm.gemini.models import GeminiModel
 from agent.llm.gemini.prompt import ModelMessage, UserMessage, prompt
+from agent.llm.usage.LLMRouter import route_model
 
 
 class AoCProblemExtractedExamples(BaseModel):
@@ -43,7 +44,11 @@ IMPORTANT! You MUST return examples with a SINGLE input mapping to its SINGLE co
 """  # noqa: E501
     extracted_examples = (
         await prompt(
-            model=GeminiModel.GEMINI_1_5_PRO,
+            model=await route_model(
+                "extract-examples",
+                candidates=[GeminiModel.GEMINI_1_5_PRO, GeminiModel.GEMINI_1_5_FLASH],
+                default=GeminiModel.GEMINI_1_5_PRO,
+            ),
             subtask_name="extract-examples",
             system_prompt=system_prompt_text,
             prompt=problem_html,
@@ -54,7 +59,11 @@ IMPORTANT! You MUST return examples with a SINGLE input mapping to its SINGLE co
     if len(extracted_examples.examples) == 0:
         extracted_examples = (
             await prompt(
-                model=GeminiModel.GEMINI_1_5_PRO,
+                model=await route_model(
+                    "extract-examples-retry",
+                    candidates=[GeminiModel.GEMINI_1_5_PRO, GeminiModel.GEMINI_1_5_FLASH],
+                    default=GeminiModel.GEMINI_1_5_PRO,
+                ),
                 subtask_name="extract-examples-retry",
                 system_prompt=system_prompt_text,
                 prompt=[
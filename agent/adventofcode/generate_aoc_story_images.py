@@ -8,7 +8,7 @@ from agent.adventofcode.scrape_problems import scrape_aoc
 from agent.llm.gemini.configure_genai import configure_genai
 from agent.llm.gemini.models import GeminiModel
 from agent.llm.gemini.prompt import prompt, text_prompt
-from agent.llm.openai.generate_image import download_image, generate_image_to_url
+from agent.llm.openai.generate_image import generate_image
 
 
 class ProblemStorySummary(BaseModel):
@@ -137,8 +137,8 @@ async def main(
     image_generation_prompt = await format_image_generation_prompt(problem_story_summary)
     print(image_generation_prompt)
 
-    url = await generate_image_to_url(image_generation_prompt)
-    await download_image(url, save_path)
+    async with aiohttp.ClientSession() as session:
+        await generate_image(session, image_generation_prompt, save_path)
 
 
 if __name__ == "__main__":
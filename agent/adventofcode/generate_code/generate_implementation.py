@@ -27,6 +27,17 @@ from agent.llm.gemini.prompt import (
     UserMessage,
     prompt as gemini_prompt,
 )
+from agent.llm.usage.LLMRouter import route_model
+from agent.llm.usage.TokenEstimator import estimate_prompt_tokens, pick_by_prompt_size
+
+# The whole program comes back wrapped in JSON, which runs long for bigger problems (e.g. part 2,
+# which gets all of part 1's solution to build on), so the bigger the prompt the more room the
+# response gets. Keyed by max (estimated) input tokens.
+_INITIAL_ATTEMPT_MAX_TOKENS_BY_PROMPT_SIZE = [(4_000, 2_000)]
+_INITIAL_ATTEMPT_MAX_TOKENS = 4_096
+# The debugging prompt history keeps growing with every iteration, and past this point the more
+# capable model would take far too long to get through it.
+_MAX_DEBUGGING_PRO_MODEL_PROMPT_TOKENS = 32_000
 
 
 class GenerateImplementationOutput(PromptHistory, BaseModel):
@@ -80,6 +91,7 @@ async def generate_implementation(
     solve_part_2: bool,
     part_1_generated_implementation: GenerateImplementationOutput | None = None,
     debugging_prompt: DebuggingPrompt | None = None,
+    initial_attempt_model: AnthropicModel | GeminiModel = AnthropicModel.CLAUDE_SONNET_3_5_OCT_2024,
 ) -> GenerateImplementationOutput:
     generate_implementation_prompt = _get_generate_implementation_prompt(
         problem_html=problem_html,
@@ -93,6 +105,10 @@ async def generate_implementation(
         part_1_generated_implementation=part_1_generated_implementation,
     )
 
+    estimated_prompt_tokens = estimate_prompt_tokens(
+        system_prompt=INITIAL_ATTEMPT_SYSTEM_PROMPT_TEXT, prompt=generate_implementation_prompt
+    )
+
     generated_implementation: GeneratedImplementation
     if debugging_prompt:
 
@@ -106,14 +122,27 @@ async def generate_implementation(
                     "The implementation was not actually updated based on the debugging prompt."
                 )
 
+        candidate_models = pick_by_prompt_size(
+            estimated_prompt_tokens,
+            tiers=[
+                (
+                    _MAX_DEBUGGING_PRO_MODEL_PROMPT_TOKENS,
+                    [GeminiModel.GEMINI_2_0_FLASH_EXP, GeminiModel.GEMINI_1_5_PRO],
+                )
+            ],
+            default=[GeminiModel.GEMINI_2_0_FLASH_EXP],
+        )
         attempts = 0
         MAX_RETRIES = 3
         while True:
             attempts += 1
             match await gemini_prompt(
-                # model=GeminiModel.GEMINI_1_5_PRO,
                 # model=GeminiModel.GEMINI_EXP_1206,
-                model=GeminiModel.GEMINI_2_0_FLASH_EXP,
+                model=await route_model(
+                    "generate-implementation",
+                    candidates=candidate_models,
+                    default=GeminiModel.GEMINI_2_0_FLASH_EXP,
+                ),
                 subtask_name="generate-implementation",
                 system_prompt=INITIAL_ATTEMPT_SYSTEM_PROMPT_TEXT,
                 prompt=generate_implementation_prompt,
@@ -135,15 +164,32 @@ async def generate_implementation(
                         continue  # Just being explicit here that this is when we loop.
     else:
         assert isinstance(generate_implementation_prompt[0], UserMessage), "Lazy coding"
-        generated_implementation = (
-            await anthropic_prompt(
-                model=AnthropicModel.CLAUDE_SONNET_3_5_OCT_2024,
-                subtask_name="generate-implementation",
-                system_prompt=INITIAL_ATTEMPT_SYSTEM_PROMPT_TEXT,
-                prompt=generate_implementation_prompt[0].msg,
-                response_type=GeneratedImplementation,
-            )
-        ).unwrap()
+        match initial_attempt_model:
+            case AnthropicModel():
+                generated_implementation = (
+                    await anthropic_prompt(
+                        model=initial_attempt_model,
+                        subtask_name="generate-implementation",
+                        system_prompt=INITIAL_ATTEMPT_SYSTEM_PROMPT_TEXT,
+                        prompt=generate_implementation_prompt[0].msg,
+                        response_type=GeneratedImplementation,
+                        max_tokens=pick_by_prompt_size(
+                            estimated_prompt_tokens,
+                            tiers=_INITIAL_ATTEMPT_MAX_TOKENS_BY_PROMPT_SIZE,
+                            default=_INITIAL_ATTEMPT_MAX_TOKENS,
+                        ),
+                    )
+                ).unwrap()
+            case GeminiModel():
+                generated_implementation = (
+                    await gemini_prompt(
+                        model=initial_attempt_model,
+                        subtask_name="generate-implementation",
+                        system_prompt=INITIAL_ATTEMPT_SYSTEM_PROMPT_TEXT,
+                        prompt=generate_implementation_prompt,
+                        response_type=GeneratedImplementation,
+                    )
+                ).unwrap()
 
     return GenerateImplementationOutput(
         prompt_history=[
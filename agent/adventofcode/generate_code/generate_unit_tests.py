@@ -27,6 +27,7 @@ from agent.llm.gemini.prompt import (
     UserMessage,
     prompt as gemini_prompt,
 )
+from agent.llm.usage.LLMRouter import route_model
 
 
 class GenerateUnitTestsOutput(PromptHistory, BaseModel):
@@ -60,11 +61,15 @@ IMPORTANT: Only generate unit tests for the given POSITIVE examples of valid inp
         debugging_prompt=debugging_prompt,
     )
     # The initial prompt will use the more capable Clause Sonnet 3.5 model, but subsequent debugging
-    # requests will use Gemini 1.5 Pro.
+    # requests will use Gemini (1.5 Pro, unless history shows Flash is faster and just as reliable).
     if debugging_prompt:
         generated_unit_tests = (
             await gemini_prompt(
-                model=GeminiModel.GEMINI_1_5_PRO,
+                model=await route_model(
+                    "generate-unit-tests",
+                    candidates=[GeminiModel.GEMINI_1_5_PRO, GeminiModel.GEMINI_1_5_FLASH],
+                    default=GeminiModel.GEMINI_1_5_PRO,
+                ),
                 subtask_name="generate-unit-tests",
                 system_prompt=system_prompt_text,
                 prompt=generate_unit_tests_prompt,
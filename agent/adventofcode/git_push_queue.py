@@ -0,0 +1,125 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from agent.adventofcode.process_group import kill_process_group
+
+_REMOTE = "origin"
+_BRANCH = "main"
+
+
+@dataclass
+class GitMetrics:
+    commits: int = 0
+    commit_secs: float = 0
+    pushes: int = 0
+    pushed_commits: int = 0
+    push_secs: float = 0
+    failed_pushes: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"{self.commits} commits ({self.commit_secs:.1f}s), "
+            f"{self.pushes} pushes of {self.pushed_commits} commits ({self.push_secs:.1f}s), "
+            f"{self.failed_pushes} failed pushes"
+        )
+
+
+_METRICS = GitMetrics()
+
+
+def get_git_metrics() -> GitMetrics:
+    return _METRICS
+
+
+async def run_git(*args: str) -> tuple[int, str, str]:
+    """Runs the git command without blocking the event loop, returning its exit code, stdout and
+    stderr."""
+    proc = await asyncio.create_subprocess_exec(
+        "git",
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+    try:
+        stdout, stderr = await proc.communicate()
+    except BaseException:
+        kill_process_group(proc)
+        raise
+    assert proc.returncode is not None, "The process should've exited by now."
+    return proc.returncode, stdout.decode(), stderr.decode()
+
+
+class CoalescedGitPusher:
+    """Pushes local commits in the background, coalescing all commits made within `push_window` of
+    each other into a single push so that the network round trip stays off of the critical path.
+
+    There's no separate queue to persist. The unpushed commits on the local branch *are* the durable
+    queue, so if the worker dies before pushing them they'll simply go out with the next push (e.g.
+    `push_pending_commits()` at the next worker startup).
+    """
+
+    def __init__(self, push_window: timedelta):
+        self._push_window = push_window
+        self._push_lock: asyncio.Lock | None = None
+        self._scheduled_push: asyncio.Task | None = None
+
+    def request_push(self) -> None:
+        """Push soon, along with anything else committed before then. Returns immediately."""
+        if self._scheduled_push is None or self._scheduled_push.done():
+            self._scheduled_push = asyncio.get_running_loop().create_task(self._push_later())
+
+    async def flush(self) -> None:
+        """Push any unpushed commits right now, waiting until they've been pushed."""
+        if self._scheduled_push is not None and not self._scheduled_push.done():
+            self._scheduled_push.cancel()
+        await self._push()
+
+    async def _push_later(self) -> None:
+        await asyncio.sleep(self._push_window.total_seconds())
+        # Past this point `flush()` waits for this push rather than cancelling it, and any further
+        # requests schedule another push for any commits that this one misses.
+        self._scheduled_push = None
+        try:
+            await self._push()
+        except Exception as e:
+            # Nothing is lost, the commits will just go out with the next push instead.
+            print(f"Background git push failed: {e}")
+
+    async def _push(self) -> None:
+        if self._push_lock is None:
+            self._push_lock = asyncio.Lock()
+        async with self._push_lock:
+            unpushed_commits = await _count_unpushed_commits()
+            if unpushed_commits == 0:
+                return
+
+            start = time.monotonic()
+            returncode, _, stderr = await run_git("push", _REMOTE, _BRANCH)
+            if returncode != 0:
+                _METRICS.failed_pushes += 1
+                raise RuntimeError(f"`git push {_REMOTE} {_BRANCH}` failed:\n{stderr}")
+            push_secs = time.monotonic() - start
+            _METRICS.pushes += 1
+            _METRICS.pushed_commits += unpushed_commits or 0
+            _METRICS.push_secs += push_secs
+            print(f"Pushed {unpushed_commits or 'all'} commit(s) in {push_secs:.1f}s.")
+
+
+async def _count_unpushed_commits() -> int | None:
+    """None if it's unknown (e.g. the remote branch hasn't been fetched yet), so push anyway."""
+    returncode, stdout, _ = await run_git("rev-list", "--count", f"{_REMOTE}/{_BRANCH}..{_BRANCH}")
+    return int(stdout) if returncode == 0 else None
+
+
+_PUSHER = CoalescedGitPusher(push_window=timedelta(seconds=30))
+
+
+def request_push() -> None:
+    _PUSHER.request_push()
+
+
+async def push_pending_commits() -> None:
+    await _PUSHER.flush()
@@ -0,0 +1,155 @@
+import ast
+import sys
+
+from result import Err, Ok, Result
+
+# Modules that the generated tests may import on top of the stdlib.
+_ALLOWED_TESTS_IMPORTS = {"pytest", "solution"}
+# Calls that open files, which the solution must never do since it only reads the input from stdin.
+_FILE_OPENING_CALLS = {"open", "io.open", "os.open", "codecs.open"}
+
+
+def precheck_generated_code(
+    solution_src: str, tests_src: str | None, tested_function_name: str | None = None
+) -> Result[None, str]:
+    """Statically checks the generated code for mistakes that don't need any execution at all to
+    find, e.g. syntax errors, a missing `solution()` function, or importing third party libraries.
+
+    Only ever parses the code, so it's fast enough (milliseconds) to run before every single test
+    run, saving spawning pytest only to have it fail on collection. Errs with a message describing
+    every problem found, in the same spirit as a test failure message.
+    """
+    problems: list[str] = []
+    solution_module = _parse("solution.py", solution_src, problems)
+    tests_module = _parse("tests.py", tests_src, problems) if tests_src is not None else None
+
+    if solution_module is not None:
+        defined_names = _get_module_level_names(solution_module)
+        _check_solution_function(solution_module, problems)
+        if defined_names is not None:
+            if tested_function_name is not None and tested_function_name not in defined_names:
+                problems.append(
+                    f"solution.py is missing the tested function `{tested_function_name}()`."
+                )
+            if tests_module is not None:
+                for name in _get_names_imported_from_solution(tests_module):
+                    if name not in defined_names and name != tested_function_name:
+                        problems.append(
+                            f"tests.py imports `{name}` from solution.py, but solution.py doesn't define it."  # noqa: E501
+                        )
+        _check_imports("solution.py", solution_module, allowed=set(), problems=problems)
+        _check_no_files_opened(solution_module, problems)
+    if tests_module is not None:
+        _check_imports("tests.py", tests_module, allowed=_ALLOWED_TESTS_IMPORTS, problems=problems)
+
+    if problems:
+        return Err(
+            "Static checks of the generated code failed (before running any tests):\n"
+            + "\n".join(f"- {problem}" for problem in problems)
+        )
+    return Ok(None)
+
+
+def _parse(filename: str, src: str, problems: list[str]) -> ast.Module | None:
+    try:
+        return ast.parse(src, filename=filename)
+    except SyntaxError as e:
+        problems.append(
+            f"{filename} has a syntax error at line {e.lineno}: {e.msg}\n"
+            f"    {(e.text or '').strip()}"
+        )
+        return None
+
+
+def _check_solution_function(solution_module: ast.Module, problems: list[str]) -> None:
+    solution_fn = next(
+        (
+            stmt
+            for stmt in solution_module.body
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef))
+            and stmt.name == "solution"
+        ),
+        None,
+    )
+    if solution_fn is None:
+        problems.append("solution.py is missing the top-level `solution()` function.")
+        return
+    args = solution_fn.args
+    required_args = [
+        *(args.posonlyargs + args.args)[: len(args.posonlyargs + args.args) - len(args.defaults)],
+        *(arg for arg, default in zip(args.kwonlyargs, args.kw_defaults) if default is None),
+    ]
+    if required_args:
+        problems.append(
+            "The `solution()` function must take no args (it reads the problem input from stdin), "
+            f"but it requires: {', '.join(arg.arg for arg in required_args)}."
+        )
+
+
+def _get_module_level_names(module: ast.Module) -> set[str] | None:
+    """Every name bound at the top-level of the module, including within top-level if/try/with
+    blocks. None if that can't be known statically (i.e. there's a `from ... import *`)."""
+    names: set[str] = set()
+    stmts: list[ast.stmt] = list(module.body)
+    while stmts:
+        match stmts.pop():
+            case ast.FunctionDef(name=name) | ast.AsyncFunctionDef(name=name) | ast.ClassDef(
+                name=name
+            ):
+                names.add(name)
+            case ast.Import(names=aliases) | ast.ImportFrom(names=aliases):
+                for alias in aliases:
+                    if alias.name == "*":
+                        return None
+                    names.add(alias.asname or alias.name.split(".")[0])
+            case ast.Assign() | ast.AnnAssign() | ast.AugAssign() as assignment:
+                for node in ast.walk(assignment):
+                    if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                        names.add(node.id)
+            case ast.If() | ast.Try() | ast.With() | ast.For() | ast.While() as block:
+                for field in ("body", "orelse", "finalbody", "handlers"):
+                    for child in getattr(block, field, []):
+                        if isinstance(child, ast.ExceptHandler):
+                            stmts.extend(child.body)
+                        else:
+                            stmts.append(child)
+    return names
+
+
+def _get_names_imported_from_solution(tests_module: ast.Module) -> list[str]:
+    return [
+        alias.name
+        for node in ast.walk(tests_module)
+        if isinstance(node, ast.ImportFrom) and node.module == "solution" and node.level == 0
+        for alias in node.names
+        if alias.name != "*"
+    ]
+
+
+def _check_imports(
+    filename: str, module: ast.Module, allowed: set[str], problems: list[str]
+) -> None:
+    for node in ast.walk(module):
+        match node:
+            case ast.Import(names=aliases):
+                imported = [alias.name for alias in aliases]
+            case ast.ImportFrom(module=str(imported_module), level=0):
+                imported = [imported_module]
+            case _:
+                continue
+        for imported_module in imported:
+            top_level_module = imported_module.split(".")[0]
+            if top_level_module not in sys.stdlib_module_names and top_level_module not in allowed:
+                problems.append(
+                    f"{filename} imports `{imported_module}` at line {node.lineno}, but ONLY "
+                    "Python's stdlib may be used."
+                )
+
+
+def _check_no_files_opened(solution_module: ast.Module, problems: list[str]) -> None:
+    for node in ast.walk(solution_module):
+        if isinstance(node, ast.Call) and (called := ast.unparse(node.func)) in _FILE_OPENING_CALLS:
+            problems.append(
+                f"solution.py calls `{called}()` at line {node.lineno}, but it must NOT open any "
+                "files, the problem input is read from stdin."
+            )
@@ -0,0 +1,13 @@
+import asyncio
+import os
+import signal
+from contextlib import suppress
+
+
+def kill_process_group(proc: asyncio.subprocess.Process) -> None:
+    """Kills the process along with anything that it spawned itself (e.g. generated code that uses
+    multiprocessing). Only works for processes started with `start_new_session=True`."""
+    if proc.returncode is None:
+        # The process may have exited without having been reaped yet.
+        with suppress(ProcessLookupError):
+            os.killpg(proc.pid, signal.SIGKILL)
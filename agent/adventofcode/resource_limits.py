@@ -0,0 +1,127 @@
+import math
+import resource
+import signal
+import sys
+from contextlib import contextmanager
+from types import FrameType
+from typing import Iterator, Literal
+
+from pydantic import BaseModel
+
+
+class ResourceLimits(BaseModel):
+    """Limits on a single run of generated code, so that a runaway solution (e.g. unbounded
+    recursion, or allocating a list the size of the whole problem space) fails on its own instead of
+    taking the whole worker down with it. None means unlimited.
+
+    Intentionally doesn't default to the GENERATED_CODE_* settings, since this module gets imported
+    by every process running generated code, and those should never have to load the settings (and
+    with them, potentially fetch secrets). The worker configures the defaults from the settings
+    instead, see `configure_resource_limits()`, and passes them on to the processes explicitly.
+    """
+
+    # Caps the address space (RLIMIT_AS), so allocating past it raises a MemoryError.
+    max_memory_mb: int | None = None
+    # Caps the CPU time (RLIMIT_CPU) of this run, on top of whatever wall clock timeout applies.
+    max_cpu_secs: int | None = None
+
+
+class ResourceUsage(BaseModel):
+    cpu_user_secs: float
+    cpu_system_secs: float
+    # The peak of the whole process that ran the code, so for warm test runners (which are reused
+    # across runs) it's their peak across every run so far.
+    peak_rss_mb: float
+    major_page_faults: int
+    minor_page_faults: int
+    # Which limit the code ran into, if any.
+    exceeded_limit: Literal["memory", "cpu"] | None = None
+
+
+_DEFAULT_RESOURCE_LIMITS = ResourceLimits()
+
+
+def configure_resource_limits(limits: ResourceLimits) -> None:
+    """The limits used for any run of generated code that doesn't specify its own."""
+    global _DEFAULT_RESOURCE_LIMITS
+    _DEFAULT_RESOURCE_LIMITS = limits
+
+
+def get_resource_limits() -> ResourceLimits:
+    return _DEFAULT_RESOURCE_LIMITS
+
+
+class CPUTimeLimitExceeded(BaseException):
+    # Not an Exception, so that the generated code can't accidentally swallow it.
+    pass
+
+
+class ResourceAccounting:
+    """Usage within a `limited_resources()` context, only available once the context exits."""
+
+    def __init__(self) -> None:
+        self.usage: ResourceUsage | None = None
+        self.cpu_limit_exceeded = False
+
+
+@contextmanager
+def limited_resources(limits: ResourceLimits) -> Iterator[ResourceAccounting]:
+    """Applies the limits to the current process for the duration of this context, and accounts for
+    the resources used within it.
+
+    Only the soft limits are changed, and they're restored on exit, so this can be used over and
+    over within the same long-lived process (i.e. the warm test runners).
+    """
+    accounting = ResourceAccounting()
+    orig_memory_limit = resource.getrlimit(resource.RLIMIT_AS)
+    orig_cpu_limit = resource.getrlimit(resource.RLIMIT_CPU)
+
+    def exceed_cpu_limit(signum: int, frame: FrameType | None) -> None:
+        accounting.cpu_limit_exceeded = True
+        raise CPUTimeLimitExceeded(f"Exceeded the CPU time limit of {limits.max_cpu_secs}s.")
+
+    start = resource.getrusage(resource.RUSAGE_SELF)
+    if limits.max_memory_mb is not None:
+        _set_soft_limit(resource.RLIMIT_AS, limits.max_memory_mb * 2**20)
+    if limits.max_cpu_secs is not None:
+        # RLIMIT_CPU counts all the CPU time this process has ever used, not just this run's.
+        _set_soft_limit(
+            resource.RLIMIT_CPU,
+            math.ceil(start.ru_utime + start.ru_stime + limits.max_cpu_secs),
+        )
+        signal.signal(signal.SIGXCPU, exceed_cpu_limit)
+    exceeded_limit: Literal["memory", "cpu"] | None = None
+    try:
+        yield accounting
+    except MemoryError:
+        exceeded_limit = "memory"
+        raise
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, orig_memory_limit)
+        resource.setrlimit(resource.RLIMIT_CPU, orig_cpu_limit)
+        end = resource.getrusage(resource.RUSAGE_SELF)
+        accounting.usage = ResourceUsage(
+            cpu_user_secs=round(end.ru_utime - start.ru_utime, 3),
+            cpu_system_secs=round(end.ru_stime - start.ru_stime, 3),
+            peak_rss_mb=round(get_peak_rss_mb(), 1),
+            major_page_faults=end.ru_majflt - start.ru_majflt,
+            minor_page_faults=end.ru_minflt - start.ru_minflt,
+            exceeded_limit="cpu" if accounting.cpu_limit_exceeded else exceeded_limit,
+        )
+
+
+def _set_soft_limit(limit: int, soft: int) -> None:
+    _, hard = resource.getrlimit(limit)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    try:
+        resource.setrlimit(limit, (soft, hard))
+    except (ValueError, OSError) as e:
+        # E.g. macOS doesn't support limiting the address space.
+        print(f"Failed to apply resource limit {limit}: {e}", file=sys.stderr)
+
+
+def get_peak_rss_mb() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, but in KB on Linux.
+    return max_rss / 2**20 if sys.platform == "darwin" else max_rss / 2**10
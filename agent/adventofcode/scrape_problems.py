@@ -8,6 +8,7 @@ from bs4 import BeautifulSoup
 
 from agent.adventofcode._HEADERS import _HEADERS
 from agent.adventofcode.problem_part import ProblemPart
+from agent.http_client import aoc_request_slot, aoc_url
 import os
 
 
@@ -21,8 +22,8 @@ async def fetch_input(
             return f.read()
 
     # Otherwise, fetch the input from the Advent of Code servers.
-    url = f"https://adventofcode.com/{year}/day/{day}/input"
-    async with session.get(url, headers=_HEADERS) as response:
+    url = aoc_url(f"/{year}/day/{day}/input")
+    async with aoc_request_slot(), session.get(url, headers=_HEADERS) as response:
         input = await response.text()
         # Cache the input so we don't need to read it again later on.
         with open(input_file_path, "w") as f:
@@ -41,8 +42,8 @@ async def fetch_problem(
                 return f.read()
 
     # Otherwise, fetch the input from the Advent of Code servers.
-    url = f"https://adventofcode.com/{year}/day/{day}"
-    async with session.get(url, headers=_HEADERS) as response:
+    url = aoc_url(f"/{year}/day/{day}")
+    async with aoc_request_slot(), session.get(url, headers=_HEADERS) as response:
         problem_html = await response.text()
         if solutions_dir:
             # Cache the input so we don't need to read it again later on.
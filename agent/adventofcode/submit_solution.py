@@ -6,9 +6,11 @@ import os
 
 from agent.adventofcode.problem_part import ProblemPart
 from agent.adventofcode._HEADERS import _HEADERS
+from agent.http_client import aoc_request_slot, aoc_url
 
 
 async def submit(
+    session: aiohttp.ClientSession,
     year: int,
     day: int,
     part: ProblemPart,
@@ -33,24 +35,23 @@ async def submit(
                 click.echo("Wrong answer 😢")
                 return False
 
-    url = f"https://adventofcode.com/{year}/day/{day}/answer"
+    url = aoc_url(f"/{year}/day/{day}/answer")
 
     data = {"level": str(part), "answer": answer}
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=_HEADERS, data=data) as response:
-            text = await response.text()
-            if "That's the right answer" in text:
-                click.echo("Correct answer! 🎉")
-                # Write the solution to a file so that we can check against it next time.
-                with open(cached_solution_path, "w") as f:
-                    f.write(answer.strip())
-                return True
-            elif "That's not the right answer" in text:
-                click.echo("Wrong answer 😢")
-                return False
-            else:
-                raise ValueError(f"UNEXPECTED AoC ANSWER RESPONSE!\n{text}")
+    async with aoc_request_slot(), session.post(url, headers=_HEADERS, data=data) as response:
+        text = await response.text()
+        if "That's the right answer" in text:
+            click.echo("Correct answer! 🎉")
+            # Write the solution to a file so that we can check against it next time.
+            with open(cached_solution_path, "w") as f:
+                f.write(answer.strip())
+            return True
+        elif "That's not the right answer" in text:
+            click.echo("Wrong answer 😢")
+            return False
+        else:
+            raise ValueError(f"UNEXPECTED AoC ANSWER RESPONSE!\n{text}")
 
 
 @click.command()
@@ -71,9 +72,15 @@ async def cmd(
     answer: str,
     base_dir: str,
 ) -> bool:
-    return await submit(
-        year=year, day=day, part=cast(ProblemPart, int(part)), answer=answer, base_dir=base_dir
-    )
+    async with aiohttp.ClientSession() as session:
+        return await submit(
+            session=session,
+            year=year,
+            day=day,
+            part=cast(ProblemPart, int(part)),
+            answer=answer,
+            base_dir=base_dir,
+        )
 
 
 if __name__ == "__main__":
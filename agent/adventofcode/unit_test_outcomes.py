@@ -0,0 +1,72 @@
+import ast
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class UnitTestOutcome:
+    passed: bool
+    duration_secs: float
+
+
+# Only the most recently run tests files are remembered, since every candidate implementation gets
+# tested in its own throwaway workspace that'll never be run again.
+_MAX_TESTS_FILES = 64
+# Keyed by tests file, then by test name within the file (e.g. `test_example_1[case-2]`).
+_OUTCOMES_BY_TESTS_FILE: OrderedDict[str, dict[str, UnitTestOutcome]] = OrderedDict()
+
+
+def record_unit_test_outcomes(tests_file: str, report_json: dict[str, Any], partial: bool) -> None:
+    """Remembers the outcome of every test in the pytest JSON report. A partial run (i.e. of only
+    some of the tests) only updates the tests that it actually ran."""
+    outcomes = {
+        test["nodeid"].split("::", 1)[1]: UnitTestOutcome(
+            passed=test["outcome"] == "passed",
+            duration_secs=sum(
+                test[stage].get("duration", 0)
+                for stage in ("setup", "call", "teardown")
+                if stage in test
+            ),
+        )
+        for test in report_json.get("tests", [])
+    }
+    if partial:
+        outcomes = {**_OUTCOMES_BY_TESTS_FILE.get(tests_file, {}), **outcomes}
+    set_unit_test_outcomes(tests_file, outcomes)
+
+
+def get_unit_test_outcomes(tests_file: str) -> dict[str, UnitTestOutcome]:
+    """The last known outcome of every test in the tests file, keyed by test name."""
+    return dict(_OUTCOMES_BY_TESTS_FILE.get(tests_file, {}))
+
+
+def set_unit_test_outcomes(tests_file: str, outcomes: dict[str, UnitTestOutcome]) -> None:
+    """Replaces the outcomes remembered for the tests file, e.g. with ones that were recorded from
+    running the exact same tests in another workspace."""
+    _OUTCOMES_BY_TESTS_FILE[tests_file] = dict(outcomes)
+    _OUTCOMES_BY_TESTS_FILE.move_to_end(tests_file)
+    while len(_OUTCOMES_BY_TESTS_FILE) > _MAX_TESTS_FILES:
+        _OUTCOMES_BY_TESTS_FILE.popitem(last=False)
+
+
+def get_previously_failing_tests(tests_file: str, tests_src: str) -> list[str]:
+    """The names of the tests that failed the last time they were run, fastest first so that a
+    quick run surfaces a failure as soon as possible.
+
+    Tests that no longer exist in the tests file (e.g. because the tests were regenerated since) are
+    left out, since asking pytest for them would just fail outright.
+    """
+    defined_names = {
+        stmt.name
+        for stmt in ast.parse(tests_src).body
+        if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+    }
+    return [
+        test_name
+        for test_name, outcome in sorted(
+            _OUTCOMES_BY_TESTS_FILE.get(tests_file, {}).items(),
+            key=lambda test: test[1].duration_secs,
+        )
+        if not outcome.passed and test_name.split("::")[0].split("[")[0] in defined_names
+    ]
@@ -0,0 +1,164 @@
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Any
+
+from agent.adventofcode.process_group import kill_process_group
+from agent.adventofcode.resource_limits import ResourceLimits
+
+# A single pytest JSON report can be way bigger than asyncio's default 64KiB line limit.
+_MAX_REPORT_LINE_BYTES = 64 * 1024 * 1024
+
+
+@dataclass
+class _TestRunnerWorker:
+    proc: asyncio.subprocess.Process
+    runs: int = 0
+
+    def is_alive(self) -> bool:
+        return self.proc.returncode is None
+
+    def kill(self) -> None:
+        # Asyncio reaps the process (and closes its pipes) in the background once it has exited.
+        kill_process_group(self.proc)
+
+
+class TestRunnerPool:
+    """A pool of warm test runner processes.
+
+    Each worker is a long-lived `execute_generated_code test-runner-worker` process that has already
+    paid the cost of importing pytest and friends, and then just runs whichever tests file it's sent
+    over its stdin pipe, writing back the JSON report as a single line on its stdout pipe. Workers
+    are recycled after `max_runs_per_worker` runs so that any state leaked by generated code can't
+    accumulate for too long.
+
+    Everything here is async so that waiting on a slow test run never blocks the event loop (and
+    with it every other activity running on the same worker). Workers must only be used from the
+    one event loop that they were started on.
+    """
+
+    def __init__(self, worker_cmd: list[str], max_workers: int, max_runs_per_worker: int):
+        self._worker_cmd = worker_cmd
+        self._max_workers = max_workers
+        self._max_runs_per_worker = max_runs_per_worker
+        self._idle_workers: list[_TestRunnerWorker] = []
+
+    async def warm(self) -> None:
+        """Start up idle workers ahead of time so that the first test run doesn't pay for it."""
+        while len(self._idle_workers) < self._max_workers:
+            self._idle_workers.append(await self._spawn_worker())
+
+    async def get_test_report(
+        self,
+        test_file: str,
+        resource_limits: ResourceLimits,
+        timeout: float,
+        test_names: list[str] | None = None,
+        exit_first: bool = False,
+    ) -> dict[str, Any] | None:
+        """Returns the pytest JSON report of running the tests (all of them, or only the named ones)
+        under the given resource limits, or None if the worker crashed before reporting.
+
+        Raises TimeoutError if the worker doesn't report back within `timeout` seconds. If the
+        caller gets cancelled while waiting, the worker (and anything it spawned) is killed.
+        """
+        worker = await self._acquire_worker()
+        try:
+            report = await asyncio.wait_for(
+                self._request_test_report(
+                    worker,
+                    test_file=test_file,
+                    resource_limits=resource_limits,
+                    test_names=test_names,
+                    exit_first=exit_first,
+                ),
+                timeout=timeout,
+            )
+        except BaseException:
+            worker.kill()
+            await self._replace_worker()
+            raise
+
+        if report is None:
+            # The worker died without reporting (e.g. the generated code called `os._exit()`).
+            worker.kill()
+            await self._replace_worker()
+        else:
+            await self._release_worker(worker)
+        return report
+
+    def shutdown(self) -> None:
+        idle_workers, self._idle_workers = self._idle_workers, []
+        for worker in idle_workers:
+            worker.kill()
+
+    async def _spawn_worker(self) -> _TestRunnerWorker:
+        return _TestRunnerWorker(
+            proc=await asyncio.create_subprocess_exec(
+                *self._worker_cmd,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                # Its own process group, so that it can be killed along with anything it spawns.
+                start_new_session=True,
+                limit=_MAX_REPORT_LINE_BYTES,
+            )
+        )
+
+    async def _acquire_worker(self) -> _TestRunnerWorker:
+        # No lock needed, there's no await between checking and popping.
+        while self._idle_workers:
+            worker = self._idle_workers.pop()
+            if worker.is_alive():
+                return worker
+            worker.kill()
+        # Every warm worker is busy, so just pay the startup cost for a new one.
+        return await self._spawn_worker()
+
+    async def _release_worker(self, worker: _TestRunnerWorker) -> None:
+        worker.runs += 1
+        if worker.runs >= self._max_runs_per_worker:
+            worker.kill()
+            await self._replace_worker()
+            return
+        if len(self._idle_workers) < self._max_workers:
+            self._idle_workers.append(worker)
+            return
+        worker.kill()
+
+    async def _replace_worker(self) -> None:
+        # Start the replacement right away so it's already warm by the time it's needed.
+        if len(self._idle_workers) < self._max_workers:
+            worker = await self._spawn_worker()
+            # Other workers may have been released while this one was starting up.
+            if len(self._idle_workers) < self._max_workers:
+                self._idle_workers.append(worker)
+            else:
+                worker.kill()
+
+    @staticmethod
+    async def _request_test_report(
+        worker: _TestRunnerWorker,
+        test_file: str,
+        resource_limits: ResourceLimits,
+        test_names: list[str] | None,
+        exit_first: bool,
+    ) -> dict[str, Any] | None:
+        assert worker.proc.stdin and worker.proc.stdout, "Worker pipes should be open."
+        request = {
+            "test_file": test_file,
+            "resource_limits": resource_limits.model_dump(),
+            "test_names": test_names,
+            "exit_first": exit_first,
+        }
+        try:
+            worker.proc.stdin.write((json.dumps(request) + "\n").encode())
+            await worker.proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            return None
+
+        match await worker.proc.stdout.readline():
+            case b"":
+                return None  # EOF, the worker died.
+            case line:
+                return json.loads(line)
@@ -1,9 +1,15 @@
+import asyncio
 import os
-import subprocess
+import time
 
 from pydantic import BaseModel
 
 from agent.adventofcode import AoCProblem
+from agent.adventofcode.git_push_queue import get_git_metrics, request_push, run_git
+
+# Concurrently running workflows all commit to the same repo, so each one's writes through to its
+# `git commit` must happen without anyone else's changes getting staged in between.
+_GIT_COMMIT_LOCK: asyncio.Lock | None = None
 
 
 class FileToCommit(BaseModel):
@@ -11,33 +17,51 @@ class FileToCommit(BaseModel):
     content: str
 
 
-def write_and_commit_changes(
+async def write_and_commit_changes(
     basedir: str,
     files: list[FileToCommit],
     aoc_problem: AoCProblem,
     commit_message: str,
     dry_run: bool,
 ) -> None:
-    # Make the dir if it doesn't already exist.
-    os.makedirs(basedir, exist_ok=True)
-    for to_commit in files:
-        with open(os.path.join(basedir, to_commit.filename), "w") as f:
-            f.write(to_commit.content)
-
-    agent_commit_message = (
-        f"Coding-Agent ({aoc_problem.year}.{aoc_problem.day}.{aoc_problem.part}): {commit_message}"
-    )
-    print(agent_commit_message)
-    if not dry_run:
-        subprocess.run(["git", "add", basedir], check=True)
-
-        # Only commit if there are changes. This is to avoid a "nothing to commit" error.
-        if _has_staged_changes():
-            subprocess.run(["git", "commit", "-m", agent_commit_message], check=True)
-            subprocess.run(["git", "push", "origin", "main"], check=True)
-        else:
-            print("No changes to commit.")
-
-
-def _has_staged_changes() -> bool:
-    return subprocess.run(["git", "diff", "--cached", "--quiet", "--exit-code"]).returncode != 0
+    """Commits the files locally right away, but only pushes them later on in the background along
+    with whatever else gets committed in the meantime. See `CoalescedGitPusher`."""
+    global _GIT_COMMIT_LOCK
+    if _GIT_COMMIT_LOCK is None:
+        _GIT_COMMIT_LOCK = asyncio.Lock()
+    async with _GIT_COMMIT_LOCK:
+        # Make the dir if it doesn't already exist.
+        os.makedirs(basedir, exist_ok=True)
+        for to_commit in files:
+            with open(os.path.join(basedir, to_commit.filename), "w") as f:
+                f.write(to_commit.content)
+
+        agent_commit_message = (
+            f"Coding-Agent ({aoc_problem.year}.{aoc_problem.day}.{aoc_problem.part}): "
+            f"{commit_message}"
+        )
+        print(agent_commit_message)
+        if not dry_run:
+            start = time.monotonic()
+            await _check_git("add", basedir)
+
+            # Only commit if there are changes. This is to avoid a "nothing to commit" error.
+            if await _has_staged_changes():
+                await _check_git("commit", "-m", agent_commit_message)
+                metrics = get_git_metrics()
+                metrics.commits += 1
+                metrics.commit_secs += time.monotonic() - start
+                request_push()
+            else:
+                print("No changes to commit.")
+
+
+async def _check_git(*args: str) -> None:
+    returncode, _, stderr = await run_git(*args)
+    if returncode != 0:
+        raise RuntimeError(f"`git {args[0]}` failed:\n{stderr}")
+
+
+async def _has_staged_changes() -> bool:
+    returncode, _, _ = await run_git("diff", "--cached", "--quiet", "--exit-code")
+    return returncode != 0
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+import aiohttp
+
+from agent import settings
+
+
+@dataclass
+class HTTPClientConfig:
+    # Caps on simultaneously open connections, overall and to any single host.
+    max_connections: int = 100
+    max_connections_per_host: int = 10
+    # How long idle connections are kept alive for reuse by the next request to the same host.
+    keepalive_timeout_secs: float = 30
+    # Every workflow on the worker hits adventofcode.com for the same handful of things, so keep the
+    # whole worker's traffic there polite no matter how many problems are being solved at once.
+    max_concurrent_aoc_requests: int = 2
+    min_secs_between_aoc_requests: float = 1
+
+
+_CONFIG = HTTPClientConfig()
+_SESSION: aiohttp.ClientSession | None = None
+# Lazily created, since asyncio primitives shouldn't outlive the event loop that they're used on.
+_AOC_REQUEST_SEMAPHORE: asyncio.Semaphore | None = None
+_AOC_REQUEST_LOCK: asyncio.Lock | None = None
+_LAST_AOC_REQUEST_TIME = 0.0
+
+
+def configure_http_client(config: HTTPClientConfig) -> None:
+    """Must be called before the first request, the shared session is never reconfigured."""
+    global _CONFIG
+    _CONFIG = config
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """The session shared by every request made in this process, so that connections get pooled and
+    kept alive between requests rather than every single request paying for DNS, TCP and TLS setup.
+
+    Must be called from within a running event loop. Callers must never close this session, see
+    `close_http_session()` instead.
+    """
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=_CONFIG.max_connections,
+                limit_per_host=_CONFIG.max_connections_per_host,
+                keepalive_timeout=_CONFIG.keepalive_timeout_secs,
+            )
+        )
+    return _SESSION
+
+
+async def close_http_session() -> None:
+    """Closes the shared session, e.g. when the worker shuts down."""
+    global _SESSION, _AOC_REQUEST_SEMAPHORE, _AOC_REQUEST_LOCK
+    if _SESSION is not None:
+        await _SESSION.close()
+    _SESSION = None
+    _AOC_REQUEST_SEMAPHORE = None
+    _AOC_REQUEST_LOCK = None
+
+
+def aoc_url(path: str) -> str:
+    return f"{settings.AOC_BASE_URL}{path}"
+
+
+@asynccontextmanager
+async def aoc_request_slot() -> AsyncIterator[None]:
+    """Every request to adventofcode.com must be made within this context, which waits until the
+    request can be made without exceeding the AoC concurrency and rate limits."""
+    global _AOC_REQUEST_SEMAPHORE, _AOC_REQUEST_LOCK, _LAST_AOC_REQUEST_TIME
+    if _AOC_REQUEST_SEMAPHORE is None or _AOC_REQUEST_LOCK is None:
+        _AOC_REQUEST_SEMAPHORE = asyncio.Semaphore(_CONFIG.max_concurrent_aoc_requests)
+        _AOC_REQUEST_LOCK = asyncio.Lock()
+
+    async with _AOC_REQUEST_SEMAPHORE:
+        # Holding the lock while sleeping keeps waiters first-come-first-served.
+        async with _AOC_REQUEST_LOCK:
+            wait_secs = _LAST_AOC_REQUEST_TIME + _CONFIG.min_secs_between_aoc_requests
+            wait_secs -= time.monotonic()
+            if wait_secs > 0:
+                await asyncio.sleep(wait_secs)
+            _LAST_AOC_REQUEST_TIME = time.monotonic()
+        yield
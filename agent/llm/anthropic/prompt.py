@@ -1,13 +1,77 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
 import anthropic
 from pydantic import BaseModel
 from result import Err, Ok, Result
 
 from agent import settings
 from agent.llm.anthropic.models import ANTHROPIC_PROVIDER_NAME, AnthropicModel
+from agent.llm.offline.prompt import get_offline_prompt_fns
+from agent.llm.streaming.partial_json_validator import PartialJSONValidator
 from agent.llm.usage.LLMUsage import LLMError, LLMUsage, Model, log_llm_usage
 
 
 _CLIENT = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+# Callers can size this up (e.g. with `TokenEstimator.pick_by_prompt_size(...)`) when a response
+# is expected to be long.
+_DEFAULT_MAX_TOKENS = 2000
+
+
+@dataclass
+class _CreatedMessage:
+    message: anthropic.types.Message
+    input_tokens: int
+    output_tokens: int
+    # Only set if the response was streamed.
+    first_token_timestamp: datetime | None = None
+    # Set if the response was abandoned part way through, in which case `message` is incomplete.
+    aborted_err_msg: str | None = None
+
+
+async def _create_message(
+    validator: PartialJSONValidator | None, **create_kwargs: Any
+) -> _CreatedMessage:
+    if not settings.LLM_STREAMING:
+        message = await _CLIENT.messages.create(**create_kwargs)
+        return _CreatedMessage(
+            message=message,
+            input_tokens=message.usage.input_tokens,
+            output_tokens=message.usage.output_tokens,
+        )
+
+    first_token_timestamp: datetime | None = None
+    streamed_json_chars = 0
+    async with _CLIENT.messages.stream(**create_kwargs) as stream:
+        async for event in stream:
+            if event.type in ("text", "input_json") and first_token_timestamp is None:
+                first_token_timestamp = datetime.now()
+            if event.type == "input_json" and validator is not None:
+                streamed_json_chars += len(event.partial_json)
+                match validator.feed(event.partial_json):
+                    case Err(err_msg):
+                        # Leaving the `async with` closes the connection, which stops the rest of
+                        # the response from being generated (and billed).
+                        snapshot = stream.current_message_snapshot
+                        return _CreatedMessage(
+                            message=snapshot,
+                            input_tokens=snapshot.usage.input_tokens,
+                            # The usage only gets updated at the very end of the stream, so this is
+                            # a rough estimate of the tokens generated up to here.
+                            output_tokens=max(
+                                snapshot.usage.output_tokens, streamed_json_chars // 4
+                            ),
+                            first_token_timestamp=first_token_timestamp,
+                            aborted_err_msg=err_msg,
+                        )
+        message = await stream.get_final_message()
+    return _CreatedMessage(
+        message=message,
+        input_tokens=message.usage.input_tokens,
+        output_tokens=message.usage.output_tokens,
+        first_token_timestamp=first_token_timestamp,
+    )
 
 
 @log_llm_usage(provider=ANTHROPIC_PROVIDER_NAME, model=Model.DYNAMIC_MODEL_CHOICE)
@@ -18,12 +82,14 @@ async def prompt[ResponseType: BaseModel](
     system_prompt: str,
     prompt: str | list[anthropic.types.MessageParam],
     response_type: type[ResponseType],
+    max_tokens: int = _DEFAULT_MAX_TOKENS,
 ) -> LLMUsage[ResponseType]:
     JSON_RESPONSE_TYPE_TOOL_NAME = "json_response_type_tool"
     try:
-        raw_response = await _CLIENT.messages.create(
+        created_message = await _create_message(
+            validator=PartialJSONValidator(response_type),
             model=model.value,
-            max_tokens=2000,
+            max_tokens=max_tokens,
             system=system_prompt,
             tools=[
                 anthropic.types.ToolParam(
@@ -53,9 +119,15 @@ async def prompt[ResponseType: BaseModel](
         )
 
     response: Result[ResponseType, LLMError]
-    input_tokens = raw_response.usage.input_tokens
-    output_tokens = raw_response.usage.output_tokens
-    if isinstance(raw_response.content[0], anthropic.types.ToolUseBlock):
+    raw_response = created_message.message
+    if created_message.aborted_err_msg is not None:
+        response = Err(
+            LLMError(
+                err_type=LLMError.ErrType.RESPONSE_SCHEMA_VALIDATION_FAILED,
+                msg=created_message.aborted_err_msg,
+            )
+        )
+    elif isinstance(raw_response.content[0], anthropic.types.ToolUseBlock):
         try:
             response = Ok(response_type.model_validate(raw_response.content[0].input))
         except Exception as e:
@@ -70,7 +142,12 @@ async def prompt[ResponseType: BaseModel](
             )
         )
 
-    return LLMUsage(input_tokens=input_tokens, output_tokens=output_tokens, response=response)
+    return LLMUsage(
+        input_tokens=created_message.input_tokens,
+        output_tokens=created_message.output_tokens,
+        response=response,
+        first_token_timestamp=created_message.first_token_timestamp,
+    )
 
 
 @log_llm_usage(provider=ANTHROPIC_PROVIDER_NAME, model=Model.DYNAMIC_MODEL_CHOICE)
@@ -80,11 +157,13 @@ async def text_prompt(
     subtask_name: str,
     system_prompt: str,
     prompt: str | list[anthropic.types.MessageParam],
+    max_tokens: int = _DEFAULT_MAX_TOKENS,
 ) -> LLMUsage[str]:
     try:
-        raw_response = await _CLIENT.messages.create(
+        created_message = await _create_message(
+            validator=None,
             model=model.value,
-            max_tokens=2000,
+            max_tokens=max_tokens,
             system=system_prompt,
             messages=[
                 anthropic.types.MessageParam(
@@ -102,8 +181,7 @@ async def text_prompt(
         )
 
     response: Result[str, LLMError]
-    input_tokens = raw_response.usage.input_tokens
-    output_tokens = raw_response.usage.output_tokens
+    raw_response = created_message.message
     if isinstance(raw_response.content[0], anthropic.types.TextBlock):
         response = Ok(raw_response.content[0].text)
     else:
@@ -114,4 +192,14 @@ async def text_prompt(
             )
         )
 
-    return LLMUsage(input_tokens=input_tokens, output_tokens=output_tokens, response=response)
+    return LLMUsage(
+        input_tokens=created_message.input_tokens,
+        output_tokens=created_message.output_tokens,
+        response=response,
+        first_token_timestamp=created_message.first_token_timestamp,
+    )
+
+
+if settings.OFFLINE_LLM:
+    # Transparently swap in the offline stand-in, callers can't tell the difference.
+    prompt, text_prompt = get_offline_prompt_fns(ANTHROPIC_PROVIDER_NAME)  # type: ignore # noqa: F811
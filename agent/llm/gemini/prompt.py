@@ -1,14 +1,22 @@
 import json
-from dataclasses import dataclass
-from typing import Any, Callable, Literal, Protocol
+import logging
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, AsyncGenerator, Callable, Literal, Protocol
 
 import google.generativeai as genai
 from google.generativeai.types import ContentDict, HarmBlockThreshold, HarmCategory
 from pydantic import BaseModel
 from result import Err, Ok, Result
 
+from agent import settings
 from agent.llm.gemini.models import GeminiModel, GEMINI_PROVIDER_NAME
+from agent.llm.offline.prompt import get_offline_prompt_fns
+from agent.llm.streaming.partial_json_validator import PartialJSONValidator
 from agent.llm.usage.LLMUsage import LLMError, log_llm_usage, Model, LLMUsage
+from agent.llm.usage.TokenEstimator import estimate_prompt_tokens, estimate_tokens
+
+_LOGGER = logging.getLogger(__name__)
 
 # Avoid being so dang conservative. Answer the questions!
 SAFETY_SETTINGS = {
@@ -73,18 +81,18 @@ async def prompt[ResponseType: BaseModel](
             response_mime_type="application/json",
             response_schema=response_type,
         ),
+        validator=PartialJSONValidator(response_type),
     )
 
     try:
         # Try to parse the response.
         response = response.map(response_type.model_validate_json)
-        # Validate the response.
-        if extra_validation_fn:
+        # Validate the response (unless it's already failed, e.g. by being abandoned mid-stream).
+        if extra_validation_fn and response.response.is_ok():
             match extra_validation_fn(response.response.unwrap()):
                 case Err(err_msg):
-                    response = LLMUsage(
-                        input_tokens=response.input_tokens,
-                        output_tokens=response.output_tokens,
+                    response = replace(
+                        response,
                         response=Err(
                             LLMError(
                                 err_type=LLMError.ErrType.LOGICAL_VALIDATION_FAILED,
@@ -94,9 +102,8 @@ async def prompt[ResponseType: BaseModel](
                     )
         return response
     except Exception as e:
-        return LLMUsage(
-            input_tokens=response.input_tokens,
-            output_tokens=response.output_tokens,
+        return replace(
+            response,
             response=Err(
                 LLMError(err_type=LLMError.ErrType.RESPONSE_SCHEMA_VALIDATION_FAILED, msg=str(e))
             ),
@@ -121,19 +128,53 @@ async def _prompt(
     system_prompt: str,
     prompt: str | list[UserMessage | ModelMessage] | list[UserMessage | TextModelMessage],
     generation_config: genai.GenerationConfig | None,
+    validator: PartialJSONValidator | None = None,
 ) -> LLMUsage[str]:
+    first_token_timestamp: datetime | None = None
     try:
         res = await genai.GenerativeModel(
             model, safety_settings=SAFETY_SETTINGS, system_instruction=system_prompt
         ).generate_content_async(
             prompt if isinstance(prompt, str) else [msg.to_content_dict() for msg in prompt],
             generation_config=generation_config,
+            stream=settings.LLM_STREAMING,
         )
+        if settings.LLM_STREAMING:
+            chunks = aiter(res)
+            streamed_text = ""
+            async for chunk in chunks:
+                if first_token_timestamp is None:
+                    first_token_timestamp = datetime.now()
+                if validator is None:
+                    continue
+                try:
+                    chunk_text = chunk.text
+                except ValueError:
+                    continue  # E.g. the final chunk may only carry the finish reason.
+                streamed_text += chunk_text
+                match validator.feed(chunk_text):
+                    case Err(err_msg):
+                        await _close_stream(res, chunks)
+                        input_tokens, output_tokens = _get_abandoned_stream_token_counts(
+                            res, system_prompt=system_prompt, prompt=prompt, text=streamed_text
+                        )
+                        return LLMUsage(
+                            input_tokens=input_tokens,
+                            output_tokens=output_tokens,
+                            response=Err(
+                                LLMError(
+                                    err_type=LLMError.ErrType.RESPONSE_SCHEMA_VALIDATION_FAILED,
+                                    msg=err_msg,
+                                )
+                            ),
+                            first_token_timestamp=first_token_timestamp,
+                        )
     except Exception as e:
         return LLMUsage(
             input_tokens=0,
             output_tokens=0,
             response=Err(LLMError(err_type=LLMError.ErrType.NO_RESPONSE, msg=str(e))),
+            first_token_timestamp=first_token_timestamp,
         )
 
     output_tokens = res.usage_metadata.total_token_count - res.usage_metadata.prompt_token_count
@@ -142,14 +183,63 @@ async def _prompt(
             input_tokens=res.usage_metadata.prompt_token_count,
             output_tokens=output_tokens,
             response=Ok(res.text),  # res.text may raise ValueError.
+            first_token_timestamp=first_token_timestamp,
         )
     except Exception as e:
         return LLMUsage(
             input_tokens=res.usage_metadata.prompt_token_count,
             output_tokens=output_tokens,
             response=Err(LLMError(err_type=LLMError.ErrType.UNEXPECTED_RESPONSE, msg=str(e))),
+            first_token_timestamp=first_token_timestamp,
+        )
+
+
+async def _close_stream(res: Any, chunks: AsyncGenerator[Any, None]) -> None:
+    """Closes an abandoned response stream right away, which stops the rest of the response from
+    being generated (and billed), instead of leaving the connection open until the response happens
+    to get garbage collected."""
+    await chunks.aclose()
+    # The SDK has no public way to close the stream underneath the response. It's either the gRPC
+    # call itself, or an async generator over it that holds the only reference to the call, so that
+    # closing the generator cancels the call.
+    stream = getattr(res, "_iterator", None)
+    if callable(getattr(stream, "cancel", None)):
+        stream.cancel()
+    elif callable(getattr(stream, "aclose", None)):
+        await stream.aclose()
+    else:
+        # Still correct, but the rest of the response keeps being generated (and billed) until it
+        # gets garbage collected, so an SDK upgrade that breaks this shouldn't go unnoticed.
+        _LOGGER.warning(
+            "Unable to close the stream underneath an abandoned %s response, found: %r",
+            type(res).__name__,
+            stream,
         )
 
 
+def _get_abandoned_stream_token_counts(
+    res: Any,
+    system_prompt: str,
+    prompt: str | list[UserMessage | ModelMessage] | list[UserMessage | TextModelMessage],
+    text: str,
+) -> tuple[int, int]:
+    """(input tokens, output tokens) of a response that was abandoned part way through. The usage
+    metadata may not have been sent yet (or only counts the first few chunks), so it's backed up by
+    local estimates."""
+    usage_metadata = getattr(res, "usage_metadata", None)
+    prompt_token_count = getattr(usage_metadata, "prompt_token_count", 0) or 0
+    total_token_count = getattr(usage_metadata, "total_token_count", 0) or 0
+    input_tokens = prompt_token_count or estimate_prompt_tokens(
+        system_prompt=system_prompt, prompt=prompt
+    )
+    output_tokens = max(total_token_count - prompt_token_count, estimate_tokens(text))
+    return input_tokens, output_tokens
+
+
+if settings.OFFLINE_LLM:
+    # Transparently swap in the offline stand-in, callers can't tell the difference.
+    prompt, text_prompt = get_offline_prompt_fns(GEMINI_PROVIDER_NAME)  # type: ignore # noqa: F811
+
+
 class PromptHistory(BaseModel):
     prompt_history: list[UserMessage | ModelMessage]
@@ -0,0 +1 @@
+OFFLINE_PROVIDER_NAME = "Offline"
@@ -0,0 +1,243 @@
+import asyncio
+import enum
+import json
+import re
+import types
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Literal, Union, get_args, get_origin
+
+from pydantic import BaseModel
+from result import Err, Ok, Result
+
+from agent import settings
+from agent.llm.offline.models import OFFLINE_PROVIDER_NAME
+from agent.llm.usage.LLMResponseCache import deserialize_response, get_cache_key
+from agent.llm.usage.LLMUsage import (
+    LLMError,
+    LLMUsage,
+    Model,
+    get_llm_usage_logging_scope,
+    log_llm_usage,
+)
+from agent.llm.usage.TokenEstimator import estimate_prompt_tokens, estimate_tokens
+
+_ADVENT_OF_CODE_DIR = Path(__file__).parents[3] / "advent_of_code"
+# Response fields that get served the contents of the problem's committed solution files.
+_CANNED_FILE_BY_RESPONSE_FIELD = {
+    "generated_implementation_file_content": "solution.py",
+    "generated_unit_test_file_content": "tests.py",
+}
+# Not every prompt includes the problem's HTML (e.g. unit tests are generated only from examples),
+# so remember the (day, part) of the last problem seen in each scope (i.e. each workflow).
+_LAST_SEEN_PROBLEM_BY_SCOPE: dict[str | None, tuple[int, int]] = {}
+# The problem's HTML never mentions the year, so it has to be set explicitly for each scope. See
+# `set_offline_problem_year()`.
+_PROBLEM_YEAR_BY_SCOPE: dict[str | None, int] = {}
+
+
+@dataclass
+class OfflineLLMConfig:
+    # Dir of recorded responses (see `record_fixtures.py`), these take priority over anything else.
+    fixtures_dir: Path | None
+    # Simulated time to first token.
+    latency: timedelta
+    # Simulated generation speed. If None, the whole response is "generated" instantly.
+    output_tokens_per_sec: float | None
+    # Which year's committed solutions to serve as canned implementations/unit tests, for scopes
+    # that were never told which year their problem is from. If None, those scopes get no canned
+    # responses at all, since the same day of another year is a different problem entirely.
+    canned_solutions_year: int | None = None
+
+
+_CONFIG = OfflineLLMConfig(
+    fixtures_dir=(
+        Path(settings.OFFLINE_LLM_FIXTURES_DIR) if settings.OFFLINE_LLM_FIXTURES_DIR else None
+    ),
+    latency=timedelta(seconds=settings.OFFLINE_LLM_LATENCY_SECS),
+    output_tokens_per_sec=settings.OFFLINE_LLM_OUTPUT_TOKENS_PER_SEC,
+)
+
+
+def configure_offline_llm(config: OfflineLLMConfig) -> None:
+    """Override the config that otherwise comes from the OFFLINE_LLM_* env vars."""
+    global _CONFIG
+    _CONFIG = config
+
+
+def set_offline_problem_year(year: int, scope: str | None) -> None:
+    """Which year the problem being solved within the scope (i.e. a workflow) is from, so that it
+    gets served the canned responses for that exact problem."""
+    _PROBLEM_YEAR_BY_SCOPE[scope] = year
+
+
+def clear_offline_problem(scope: str) -> None:
+    """Forgets which problem the scope (i.e. a workflow) was solving, once it's done solving it."""
+    _PROBLEM_YEAR_BY_SCOPE.pop(scope, None)
+    _LAST_SEEN_PROBLEM_BY_SCOPE.pop(scope, None)
+
+
+def get_offline_prompt_fns(provider: str) -> tuple[Callable, Callable]:
+    """Returns stand-ins for the given provider's `prompt` and `text_prompt` functions.
+
+    Responses come from (in order of priority):
+        1. A recorded response for this exact prompt in the fixtures dir.
+        2. For implementations/unit tests, the committed `solution.py`/`tests.py` for the problem.
+        3. A synthesized response that's merely valid according to the response type.
+    """
+
+    @log_llm_usage(provider=OFFLINE_PROVIDER_NAME, model=Model.DYNAMIC_MODEL_CHOICE)
+    async def prompt[ResponseType: BaseModel](
+        *,
+        model: enum.StrEnum,
+        subtask_name: str,
+        system_prompt: str,
+        prompt: Any,
+        response_type: type[ResponseType],
+        extra_validation_fn: Callable[[ResponseType], Result[None, str]] | None = None,
+        # Only accepted so that callers sizing Anthropic responses up work offline too.
+        max_tokens: int | None = None,
+    ) -> LLMUsage[ResponseType]:
+        prompt_kwargs = {
+            "system_prompt": system_prompt,
+            "prompt": prompt,
+            "response_type": response_type,
+        }
+        _remember_problem(prompt)
+        response = _get_recorded_response(provider, model, prompt_kwargs)
+        if response is None:
+            response = _get_canned_response(response_type)
+        if response is None:
+            response = response_type.model_validate(_synthesize_value(response_type))
+
+        usage = await _simulate_generation(
+            prompt_kwargs, response_text=response.model_dump_json(), response=response
+        )
+        if extra_validation_fn:
+            match extra_validation_fn(response):
+                case Err(err_msg):
+                    return LLMUsage(
+                        input_tokens=usage.input_tokens,
+                        output_tokens=usage.output_tokens,
+                        response=Err(
+                            LLMError(
+                                err_type=LLMError.ErrType.LOGICAL_VALIDATION_FAILED,
+                                msg=str(err_msg),
+                            )
+                        ),
+                        first_token_timestamp=usage.first_token_timestamp,
+                    )
+        return usage
+
+    @log_llm_usage(provider=OFFLINE_PROVIDER_NAME, model=Model.DYNAMIC_MODEL_CHOICE)
+    async def text_prompt(
+        *,
+        model: enum.StrEnum,
+        subtask_name: str,
+        system_prompt: str,
+        prompt: Any,
+        max_tokens: int | None = None,
+    ) -> LLMUsage[str]:
+        prompt_kwargs = {"system_prompt": system_prompt, "prompt": prompt}
+        _remember_problem(prompt)
+        response = _get_recorded_response(provider, model, prompt_kwargs)
+        if not isinstance(response, str):
+            response = f"Offline {subtask_name} response."
+        return await _simulate_generation(prompt_kwargs, response_text=response, response=response)
+
+    return prompt, text_prompt
+
+
+def _get_recorded_response(provider: str, model: str, prompt_kwargs: dict[str, Any]) -> Any:
+    if _CONFIG.fixtures_dir is None:
+        return None
+    # Keyed exactly the same as the LLM response cache, so that fixtures can just be exported from
+    # the cache after running the agent for real.
+    fixture_file = _CONFIG.fixtures_dir / f"{get_cache_key(provider, model, prompt_kwargs)}.json"
+    if not fixture_file.is_file():
+        return None
+    with open(fixture_file) as f:
+        return deserialize_response(json.load(f)["response_json"], prompt_kwargs)
+
+
+def _remember_problem(prompt: Any) -> None:
+    # The problem's HTML is the only thing in the prompts that identifies which problem it is.
+    prompt_text = str(prompt)
+    if day_match := re.search(r"--- Day (\d+):", prompt_text):
+        _LAST_SEEN_PROBLEM_BY_SCOPE[get_llm_usage_logging_scope()] = (
+            int(day_match.group(1)),
+            2 if "<!-- Part 2 -->" in prompt_text else 1,
+        )
+
+
+def _get_canned_response[ResponseType: BaseModel](
+    response_type: type[ResponseType],
+) -> ResponseType | None:
+    match list(response_type.model_fields):
+        case [field_name] if field_name in _CANNED_FILE_BY_RESPONSE_FIELD:
+            canned_filename = _CANNED_FILE_BY_RESPONSE_FIELD[field_name]
+        case _:
+            return None
+    scope = get_llm_usage_logging_scope()
+    match _LAST_SEEN_PROBLEM_BY_SCOPE.get(scope):
+        case None:
+            return None
+        case (day, part):
+            pass
+    year = _PROBLEM_YEAR_BY_SCOPE.get(scope, _CONFIG.canned_solutions_year)
+    if year is None:
+        return None
+    canned_file = _ADVENT_OF_CODE_DIR / f"year{year}/day{day}/part{part}" / canned_filename
+    if not canned_file.is_file():
+        return None
+    return response_type.model_validate({field_name: canned_file.read_text()})
+
+
+def _synthesize_value(annotation: Any) -> Any:
+    """The simplest value that validates against the given type annotation."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return {
+            name: _synthesize_value(field.annotation)
+            for name, field in annotation.model_fields.items()
+            if field.is_required()
+        }
+    origin = get_origin(annotation)
+    if origin is list:
+        # Non-empty, since callers commonly reject empty responses (e.g. no examples extracted).
+        return [_synthesize_value(get_args(annotation)[0])]
+    if origin is dict:
+        return {}
+    if origin is Literal:
+        return get_args(annotation)[0]
+    if origin in (Union, types.UnionType):
+        return _synthesize_value(get_args(annotation)[0])
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        return next(iter(annotation)).value
+    if annotation is bool:
+        return False
+    if annotation in (int, float):
+        return 0
+    return "offline"
+
+
+async def _simulate_generation[T](
+    prompt_kwargs: dict[str, Any], response_text: str, response: T
+) -> LLMUsage[T]:
+    # Only needs to be in the right ballpark.
+    input_tokens = estimate_prompt_tokens(
+        system_prompt=prompt_kwargs.get("system_prompt", ""), prompt=prompt_kwargs.get("prompt", "")
+    )
+    output_tokens = estimate_tokens(response_text)
+    if _CONFIG.latency:
+        await asyncio.sleep(_CONFIG.latency.total_seconds())
+    # As if the response were streamed, so that offline runs log generation speed just the same.
+    first_token_timestamp = datetime.now()
+    if _CONFIG.output_tokens_per_sec:
+        await asyncio.sleep(output_tokens / _CONFIG.output_tokens_per_sec)
+    return LLMUsage(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        response=Ok(response),
+        first_token_timestamp=first_token_timestamp,
+    )
@@ -0,0 +1,60 @@
+import json
+from pathlib import Path
+
+import asyncclick as click
+import duckdb
+
+
+@click.command()
+@click.option(
+    "--cache-file",
+    required=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="The LLM response cache (llm_response_cache.db) populated by running the agent for real.",
+)
+@click.option(
+    "--fixtures-dir",
+    required=True,
+    type=click.Path(file_okay=False, path_type=Path),
+    help="Dir to write fixtures to. Point OFFLINE_LLM_FIXTURES_DIR here to serve them offline.",
+)
+@click.option(
+    "--subtask-name",
+    "subtask_names",
+    multiple=True,
+    help="Only export responses for these subtasks. Exports everything if unset.",
+)
+def main(cache_file: Path, fixtures_dir: Path, subtask_names: tuple[str, ...]) -> None:
+    """Records LLM responses as fixtures for the offline stand-in.
+
+    The response cache is already keyed by everything that determines an LLM's response, so this
+    just exports its entries to one (diffable, committable) JSON file per cache key.
+    """
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    with duckdb.connect(cache_file, read_only=True) as conn:
+        rows = conn.execute(
+            """
+            SELECT cache_key, provider, model, subtask_name, response_json
+            FROM llm_response_cache
+            WHERE len($1) = 0 OR list_contains($1, subtask_name);
+            """,
+            (list(subtask_names),),
+        ).fetchall()
+
+    for cache_key, provider, model, subtask_name, response_json in rows:
+        with open(fixtures_dir / f"{cache_key}.json", "w") as f:
+            json.dump(
+                {
+                    "provider": provider,
+                    "model": model,
+                    "subtask_name": subtask_name,
+                    "response_json": response_json,
+                },
+                f,
+                indent=2,
+            )
+    click.echo(f"Recorded {len(rows)} fixtures to {fixtures_dir}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,90 @@
+import base64
+import os
+from typing import Literal
+
 import asyncclick as click
 import aiohttp
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from agent import settings
 from agent.llm.openai.models import DALL_E_Model
 
-_OPENAI_CLIENT = OpenAI(api_key=settings.OPENAI_API_KEY)
+_OPENAI_CLIENT = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+_DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+ImageResponseFormat = Literal["url", "b64_json"]
+
+
+async def generate_image(
+    session: aiohttp.ClientSession,
+    prompt: str,
+    save_path: str,
+    response_format: ImageResponseFormat = "b64_json",
+) -> None:
+    """Generates an image and saves it as a PNG to the given path.
+
+    With "b64_json" the image comes back inline with the generation response, saving the extra round
+    trip to go download it from the url that'd be returned otherwise.
+    """
+    match response_format:
+        case "b64_json":
+            _write_atomically(save_path, base64.b64decode(await _generate(prompt, "b64_json")))
+        case "url":
+            await download_image(session, await _generate(prompt, "url"), save_path)
 
 
-async def generate_image_to_url(prompt: str) -> str:
-    response = _OPENAI_CLIENT.images.generate(
+async def _generate(prompt: str, response_format: ImageResponseFormat) -> str:
+    response = await _OPENAI_CLIENT.images.generate(
         model=DALL_E_Model.DALL_E_3,
         prompt=prompt,
         n=1,
         size="1024x1024",
         quality="standard",
-        response_format="url",
+        response_format=response_format,
     )
-    match response.data[0].url:
+    match response.data[0].url if response_format == "url" else response.data[0].b64_json:
         case None:
             raise ValueError("No image data found")
-        case url:
-            return url
+        case data:
+            return data
 
 
-async def download_image(url: str, save_path: str) -> None:
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            response.raise_for_status()  # Let me know if there was some issue.
+async def download_image(session: aiohttp.ClientSession, url: str, save_path: str) -> None:
+    async with session.get(url) as response:
+        response.raise_for_status()  # Let me know if there was some issue.
+
+        # Streamed straight to disk rather than buffering the whole image in memory first. Written
+        # to a temp file first so that a failed download never leaves a truncated image behind.
+        tmp_save_path = f"{save_path}.partial"
+        try:
+            with open(tmp_save_path, "wb") as f:
+                async for chunk in response.content.iter_chunked(_DOWNLOAD_CHUNK_BYTES):
+                    f.write(chunk)
+            os.replace(tmp_save_path, save_path)
+        finally:
+            if os.path.exists(tmp_save_path):
+                os.remove(tmp_save_path)
 
-            data = await response.read()
-            with open(save_path, "wb") as f:
-                f.write(data)
+
+def _write_atomically(save_path: str, data: bytes) -> None:
+    tmp_save_path = f"{save_path}.partial"
+    with open(tmp_save_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_save_path, save_path)
 
 
 @click.command()
 @click.option("--prompt", required=True)
 @click.option("--save-path", required=True)
-async def main(prompt: str, save_path: str) -> None:
-    url = await generate_image_to_url(prompt)
-    await download_image(url, save_path)
+@click.option(
+    "--response-format",
+    type=click.Choice(["url", "b64_json"]),
+    default="b64_json",
+    help="Whether to download the image from a url, or get it inline in the response.",
+)
+async def main(prompt: str, save_path: str, response_format: ImageResponseFormat) -> None:
+    async with aiohttp.ClientSession() as session:
+        await generate_image(session, prompt, save_path, response_format=response_format)
 
 
 if __name__ == "__main__":
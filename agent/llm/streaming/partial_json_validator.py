@@ -0,0 +1,322 @@
+import enum
+import re
+import string
+from dataclasses import dataclass, field
+from typing import Any
+
+from pydantic import BaseModel
+from result import Err, Ok, Result
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "+-.eE0123456789"
+_NUMBER_RE = re.compile(r"-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?")
+_LITERALS = {"t": "true", "f": "false", "n": "null"}
+_ESCAPABLE_CHARS = '"\\/bfnrt'
+
+
+class _Expect(enum.Enum):
+    VALUE = enum.auto()
+    # Right after an opening `[`.
+    VALUE_OR_END = enum.auto()
+    KEY = enum.auto()
+    # Right after an opening `{`.
+    KEY_OR_END = enum.auto()
+    COLON = enum.auto()
+    COMMA_OR_END = enum.auto()
+    # The top level value is complete, so only whitespace is allowed from here on.
+    NOTHING = enum.auto()
+
+
+@dataclass
+class _Container:
+    is_object: bool
+    # None means that the contents of this container aren't checked against any schema.
+    schema: dict[str, Any] | None
+    # Objects only. The key whose value is currently being streamed.
+    key: str | None = None
+    # Arrays only. The index of the value that's currently being streamed.
+    index: int = 0
+
+
+@dataclass
+class _StringToken:
+    is_key: bool
+    # Only kept around for keys, string values can be huge (e.g. a whole generated file).
+    chars: list[str] = field(default_factory=list)
+    escaped: bool = False
+    unicode_digits_remaining: int = 0
+
+
+class PartialJSONValidator:
+    """Incrementally checks a streamed JSON response against the JSON schema of its response type.
+
+    This is only meant to catch responses that are *clearly* going off the rails (e.g. prose instead
+    of JSON, a string where an object should be, trailing garbage) as early as possible, so that the
+    stream can be aborted instead of waiting for the rest of a response that's going to be thrown
+    away anyway. Anything that can only be checked once the response is complete (e.g. missing
+    required fields) is still left to the usual pydantic validation of the complete response.
+    """
+
+    def __init__(self, response_type: type[BaseModel]) -> None:
+        self._root_schema = response_type.model_json_schema()
+        self._defs: dict[str, Any] = self._root_schema.get("$defs", {})
+        self._stack: list[_Container] = []
+        self._expect = _Expect.VALUE
+        self._string: _StringToken | None = None
+        self._number: list[str] | None = None
+        self._literal: str | None = None
+        self._literal_len = 0
+        self._offset = 0
+        self._err: Err[str] | None = None
+
+    def feed(self, chunk: str) -> Result[None, str]:
+        """Feed the next chunk of the response. Once this returns an Err, it always will."""
+        if self._err is not None:
+            return self._err
+        for c in chunk:
+            match self._feed_char(c):
+                case str(err_msg):
+                    self._err = Err(
+                        f"Invalid JSON response at char {self._offset} ({c!r}): {err_msg}"
+                    )
+                    return self._err
+            self._offset += 1
+        return Ok(None)
+
+    def _feed_char(self, c: str) -> str | None:
+        if self._string is not None:
+            return self._feed_string_char(self._string, c)
+
+        if self._number is not None:
+            if c in _NUMBER_CHARS:
+                self._number.append(c)
+                return None
+            if not _NUMBER_RE.fullmatch("".join(self._number)):
+                return f"malformed number {''.join(self._number)!r}"
+            self._number = None
+            self._end_value()
+            # Whatever ended the number still needs to be handled below.
+
+        if self._literal is not None:
+            if c != self._literal[self._literal_len]:
+                return f"expected {self._literal!r}"
+            self._literal_len += 1
+            if self._literal_len == len(self._literal):
+                self._literal = None
+                self._end_value()
+            return None
+
+        if c in _WHITESPACE:
+            return None
+
+        match self._expect:
+            case _Expect.VALUE | _Expect.VALUE_OR_END:
+                if c == "]" and self._expect == _Expect.VALUE_OR_END:
+                    self._stack.pop()
+                    self._end_value()
+                    return None
+                return self._start_value(c)
+            case _Expect.KEY | _Expect.KEY_OR_END:
+                if c == "}" and self._expect == _Expect.KEY_OR_END:
+                    self._stack.pop()
+                    self._end_value()
+                    return None
+                if c != '"':
+                    return "expected an object key"
+                self._string = _StringToken(is_key=True)
+                return None
+            case _Expect.COLON:
+                if c != ":":
+                    return "expected ':'"
+                self._expect = _Expect.VALUE
+                return None
+            case _Expect.COMMA_OR_END:
+                container = self._stack[-1]
+                if c == ",":
+                    if container.is_object:
+                        self._expect = _Expect.KEY
+                    else:
+                        container.index += 1
+                        self._expect = _Expect.VALUE
+                    return None
+                if c == ("}" if container.is_object else "]"):
+                    self._stack.pop()
+                    self._end_value()
+                    return None
+                return "expected ',' or '}'" if container.is_object else "expected ',' or ']'"
+            case _Expect.NOTHING:
+                return "unexpected content after the end of the response"
+
+    def _feed_string_char(self, token: _StringToken, c: str) -> str | None:
+        if token.unicode_digits_remaining:
+            if c not in string.hexdigits:
+                return "invalid unicode escape"
+            token.unicode_digits_remaining -= 1
+            return None
+        if token.escaped:
+            token.escaped = False
+            if c == "u":
+                token.unicode_digits_remaining = 4
+            elif c not in _ESCAPABLE_CHARS:
+                return "invalid escape"
+            elif token.is_key:
+                # Keys with escapes in them won't match the schema either way, so close enough.
+                token.chars.append(c)
+            return None
+        if c == "\\":
+            token.escaped = True
+            return None
+        if c != '"':
+            if token.is_key:
+                token.chars.append(c)
+            return None
+
+        self._string = None
+        if token.is_key:
+            self._stack[-1].key = "".join(token.chars)
+            self._expect = _Expect.COLON
+        else:
+            self._end_value()
+        return None
+
+    def _start_value(self, c: str) -> str | None:
+        json_type: str
+        match c:
+            case "{":
+                json_type = "object"
+            case "[":
+                json_type = "array"
+            case '"':
+                json_type = "string"
+            case "t" | "f":
+                json_type = "boolean"
+            case "n":
+                json_type = "null"
+            case _ if c == "-" or c.isdigit():
+                json_type = "number"
+            case _:
+                return "expected a JSON value"
+
+        schema = self._get_current_value_schema()
+        allowed_types = _get_allowed_types(schema, self._defs)
+        if allowed_types is not None and not (
+            json_type in allowed_types or (json_type == "number" and "integer" in allowed_types)
+        ):
+            return (
+                f"expected {' or '.join(sorted(allowed_types))} at {self._get_path()}, "
+                f"got {json_type}"
+            )
+
+        match json_type:
+            case "object":
+                self._stack.append(
+                    _Container(is_object=True, schema=_narrow(schema, "object", self._defs))
+                )
+                self._expect = _Expect.KEY_OR_END
+            case "array":
+                self._stack.append(
+                    _Container(is_object=False, schema=_narrow(schema, "array", self._defs))
+                )
+                self._expect = _Expect.VALUE_OR_END
+            case "string":
+                self._string = _StringToken(is_key=False)
+            case "boolean" | "null":
+                self._literal = _LITERALS[c]
+                self._literal_len = 1
+            case "number":
+                self._number = [c]
+        return None
+
+    def _end_value(self) -> None:
+        self._expect = _Expect.COMMA_OR_END if self._stack else _Expect.NOTHING
+
+    def _get_current_value_schema(self) -> dict[str, Any] | None:
+        if not self._stack:
+            return self._root_schema
+        container = self._stack[-1]
+        if container.schema is None:
+            return None
+        if container.is_object:
+            properties = container.schema.get("properties", {})
+            if container.key in properties:
+                return properties[container.key]
+            # Unknown keys are just ignored by pydantic, so they're not worth aborting over.
+            additional_properties = container.schema.get("additionalProperties")
+            return additional_properties if isinstance(additional_properties, dict) else None
+        return container.schema.get("items")
+
+    def _get_path(self) -> str:
+        path = "$"
+        for container in self._stack:
+            path += f".{container.key}" if container.is_object else f"[{container.index}]"
+        return path
+
+
+def _resolve(schema: dict[str, Any], defs: dict[str, Any]) -> dict[str, Any]:
+    while True:
+        if "$ref" in schema:
+            schema = defs[schema["$ref"].split("/")[-1]]
+        elif len(schema.get("allOf", [])) == 1:
+            schema = schema["allOf"][0]
+        else:
+            return schema
+
+
+def _get_allowed_types(schema: dict[str, Any] | None, defs: dict[str, Any]) -> set[str] | None:
+    """The JSON types allowed by the schema, or None if it doesn't constrain the type at all."""
+    if schema is None:
+        return None
+    schema = _resolve(schema, defs)
+    if "type" in schema:
+        return {schema["type"]} if isinstance(schema["type"], str) else set(schema["type"])
+    for union_key in ("anyOf", "oneOf"):
+        if union_key in schema:
+            allowed_types: set[str] = set()
+            for sub_schema in schema[union_key]:
+                sub_schema_allowed_types = _get_allowed_types(sub_schema, defs)
+                if sub_schema_allowed_types is None:
+                    return None
+                allowed_types |= sub_schema_allowed_types
+            return allowed_types
+    if "enum" in schema:
+        return {_get_json_type(value) for value in schema["enum"]}
+    if "const" in schema:
+        return {_get_json_type(schema["const"])}
+    return None
+
+
+def _narrow(
+    schema: dict[str, Any] | None, json_type: str, defs: dict[str, Any]
+) -> dict[str, Any] | None:
+    """The (sub-)schema that a value of the given type must follow, if it's unambiguous."""
+    if schema is None:
+        return None
+    schema = _resolve(schema, defs)
+    for union_key in ("anyOf", "oneOf"):
+        if union_key in schema:
+            candidates = [
+                sub_schema
+                for sub_schema in schema[union_key]
+                if (allowed_types := _get_allowed_types(sub_schema, defs)) is None
+                or json_type in allowed_types
+            ]
+            return _narrow(candidates[0], json_type, defs) if len(candidates) == 1 else None
+    return schema
+
+
+def _get_json_type(value: Any) -> str:
+    match value:
+        case None:
+            return "null"
+        case bool():
+            return "boolean"
+        case int():
+            return "integer"
+        case float():
+            return "number"
+        case str():
+            return "string"
+        case list():
+            return "array"
+        case _:
+            return "object"
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+from agent.llm.anthropic.models import ANTHROPIC_PROVIDER_NAME
+from agent.llm.gemini.models import GEMINI_PROVIDER_NAME
+from agent.llm.offline.models import OFFLINE_PROVIDER_NAME
+
+
+@dataclass
+class _ProviderRateLimiter:
+    """Token bucket allowing bursts of up to a full minute's worth of requests."""
+
+    max_requests_per_minute: int
+    tokens: float = field(init=False)
+    last_refill: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def __post_init__(self) -> None:
+        self.tokens = float(self.max_requests_per_minute)
+
+    async def acquire(self) -> None:
+        # Holding the lock while sleeping keeps waiters first-come-first-served.
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    float(self.max_requests_per_minute),
+                    self.tokens + (now - self.last_refill) * self.max_requests_per_minute / 60,
+                )
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) * 60 / self.max_requests_per_minute)
+
+
+# Every provider that LLM calls get logged (and so rate limited) under.
+KNOWN_LLM_PROVIDERS = frozenset(
+    {ANTHROPIC_PROVIDER_NAME, GEMINI_PROVIDER_NAME, OFFLINE_PROVIDER_NAME}
+)
+
+# Keyed by rate limit scope (e.g. a season run's workflow id), then by provider name. Providers
+# without a configured budget are never throttled.
+_RATE_LIMITERS: dict[str, dict[str, _ProviderRateLimiter]] = {}
+# Keyed by LLM usage logging scope (i.e. an individual problem's workflow id), the rate limit scope
+# that its LLM calls count against.
+_RATE_LIMIT_SCOPE_BY_LOGGING_SCOPE: dict[str, str] = {}
+
+
+def configure_llm_rate_limits(
+    max_requests_per_minute_by_provider: dict[str, int], scope: str, logging_scope: str
+) -> None:
+    """Configure per-provider request budgets shared by every LLM call made within any of the
+    logging scopes that have joined the given rate limit scope, e.g. every problem of a season run.
+
+    Reconfiguring a provider with its current budget is a no-op, so that concurrent workflows can
+    all safely (re)configure the same budgets without resetting each other's buckets.
+    """
+    for provider, max_requests_per_minute in max_requests_per_minute_by_provider.items():
+        if provider not in KNOWN_LLM_PROVIDERS:
+            raise ValueError(
+                f"Unknown provider {provider!r}, expected one of {sorted(KNOWN_LLM_PROVIDERS)}."
+            )
+        if max_requests_per_minute <= 0:
+            raise ValueError(f"Rate budget for {provider} must be positive.")
+    rate_limiters = _RATE_LIMITERS.setdefault(scope, {})
+    for provider, max_requests_per_minute in max_requests_per_minute_by_provider.items():
+        curr_limiter = rate_limiters.get(provider)
+        if curr_limiter is None or curr_limiter.max_requests_per_minute != max_requests_per_minute:
+            rate_limiters[provider] = _ProviderRateLimiter(max_requests_per_minute)
+    _RATE_LIMIT_SCOPE_BY_LOGGING_SCOPE[logging_scope] = scope
+
+
+def clear_llm_rate_limits(scope: str) -> None:
+    """Drops the scope's budgets once whatever they were shared by is done, so that they don't go on
+    throttling unrelated workflows that later run on the same worker."""
+    _RATE_LIMITERS.pop(scope, None)
+    for logging_scope, rate_limit_scope in list(_RATE_LIMIT_SCOPE_BY_LOGGING_SCOPE.items()):
+        if rate_limit_scope == scope:
+            del _RATE_LIMIT_SCOPE_BY_LOGGING_SCOPE[logging_scope]
+
+
+def leave_llm_rate_limits(logging_scope: str) -> None:
+    """Stops counting the logging scope's LLM calls against whichever rate limit scope it joined,
+    e.g. once a single problem of a season run is done while the rest are still being solved."""
+    _RATE_LIMIT_SCOPE_BY_LOGGING_SCOPE.pop(logging_scope, None)
+
+
+async def wait_for_llm_rate_limit(provider: str, logging_scope: str | None) -> None:
+    """Waits until the provider's budget (if any) in the logging scope's rate limit scope allows for
+    another request."""
+    if logging_scope is None or (
+        scope := _RATE_LIMIT_SCOPE_BY_LOGGING_SCOPE.get(logging_scope)
+    ) is None:
+        return
+    if (limiter := _RATE_LIMITERS.get(scope, {}).get(provider)) is not None:
+        await limiter.acquire()
@@ -0,0 +1,246 @@
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterable
+
+import duckdb
+from pydantic import BaseModel
+
+from agent.llm.usage.LLMUsageWriter import get_writer
+
+
+@dataclass
+class LLMResponseCacheConfig:
+    cache_file: Path
+    # Caching is strictly opt-in per subtask. Some callers validate responses *after* the LLM call
+    # returns (e.g. rejecting an empty refactoring plan) and rely on a retry producing something
+    # different, so blindly serving the same response again would just loop on the same failure.
+    cached_subtask_names: frozenset[str]
+    max_age: timedelta
+    max_total_bytes: int
+
+
+_CONFIG: LLMResponseCacheConfig | None = None
+# Configs for concurrently running executions (e.g. multiple workflows on the same worker), keyed by
+# the same scope as their LLM usage logging. None disables caching within that scope.
+_SCOPED_CONFIGS: dict[str, LLMResponseCacheConfig | None] = {}
+
+
+def configure_llm_response_cache(
+    cache_dir: os.PathLike | None,
+    cached_subtask_names: Iterable[str],
+    max_age: timedelta = timedelta(days=7),
+    max_total_bytes: int = 64 * 1024 * 1024,
+    scope: str | None = None,
+) -> None:
+    """Configure the persistent LLM response cache.
+
+    cache_dir: Dir to persist the cache to. If None, or if no subtasks opt in, caching is disabled.
+    scope: If set, this config only applies to LLM calls made within the LLM usage logging scope of
+            the same name rather than being the process-wide default.
+    """
+    cached_subtask_names = frozenset(cached_subtask_names)
+    if cache_dir is None or not cached_subtask_names:
+        _set_config(scope, None)
+        return
+
+    cache_file = Path(os.path.join(cache_dir, "llm_response_cache.db"))
+    # All access to the cache file goes through the one long-lived connection owned by its writer.
+    with get_writer(cache_file).connection() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_response_cache (
+                -- Hash of everything that determines the LLM's response. See `get_cache_key(...)`.
+                -- Intentionally not a PRIMARY KEY, DuckDB's over-eager index constraint checking
+                -- rejects updating `last_accessed_timestamp` on indexed rows. Uniqueness is
+                -- maintained by `store_cached_response(...)` instead.
+                cache_key VARCHAR NOT NULL,
+                provider VARCHAR NOT NULL,
+                model VARCHAR NOT NULL,
+                -- Only informational, the subtask name is intentionally NOT part of the key.
+                subtask_name VARCHAR NOT NULL,
+                -- JSON serialized successful response.
+                response_json VARCHAR NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_timestamp TIMESTAMP NOT NULL,
+                last_accessed_timestamp TIMESTAMP NOT NULL
+            );
+            """
+        )
+    _set_config(
+        scope,
+        LLMResponseCacheConfig(
+            cache_file=cache_file,
+            cached_subtask_names=cached_subtask_names,
+            max_age=max_age,
+            max_total_bytes=max_total_bytes,
+        ),
+    )
+
+
+def _set_config(scope: str | None, config: LLMResponseCacheConfig | None) -> None:
+    global _CONFIG
+    if scope is None:
+        _CONFIG = config
+    else:
+        _SCOPED_CONFIGS[scope] = config
+
+
+def clear_llm_response_cache_config(scope: str) -> None:
+    """Drops the scope's config once nothing will prompt within it anymore. Only forgets the config,
+    the cached responses themselves stay cached for everyone else."""
+    _SCOPED_CONFIGS.pop(scope, None)
+
+
+def get_llm_response_cache_config(logging_scope: str | None) -> LLMResponseCacheConfig | None:
+    """The config that applies within the LLM usage logging scope, None if caching is disabled."""
+    if logging_scope is not None and logging_scope in _SCOPED_CONFIGS:
+        return _SCOPED_CONFIGS[logging_scope]
+    return _CONFIG
+
+
+def is_cached_subtask(config: LLMResponseCacheConfig, subtask_name: str) -> bool:
+    return subtask_name in config.cached_subtask_names
+
+
+def get_cache_key(provider: str, model: str, prompt_kwargs: dict[str, Any]) -> str:
+    """Content-addressed key over (provider, model, system prompt, messages, response schema)."""
+    response_type = prompt_kwargs.get("response_type")
+    return hashlib.sha256(
+        json.dumps(
+            {
+                "provider": provider,
+                "model": model,
+                "system_prompt": prompt_kwargs.get("system_prompt"),
+                "prompt": prompt_kwargs.get("prompt"),
+                "response_schema": (
+                    response_type.model_json_schema()
+                    if isinstance(response_type, type) and issubclass(response_type, BaseModel)
+                    else None
+                ),
+            },
+            sort_keys=True,
+            default=_json_default,
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+def _json_default(o: Any) -> Any:
+    if isinstance(o, BaseModel):
+        return o.model_dump(mode="json")
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    raise TypeError(f"Can't serialize {type(o)} into an LLM response cache key.")
+
+
+async def lookup_cached_response(config: LLMResponseCacheConfig, cache_key: str) -> str | None:
+    """Returns the cached JSON response if there's an entry that hasn't aged out yet."""
+    # Off the event loop, since this is on the path of every single cached LLM call.
+    return await asyncio.to_thread(_lookup_cached_response, config, cache_key)
+
+
+async def store_cached_response(
+    config: LLMResponseCacheConfig,
+    cache_key: str,
+    provider: str,
+    model: str,
+    subtask_name: str,
+    response_json: str,
+) -> None:
+    await asyncio.to_thread(
+        _store_cached_response, config, cache_key, provider, model, subtask_name, response_json
+    )
+
+
+def _lookup_cached_response(config: LLMResponseCacheConfig, cache_key: str) -> str | None:
+    now = datetime.now()
+    with get_writer(config.cache_file).connection() as conn:
+        res = conn.execute(
+            """
+            UPDATE llm_response_cache
+            SET last_accessed_timestamp = $1
+            WHERE cache_key = $2 AND created_timestamp >= $3
+            RETURNING response_json;
+            """,
+            (now, cache_key, now - config.max_age),
+        ).fetchall()
+    return res[0][0] if res else None
+
+
+def _store_cached_response(
+    config: LLMResponseCacheConfig,
+    cache_key: str,
+    provider: str,
+    model: str,
+    subtask_name: str,
+    response_json: str,
+) -> None:
+    now = datetime.now()
+    with get_writer(config.cache_file).connection() as conn:
+        conn.execute("DELETE FROM llm_response_cache WHERE cache_key = $1;", (cache_key,))
+        conn.execute(
+            """
+            INSERT INTO llm_response_cache
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8);
+            """,
+            (
+                cache_key,
+                provider,
+                model,
+                subtask_name,
+                response_json,
+                len(response_json.encode("utf-8")),
+                now,
+                now,
+            ),
+        )
+        _evict(config, conn, now=now)
+
+
+def _evict(config: LLMResponseCacheConfig, conn: duckdb.DuckDBPyConnection, now: datetime) -> None:
+    # First drop anything that's simply too old to trust anymore.
+    conn.execute(
+        "DELETE FROM llm_response_cache WHERE created_timestamp < $1;",
+        (now - config.max_age,),
+    )
+    # Then, evict least recently used entries until we're back under the size budget.
+    conn.execute(
+        """
+        DELETE FROM llm_response_cache
+        WHERE cache_key IN (
+            SELECT cache_key
+            FROM (
+                SELECT
+                    cache_key,
+                    SUM(size_bytes) OVER (
+                        ORDER BY last_accessed_timestamp DESC, cache_key
+                    ) AS cumulative_size_bytes
+                FROM llm_response_cache
+            )
+            WHERE cumulative_size_bytes > $1
+        );
+        """,
+        (config.max_total_bytes,),
+    )
+
+
+def serialize_response(response: Any) -> str | None:
+    """Returns None if the response isn't something that we know how to cache."""
+    if isinstance(response, BaseModel):
+        return response.model_dump_json()
+    try:
+        return json.dumps(response)
+    except TypeError:
+        return None
+
+
+def deserialize_response(response_json: str, prompt_kwargs: dict[str, Any]) -> Any:
+    response_type = prompt_kwargs.get("response_type")
+    if isinstance(response_type, type) and issubclass(response_type, BaseModel):
+        return response_type.model_validate_json(response_json)
+    return json.loads(response_json)
@@ -0,0 +1,153 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from agent import settings
+from agent.llm.usage.LLMUsage import get_persisted_llm_usage_logs_config
+from agent.llm.usage.LLMUsageWriter import BatchedDuckDBWriter, get_writer
+
+
+@dataclass
+class LLMRouterConfig:
+    # Fraction of calls that go to a random candidate regardless of history, so that a model that
+    # was once slow or flaky gets a chance to prove itself again (and so that there's any history
+    # at all for candidates that have never been routed to).
+    exploration_rate: float = settings.LLM_ROUTER_EXPLORATION_RATE
+    # A candidate only qualifies if at least this fraction of its calls succeeded. Responses that
+    # failed validation (e.g. an unparseable response) count as failures too.
+    min_success_rate: float = settings.LLM_ROUTER_MIN_SUCCESS_RATE
+    # Too few calls says nothing about a candidate's reliability.
+    min_samples: int = 10
+    # Tail latency, since a subtask is only done once its slowest call comes back.
+    latency_quantile: float = 0.9
+    # Only recent history counts, providers' latencies drift over time.
+    lookback: timedelta = timedelta(days=14)
+    # History is only re-read from the LLM usage logs this often.
+    stats_ttl: timedelta = timedelta(minutes=5)
+    # Keyed by subtask name. Always routed to this model (as long as it's one of the candidates).
+    pinned_models: dict[str, str] = field(
+        default_factory=lambda: dict(settings.LLM_ROUTER_PINNED_MODELS)
+    )
+
+
+@dataclass
+class LLMRouterMetrics:
+    pinned: int = 0
+    explored: int = 0
+    routed_by_history: int = 0
+    defaulted: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"{self.routed_by_history} routed by history, {self.explored} explored, "
+            f"{self.pinned} pinned, {self.defaulted} defaulted"
+        )
+
+
+@dataclass
+class ModelStats:
+    calls: int
+    success_rate: float
+    latency_ms: float
+
+
+_CONFIG = LLMRouterConfig()
+_METRICS = LLMRouterMetrics()
+# Keyed by log file, then by (subtask name, model). Along with when they were read (monotonic).
+_STATS_BY_LOG_FILE: dict[Path, tuple[float, dict[tuple[str, str], ModelStats]]] = {}
+
+
+def configure_llm_router(config: LLMRouterConfig) -> None:
+    """Override the config that otherwise comes from the LLM_ROUTER_* env vars."""
+    global _CONFIG
+    _CONFIG = config
+    _STATS_BY_LOG_FILE.clear()
+
+
+def get_llm_router_metrics() -> LLMRouterMetrics:
+    return _METRICS
+
+
+async def route_model[M: str](subtask_name: str, candidates: list[M], default: M) -> M:
+    """Picks which of the candidate models to send the subtask to.
+
+    In order of priority:
+        1. The model pinned for the subtask, if any.
+        2. A random candidate, `exploration_rate` of the time.
+        3. The candidate with the lowest tail latency for this subtask in the LLM usage logs, out of
+           the ones that have succeeded reliably enough.
+        4. The default, if none qualify (e.g. there's no history yet, or logs aren't persisted).
+
+    The default should be whichever model the subtask used before it was routed at all, so that
+    routing only ever moves a subtask off of it once there's evidence that it's safe to. The history
+    is read off of the event loop, since it's an aggregate over the whole DuckDB log file.
+    """
+    if default not in candidates:
+        raise ValueError(f"Default model {default} must be one of the candidates: {candidates}")
+
+    match _CONFIG.pinned_models.get(subtask_name):
+        case str(pinned_model) if pinned_model in candidates:
+            _METRICS.pinned += 1
+            return candidates[candidates.index(pinned_model)]  # type: ignore[arg-type]
+
+    logs_config = get_persisted_llm_usage_logs_config()
+    # Exploring is pointless if nothing's going to be learned from it.
+    if logs_config is None or len(candidates) == 1:
+        _METRICS.defaulted += 1
+        return default
+
+    if random.random() < _CONFIG.exploration_rate:
+        _METRICS.explored += 1
+        return random.choice(candidates)
+
+    stats = await _get_model_stats(logs_config.log_file)
+    qualified = [
+        (model_stats.latency_ms, model)
+        for model in candidates
+        if (model_stats := stats.get((subtask_name, model))) is not None
+        and model_stats.calls >= _CONFIG.min_samples
+        and model_stats.success_rate >= _CONFIG.min_success_rate
+    ]
+    if not qualified:
+        _METRICS.defaulted += 1
+        return default
+    _METRICS.routed_by_history += 1
+    return min(qualified, key=lambda q: q[0])[1]
+
+
+async def _get_model_stats(log_file: Path) -> dict[tuple[str, str], ModelStats]:
+    match _STATS_BY_LOG_FILE.get(log_file):
+        case (read_at, stats) if time.monotonic() - read_at < _CONFIG.stats_ttl.total_seconds():
+            return stats
+
+    rows = await asyncio.to_thread(_query_model_stats, get_writer(log_file))
+    stats = {
+        (subtask_name, model): ModelStats(
+            calls=calls, success_rate=success_rate, latency_ms=latency_ms
+        )
+        for subtask_name, model, calls, success_rate, latency_ms in rows
+    }
+    _STATS_BY_LOG_FILE[log_file] = (time.monotonic(), stats)
+    return stats
+
+
+def _query_model_stats(writer: BatchedDuckDBWriter) -> list[tuple[str, str, int, float, float]]:
+    with writer.connection() as conn:
+        return conn.execute(
+            """
+            SELECT
+                subtask_name,
+                model,
+                COUNT(*) AS calls,
+                AVG(CASE WHEN error IS NULL THEN 1 ELSE 0 END) AS success_rate,
+                QUANTILE_CONT(date_diff('millisecond', start_timestamp, end_timestamp), ?) AS latency_ms
+            FROM llm_usage
+            -- Cache hits never actually went to the model, so they say nothing about it.
+            WHERE NOT cache_hit AND start_timestamp >= ?
+            GROUP BY subtask_name, model;
+            """,  # noqa: E501
+            (_CONFIG.latency_quantile, datetime.now() - _CONFIG.lookback),
+        ).fetchall()
@@ -1,15 +1,23 @@
 import atexit
-from dataclasses import dataclass
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 from datetime import datetime
 import enum
-import duckdb
+import itertools
 import os
 from pathlib import Path
 from pydantic import BaseModel
 from result import Err, Ok, Result
-from typing import Awaitable, Callable, Literal, ParamSpec, TypeVar, cast
+from typing import Awaitable, Callable, Iterator, Literal, ParamSpec, TypeVar, cast
 from functools import wraps
 
+from agent.llm.usage import LLMResponseCache
+from agent.llm.usage.LLMRateLimiter import wait_for_llm_rate_limit
+from agent.llm.usage.TokenEstimator import estimate_prompt_tokens
+from agent.llm.usage.LLMUsageWriter import flush_all_writers, get_writer
+
 
 @dataclass
 class LLMUsageLoggingConfig:
@@ -17,6 +25,9 @@ class LLMUsageLoggingConfig:
     class LoggingEnabledConfig:
         log_file: Path
         execution_id: int
+        # Subtask ids are only unique within a program execution, so they're just counted up
+        # in-process rather than relying on a DB sequence that'd need resetting every execution.
+        subtask_ids: Iterator[int] = field(default_factory=lambda: itertools.count(1))
 
     execution_name: str
     persisted_logs_config: LoggingEnabledConfig | None
@@ -25,31 +36,45 @@ class LLMUsageLoggingConfig:
 
 
 _CONFIG: LLMUsageLoggingConfig = None  # type: ignore
-
-
-def configure_llm_usage_logging(execution_name: str, log_dir: os.PathLike | None) -> None:
+# Configs for concurrently running executions (e.g. multiple workflows on the same worker) that
+# each need their LLM usage logged separately. See `llm_usage_logging_scope(...)`.
+_SCOPED_CONFIGS: dict[str, LLMUsageLoggingConfig] = {}
+_CURRENT_SCOPE: ContextVar[str | None] = ContextVar("llm_usage_logging_scope", default=None)
+# The executions logged by scopes that have since been cleared, which still belong in the summary.
+_CLEARED_EXECUTION_IDS_BY_LOG_FILE: dict[Path, list[int]] = defaultdict(list)
+# See `prompt_compaction_scope(...)`.
+_PROMPT_TOKENS_SAVED: ContextVar[int | None] = ContextVar("prompt_tokens_saved", default=None)
+
+
+def configure_llm_usage_logging(
+    execution_name: str, log_dir: os.PathLike | None, scope: str | None = None
+) -> None:
     """Configure LLM Usage Logging.
 
     log_path: Path to the log file. If None, logs will only be printed to stdout but won't be
             persisted anywhere for later analysis.
+    scope: If set, this config only applies to LLM calls made within
+            `llm_usage_logging_scope(scope)` rather than being the process-wide default.
     """
-    global _CONFIG
     if log_dir is None:
-        _CONFIG = LLMUsageLoggingConfig(
-            execution_name=execution_name,
-            persisted_logs_config=None,
+        _set_config(
+            scope,
+            LLMUsageLoggingConfig(
+                execution_name=execution_name,
+                persisted_logs_config=None,
+            ),
         )
         return  # We're not actually persisting logs this time.
 
     log_file = Path(os.path.join(log_dir, "llm_usage.db"))
-    with duckdb.connect(log_file) as conn:
+    # All access to the log file goes through the one long-lived connection owned by its writer.
+    with get_writer(log_file).connection() as conn:
         conn.execute(
             """
             CREATE SEQUENCE IF NOT EXISTS execution_id_sequence START 1;
             
-            -- Always create a new subtask sequence since this should be incrementing within a program execution.
-            DROP SEQUENCE IF EXISTS subtask_id_sequence;
-            CREATE SEQUENCE subtask_id_sequence START 1;
+            -- Only backs the subtask_id column's default. Subtask ids are now assigned in-process.
+            CREATE SEQUENCE IF NOT EXISTS subtask_id_sequence START 1;
 
             CREATE TABLE IF NOT EXISTS llm_usage (
                 -- Globally incrementing program execution count - should be from `execution_id_sequence` above.
@@ -76,6 +101,17 @@ def configure_llm_usage_logging(execution_name: str, log_dir: os.PathLike | None
                 PRIMARY KEY(execution_id, subtask_id),
                 CHECK (error IS NULL or error_msg IS NOT NULL)
             );
+
+            -- Columns added after the table was originally created.
+            -- Whether the response was served from the LLM response cache (without an LLM call).
+            ALTER TABLE llm_usage ADD COLUMN IF NOT EXISTS cache_hit BOOLEAN DEFAULT FALSE;
+            -- Only set for streamed responses. How long until the first token arrived, and how fast the rest arrived after that.
+            ALTER TABLE llm_usage ADD COLUMN IF NOT EXISTS time_to_first_token_ms DOUBLE DEFAULT NULL;
+            ALTER TABLE llm_usage ADD COLUMN IF NOT EXISTS output_tokens_per_sec DOUBLE DEFAULT NULL;
+            -- Only set for prompts that were compacted. The (estimated) input tokens that the compaction saved.
+            ALTER TABLE llm_usage ADD COLUMN IF NOT EXISTS prompt_tokens_saved INTEGER DEFAULT NULL;
+            -- The input tokens as estimated locally before sending the prompt, to compare against the actual input_tokens.
+            ALTER TABLE llm_usage ADD COLUMN IF NOT EXISTS estimated_input_tokens INTEGER DEFAULT NULL;
             """  # noqa: E501
         )
 
@@ -86,30 +122,114 @@ def configure_llm_usage_logging(execution_name: str, log_dir: os.PathLike | None
             SELECT nextval('execution_id_sequence');
             """
         ).fetchall()[0][0]
-        _CONFIG = LLMUsageLoggingConfig(
+    _set_config(
+        scope,
+        LLMUsageLoggingConfig(
             execution_name=execution_name,
             persisted_logs_config=LLMUsageLoggingConfig.LoggingEnabledConfig(
                 log_file=log_file,
                 execution_id=curr_execution_id,
             ),
-        )
+        ),
+    )
 
+    # Only show the summary once at exit, no matter how many times logging gets configured.
+    atexit.unregister(_show_usage_summary)
     atexit.register(_show_usage_summary)
 
 
+def _set_config(scope: str | None, config: LLMUsageLoggingConfig) -> None:
+    global _CONFIG
+    if scope is None:
+        _CONFIG = config
+    else:
+        _SCOPED_CONFIGS[scope] = config
+
+
+def clear_llm_usage_logging(scope: str) -> None:
+    """Drops the scope's config once nothing will log within it anymore (e.g. its workflow has
+    completed), so that a long-lived worker doesn't keep one for every workflow it ever ran."""
+    match _SCOPED_CONFIGS.pop(scope, None):
+        case LLMUsageLoggingConfig(
+            persisted_logs_config=LLMUsageLoggingConfig.LoggingEnabledConfig(
+                log_file=log_file, execution_id=execution_id
+            )
+        ):
+            _CLEARED_EXECUTION_IDS_BY_LOG_FILE[log_file].append(execution_id)
+
+
+def _get_config() -> LLMUsageLoggingConfig | None:
+    match _CURRENT_SCOPE.get():
+        case str(scope) if scope in _SCOPED_CONFIGS:
+            return _SCOPED_CONFIGS[scope]
+        case _:
+            return _CONFIG
+
+
+@contextmanager
+def llm_usage_logging_scope(scope: str) -> Iterator[None]:
+    """LLM calls made within this context are logged according to the config for this scope (if one
+    has been configured), instead of the process-wide default config."""
+    token = _CURRENT_SCOPE.set(scope)
+    try:
+        yield
+    finally:
+        _CURRENT_SCOPE.reset(token)
+
+
+@contextmanager
+def prompt_compaction_scope(tokens_saved: int) -> Iterator[None]:
+    """LLM calls made within this context are logged as having had their prompt compacted, saving
+    (an estimated) `tokens_saved` input tokens."""
+    token = _PROMPT_TOKENS_SAVED.set(tokens_saved)
+    try:
+        yield
+    finally:
+        _PROMPT_TOKENS_SAVED.reset(token)
+
+
+def get_llm_usage_logging_scope() -> str | None:
+    return _CURRENT_SCOPE.get()
+
+
+def get_persisted_llm_usage_logs_config() -> LLMUsageLoggingConfig.LoggingEnabledConfig | None:
+    """Where the current execution's LLM usage is persisted (if anywhere), for anything else that
+    wants to be logged alongside it."""
+    match _get_config():
+        case LLMUsageLoggingConfig(persisted_logs_config=persisted_logs_config):
+            return persisted_logs_config
+        case _:
+            return None
+
+
 def _show_usage_summary():
     """Show a summary of LLM usage."""
-    if _CONFIG.persisted_logs_config is None:
+    execution_ids_by_log_file: dict[Path, list[int]] = defaultdict(
+        list, {f: list(ids) for f, ids in _CLEARED_EXECUTION_IDS_BY_LOG_FILE.items()}
+    )
+    for config in [_CONFIG, *_SCOPED_CONFIGS.values()]:
+        if config is not None and config.persisted_logs_config is not None:
+            execution_ids_by_log_file[config.persisted_logs_config.log_file].append(
+                config.persisted_logs_config.execution_id
+            )
+    if not execution_ids_by_log_file:
         return
 
     print("\nLLM usage summary:")
-    with duckdb.connect(_CONFIG.persisted_logs_config.log_file) as conn:
-        conn.sql(
-            "SELECT * FROM llm_usage WHERE execution_id = $1;",
-            params=[_CONFIG.persisted_logs_config.execution_id],
-        ).show()
-        # Finally, cleanup the task id sequence since we'll want a new one next time.
-        conn.execute("DROP SEQUENCE subtask_id_sequence;")
+    for log_file, execution_ids in execution_ids_by_log_file.items():
+        writer = get_writer(log_file)
+        # Make sure that the summary includes any rows that haven't been flushed yet.
+        writer.flush_blocking()
+        with writer.connection() as conn:
+            conn.sql(
+                "SELECT * FROM llm_usage WHERE list_contains($1, execution_id);",
+                params=[execution_ids],
+            ).show()
+
+
+async def flush_llm_usage_logs() -> None:
+    """Wait for all buffered usage logs to actually be written out."""
+    await flush_all_writers()
 
 
 class LLMError(BaseModel):
@@ -135,6 +255,9 @@ class LLMUsage[T]:
     input_tokens: int
     output_tokens: int
     response: Result[T, LLMError]
+    # Only known for streamed responses. Should come from datetime.now() just like the timestamps
+    # that `log_llm_usage` records around the call.
+    first_token_timestamp: datetime | None = None
 
     def map[U](self, func: Callable[[T], U]) -> "LLMUsage[U]":
         return LLMUsage[U](
@@ -145,6 +268,7 @@ class LLMUsage[T]:
                 if self.response.is_ok()
                 else Err(self.response.unwrap_err())
             ),
+            first_token_timestamp=self.first_token_timestamp,
         )
 
 
@@ -179,15 +303,12 @@ def log_llm_usage(provider: str, model: str | Literal[Model.DYNAMIC_MODEL_CHOICE
 
         @wraps(func)
         async def wrapper(*args: P.args, **kwargs: P.kwargs) -> Result[R, LLMError]:
-            if _CONFIG is None:
+            config = _get_config()
+            if config is None:
                 raise ValueError(
                     f"Must call {configure_llm_usage_logging.__name__}(...) to configure LLM usage tracking."  # noqa: E501
                 )
 
-            start_timestamp = datetime.now()
-            result = await func(*args, **kwargs)
-            end_timestamp = datetime.now()
-
             # If the model is dynamic, then we need to extract it from the arguments.
             curr_model: str
             match model:
@@ -199,43 +320,79 @@ def log_llm_usage(provider: str, model: str | Literal[Model.DYNAMIC_MODEL_CHOICE
             # Get the subtask name.
             subtask_name = cast(str, kwargs["subtask_name"])
 
-            if _CONFIG.persisted_logs_config:
-                with duckdb.connect(_CONFIG.persisted_logs_config.log_file) as conn:
-                    conn.execute(
-                        """
-                        INSERT INTO llm_usage (
-                            execution_id,
-                            execution_name,
-                            subtask_name, 
-                            start_timestamp,
-                            end_timestamp,
-                            provider,
-                            model, 
-                            input_tokens, 
-                            output_tokens,
-                            error,
-                            error_msg
-                        )
-                        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11);
-                        """,
-                        (
-                            _CONFIG.persisted_logs_config.execution_id,
-                            _CONFIG.execution_name,
-                            subtask_name,
-                            start_timestamp,
-                            end_timestamp,
-                            provider,
-                            curr_model,
-                            result.input_tokens,
-                            result.output_tokens,
-                            (
-                                None
-                                if result.response.is_ok()
-                                else result.response.unwrap_err().err_type
+            # Sized up locally before sending anything, so that it's known even if the call fails.
+            estimated_input_tokens = (
+                estimate_prompt_tokens(
+                    system_prompt=cast(str, kwargs.get("system_prompt", "")),
+                    prompt=cast(str | list, kwargs["prompt"]),
+                )
+                if "prompt" in kwargs
+                else None
+            )
+
+            # Check for a cached response before going anywhere near the LLM.
+            cache_config = LLMResponseCache.get_llm_response_cache_config(_CURRENT_SCOPE.get())
+            cache_key: str | None = None
+            if cache_config is not None and LLMResponseCache.is_cached_subtask(
+                cache_config, subtask_name
+            ):
+                start_timestamp = datetime.now()
+                cache_key = LLMResponseCache.get_cache_key(
+                    provider=provider, model=curr_model, prompt_kwargs=kwargs
+                )
+                match await LLMResponseCache.lookup_cached_response(cache_config, cache_key):
+                    case str(cached_response_json):
+                        cached_result = LLMUsage(
+                            input_tokens=0,
+                            output_tokens=0,
+                            response=Ok(
+                                LLMResponseCache.deserialize_response(cached_response_json, kwargs)
                             ),
-                            None if result.response.is_ok() else result.response.unwrap_err().msg,
-                        ),
-                    )
+                        )
+                        _log_llm_usage_row(
+                            config=config,
+                            subtask_name=subtask_name,
+                            start_timestamp=start_timestamp,
+                            end_timestamp=datetime.now(),
+                            provider=provider,
+                            model=curr_model,
+                            result=cached_result,
+                            cache_hit=True,
+                            estimated_input_tokens=estimated_input_tokens,
+                        )
+                        return cached_result.response
+
+            # Don't let concurrently running executions blow through the provider's rate limits.
+            await wait_for_llm_rate_limit(provider, logging_scope=_CURRENT_SCOPE.get())
+
+            start_timestamp = datetime.now()
+            result = await func(*args, **kwargs)
+            end_timestamp = datetime.now()
+
+            _log_llm_usage_row(
+                config=config,
+                subtask_name=subtask_name,
+                start_timestamp=start_timestamp,
+                end_timestamp=end_timestamp,
+                provider=provider,
+                model=curr_model,
+                result=result,
+                cache_hit=False,
+                estimated_input_tokens=estimated_input_tokens,
+            )
+
+            # Only successful responses are worth caching.
+            if cache_config is not None and cache_key is not None and result.response.is_ok():
+                match LLMResponseCache.serialize_response(result.response.unwrap()):
+                    case str(response_json):
+                        await LLMResponseCache.store_cached_response(
+                            config=cache_config,
+                            cache_key=cache_key,
+                            provider=provider,
+                            model=curr_model,
+                            subtask_name=subtask_name,
+                            response_json=response_json,
+                        )
 
             return result.response
 
@@ -244,6 +401,80 @@ def log_llm_usage(provider: str, model: str | Literal[Model.DYNAMIC_MODEL_CHOICE
     return decorator
 
 
+_LLM_USAGE_INSERT_SQL = """
+INSERT INTO llm_usage (
+    execution_id,
+    execution_name,
+    subtask_id,
+    subtask_name, 
+    start_timestamp,
+    end_timestamp,
+    provider,
+    model, 
+    input_tokens, 
+    output_tokens,
+    error,
+    error_msg,
+    cache_hit,
+    time_to_first_token_ms,
+    output_tokens_per_sec,
+    prompt_tokens_saved,
+    estimated_input_tokens
+)
+VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17);
+"""
+
+
+def _log_llm_usage_row(
+    config: LLMUsageLoggingConfig,
+    subtask_name: str,
+    start_timestamp: datetime,
+    end_timestamp: datetime,
+    provider: str,
+    model: str,
+    result: LLMUsage,
+    cache_hit: bool,
+    estimated_input_tokens: int | None,
+) -> None:
+    if config.persisted_logs_config is None:
+        return
+
+    time_to_first_token_ms: float | None = None
+    output_tokens_per_sec: float | None = None
+    if result.first_token_timestamp is not None:
+        time_to_first_token_ms = (
+            result.first_token_timestamp - start_timestamp
+        ).total_seconds() * 1_000
+        generation_secs = (end_timestamp - result.first_token_timestamp).total_seconds()
+        if generation_secs > 0:
+            output_tokens_per_sec = result.output_tokens / generation_secs
+
+    # Just enqueue the row, the writer batches the actual inserts in the background so that the LLM
+    # call can return without waiting on the DB.
+    get_writer(config.persisted_logs_config.log_file).submit(
+        _LLM_USAGE_INSERT_SQL,
+        (
+            config.persisted_logs_config.execution_id,
+            config.execution_name,
+            next(config.persisted_logs_config.subtask_ids),
+            subtask_name,
+            start_timestamp,
+            end_timestamp,
+            provider,
+            model,
+            result.input_tokens,
+            result.output_tokens,
+            None if result.response.is_ok() else result.response.unwrap_err().err_type,
+            None if result.response.is_ok() else result.response.unwrap_err().msg,
+            cache_hit,
+            time_to_first_token_ms,
+            output_tokens_per_sec,
+            _PROMPT_TOKENS_SAVED.get(),
+            estimated_input_tokens,
+        ),
+    )
+
+
 async def test() -> None:
     # TESTING
     @log_llm_usage(provider="OpenAI", model="gpt-3.5-turbo")
@@ -0,0 +1,155 @@
+import asyncio
+import atexit
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Iterator
+
+import duckdb
+
+
+class BatchedDuckDBWriter:
+    """Owns the one long-lived connection to a DuckDB file and batches up inserts into it.
+
+    `submit(...)` only enqueues the row, so callers (i.e. every single LLM call) never wait on the
+    DuckDB file. A background task flushes the queue once it reaches `max_batch_size` rows or every
+    `flush_interval`, whichever comes first, and `close()` flushes whatever's left at shutdown.
+    """
+
+    def __init__(self, db_file: Path, max_batch_size: int, flush_interval: timedelta):
+        self.db_file = db_file
+        self._max_batch_size = max_batch_size
+        self._flush_interval = flush_interval
+        self._conn = duckdb.connect(db_file)
+        # DuckDB connections aren't safe for concurrent use, and the flush happens off the event
+        # loop, so all access to the connection is serialized through this lock.
+        self._conn_lock = threading.Lock()
+        self._queue: asyncio.Queue[tuple[str, tuple[Any, ...]]] = asyncio.Queue()
+        self._flush_requested = asyncio.Event()
+        self._flush_task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._closed = False
+
+    @contextmanager
+    def connection(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """Exclusive access to the underlying connection for anything other than batched inserts."""
+        with self._conn_lock:
+            yield self._conn
+
+    def submit(self, insert_sql: str, row: tuple[Any, ...]) -> None:
+        if self._closed:
+            raise ValueError(f"Writer for {self.db_file} has already been closed.")
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to flush in the background, so just write it right away.
+            self._write_rows([(insert_sql, row)])
+            return
+
+        if loop is not self._loop:
+            # The queue is bound to whichever loop first used it, so anything queued from a prior
+            # (now presumably finished) loop needs to be written out before starting over.
+            self._write_rows(self._drain_queue())
+            self._queue = asyncio.Queue()
+            self._flush_requested = asyncio.Event()
+            self._loop = loop
+            self._flush_task = loop.create_task(self._flush_periodically())
+
+        self._queue.put_nowait((insert_sql, row))
+        if self._queue.qsize() >= self._max_batch_size:
+            self._flush_requested.set()
+
+    async def flush(self) -> None:
+        await asyncio.to_thread(self._write_rows, self._drain_queue())
+
+    def flush_blocking(self) -> None:
+        """Only for use when there's no longer an event loop running, e.g. from atexit hooks."""
+        self._write_rows(self._drain_queue())
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._flush_task is not None and not self._flush_task.done():
+            try:
+                self._flush_task.cancel()
+            except RuntimeError:
+                pass  # The task's event loop has already been closed.
+        # Blocks until any in-flight background flush finishes, so no rows can be lost.
+        self._write_rows(self._drain_queue())
+        with self._conn_lock:
+            self._conn.close()
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._flush_requested.wait(), timeout=self._flush_interval.total_seconds()
+                )
+            except TimeoutError:
+                pass
+            self._flush_requested.clear()
+            # Drain on the loop's thread (the queue isn't thread-safe), but write off of it.
+            rows = self._drain_queue()
+            try:
+                await asyncio.to_thread(self._write_rows, rows)
+            except duckdb.Error as e:
+                # Don't let one bad batch stop all future logging.
+                print(f"Failed to write {len(rows)} rows to {self.db_file}: {e}")
+
+    def _drain_queue(self) -> list[tuple[str, tuple[Any, ...]]]:
+        rows = []
+        while not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        return rows
+
+    def _write_rows(self, rows: list[tuple[str, tuple[Any, ...]]]) -> None:
+        if not rows:
+            return
+        rows_by_insert_sql: dict[str, list[tuple[Any, ...]]] = defaultdict(list)
+        for insert_sql, row in rows:
+            rows_by_insert_sql[insert_sql].append(row)
+
+        with self._conn_lock:
+            self._conn.execute("BEGIN TRANSACTION;")
+            try:
+                for insert_sql, sql_rows in rows_by_insert_sql.items():
+                    self._conn.executemany(insert_sql, sql_rows)
+                self._conn.execute("COMMIT;")
+            except BaseException:
+                self._conn.execute("ROLLBACK;")
+                raise
+
+
+_WRITERS: dict[Path, BatchedDuckDBWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def get_writer(db_file: Path) -> BatchedDuckDBWriter:
+    """Returns the (single) writer for the given DuckDB file, creating it if necessary."""
+    db_file = db_file.resolve()
+    with _WRITERS_LOCK:
+        if db_file not in _WRITERS:
+            _WRITERS[db_file] = BatchedDuckDBWriter(
+                db_file=db_file, max_batch_size=50, flush_interval=timedelta(seconds=2)
+            )
+        return _WRITERS[db_file]
+
+
+async def flush_all_writers() -> None:
+    with _WRITERS_LOCK:
+        writers = list(_WRITERS.values())
+    await asyncio.gather(*(writer.flush() for writer in writers))
+
+
+@atexit.register
+def _close_all_writers() -> None:
+    # Registered on import, so this runs *after* any later registered atexit hooks (e.g. printing
+    # the usage summary) that may still want to use the connection.
+    with _WRITERS_LOCK:
+        writers = list(_WRITERS.values())
+        _WRITERS.clear()
+    for writer in writers:
+        writer.close()
@@ -0,0 +1,63 @@
+import json
+import math
+import re
+from typing import Any, Sequence
+
+# Roughly how BPE tokenizers split text. Words (along with the single space before them) and short
+# runs of digits are tokens, as are runs of whitespace (e.g. indentation) and each punctuation char.
+_TOKEN_PIECES_PATTERN = re.compile(r" ?[^\W\d_]+| ?\d{1,3}|\s+|[^\w\s]|_")
+# Common words are single tokens, but longer (or rarer) ones get split up, at around this many
+# chars each.
+_CHARS_PER_WORD_TOKEN = 8
+# Each message in a multi-turn prompt gets wrapped in a few tokens of role markers.
+_TOKENS_PER_MSG = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """A local estimate of the number of tokens in the text, for sizing prompts up before sending
+    them. There's no local tokenizer for any of the providers, so this is only approximate, but
+    unlike a flat chars per token estimate it accounts for code being full of short symbols."""
+    return sum(
+        math.ceil(len(piece.lstrip(" ")) / _CHARS_PER_WORD_TOKEN) if piece[-1].isalpha() else 1
+        for piece in _TOKEN_PIECES_PATTERN.findall(text)
+    )
+
+
+def estimate_prompt_tokens(*, system_prompt: str, prompt: str | Sequence[Any]) -> int:
+    """Estimates the input tokens of a prompt to any of the providers. Multi-turn prompts can be
+    given as Gemini messages (`UserMessage`/`ModelMessage`), or Anthropic `MessageParam`s."""
+    if isinstance(prompt, str):
+        return estimate_tokens(system_prompt) + estimate_tokens(prompt)
+    return estimate_tokens(system_prompt) + sum(
+        _TOKENS_PER_MSG + estimate_tokens(_get_msg_text(msg)) for msg in prompt
+    )
+
+
+def _get_msg_text(msg: Any) -> str:
+    if hasattr(msg, "to_content_dict"):
+        # Exactly the text that actually gets sent to Gemini.
+        return "\n".join(map(str, msg.to_content_dict()["parts"]))
+    match msg:
+        case {"content": str(content)}:
+            return content
+        case {"content": list(blocks)}:
+            return "\n".join(
+                block.get("text", "") if isinstance(block, dict) else str(block)
+                for block in blocks
+            )
+        case _:
+            return json.dumps(msg, default=str)
+
+
+def pick_by_prompt_size[T](
+    estimated_input_tokens: int, tiers: list[tuple[int, T]], default: T
+) -> T:
+    """Picks the option for the smallest size tier that the prompt fits within, or the default if
+    it's too big for all of them. Tiers are `(max input tokens, option)` pairs, e.g. to only send a
+    prompt to a slower model while it's small enough to still come back quickly, or to size the
+    `max_tokens` of the response.
+    """
+    for max_input_tokens, option in sorted(tiers, key=lambda tier: tier[0]):
+        if estimated_input_tokens <= max_input_tokens:
+            return option
+    return default
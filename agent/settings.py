@@ -5,6 +5,55 @@ from google.cloud import secretmanager_v1
 
 GCLOUD_PROJECT_ID: str | None = environ.get("GCLOUD_PROJECT_ID")
 
+# Can be pointed at a local stand-in server to exercise scraping and submission without hitting the
+# real AoC servers.
+AOC_BASE_URL: str = environ.get("AOC_BASE_URL", "https://adventofcode.com").rstrip("/")
+
+# Streams LLM responses, so that time to first token and generation speed get logged, and so that
+# structured responses can be abandoned as soon as they're clearly invalid instead of only once
+# they've been generated in full.
+LLM_STREAMING: bool = environ.get("LLM_STREAMING", "true").lower() in ("1", "true")
+
+# Default resource limits on every run of generated code made by the worker, so that a runaway
+# solution can't take the whole worker down with it. Set to 0 for no limit.
+GENERATED_CODE_MAX_MEMORY_MB: int | None = (
+    int(environ.get("GENERATED_CODE_MAX_MEMORY_MB", "2048")) or None
+)
+GENERATED_CODE_MAX_CPU_SECS: int | None = (
+    int(environ.get("GENERATED_CODE_MAX_CPU_SECS", "300")) or None
+)
+
+# Debugging prompts re-send the whole conversation so far, so the older debugging turns get
+# compacted once it grows past this many (estimated) tokens. Set to 0 to never compact.
+DEBUGGING_PROMPT_HISTORY_TOKEN_BUDGET: int | None = (
+    int(environ.get("DEBUGGING_PROMPT_HISTORY_TOKEN_BUDGET", "24000")) or None
+)
+
+# Subtasks that can be served by more than one model get routed to whichever has historically been
+# fastest while still succeeding reliably enough (see `agent/llm/usage/LLMRouter.py`). A small
+# fraction of calls still go to a random candidate so that the other models' history stays fresh.
+LLM_ROUTER_EXPLORATION_RATE: float = float(environ.get("LLM_ROUTER_EXPLORATION_RATE", "0.05"))
+LLM_ROUTER_MIN_SUCCESS_RATE: float = float(environ.get("LLM_ROUTER_MIN_SUCCESS_RATE", "0.9"))
+# Comma separated `subtask_name=model` pairs that bypass routing entirely, e.g.
+# "extract-examples=gemini-1.5-pro-002,contextualize-examples=gemini-1.5-flash".
+LLM_ROUTER_PINNED_MODELS: dict[str, str] = dict(
+    pair.split("=", 1) for pair in environ.get("LLM_ROUTER_PINNED_MODELS", "").split(",") if pair
+)
+
+# Swaps every LLM call out for the offline stand-in (see `agent/llm/offline/`), so that the rest of
+# the pipeline can be run (and benchmarked) without network access or any API keys.
+OFFLINE_LLM: bool = environ.get("OFFLINE_LLM", "").lower() in ("1", "true")
+OFFLINE_LLM_FIXTURES_DIR: str | None = environ.get("OFFLINE_LLM_FIXTURES_DIR")
+OFFLINE_LLM_LATENCY_SECS: float = float(environ.get("OFFLINE_LLM_LATENCY_SECS", "0"))
+# Unset means responses are generated instantly (beyond the fixed latency above).
+OFFLINE_LLM_OUTPUT_TOKENS_PER_SEC: float | None = (
+    float(environ["OFFLINE_LLM_OUTPUT_TOKENS_PER_SEC"])
+    if "OFFLINE_LLM_OUTPUT_TOKENS_PER_SEC" in environ
+    else None
+)
+# Placeholder for secrets that are never actually used when running offline.
+_OFFLINE_PLACEHOLDER_SECRET = "offline"
+
 
 def _get_secret(name: str) -> str:
     # Create a client
@@ -23,7 +72,9 @@ match environ.get("AOC_COOKIE"):
     case str(cookie):
         AOC_COOKIE = cookie
     case _:
-        if GCLOUD_PROJECT_ID:
+        if OFFLINE_LLM:
+            AOC_COOKIE = _OFFLINE_PLACEHOLDER_SECRET
+        elif GCLOUD_PROJECT_ID:
             AOC_COOKIE = _get_secret("aoc-cookie")
         else:
             raise RuntimeError("You must set the AOC_COOKIE env variable!")
@@ -33,7 +84,9 @@ match environ.get("ANTHROPIC_API_KEY"):
     case str(api_key):
         ANTHROPIC_API_KEY = api_key
     case _:
-        if GCLOUD_PROJECT_ID:
+        if OFFLINE_LLM:
+            ANTHROPIC_API_KEY = _OFFLINE_PLACEHOLDER_SECRET
+        elif GCLOUD_PROJECT_ID:
             ANTHROPIC_API_KEY = _get_secret("anthropic-api-key")
         else:
             raise RuntimeError("Must set ANTHROPIC_API_KEY env variable!")
@@ -43,7 +96,9 @@ match environ.get("GEMINI_API_KEY"):
     case str(api_key):
         GEMINI_API_KEY = api_key
     case _:
-        if GCLOUD_PROJECT_ID:
+        if OFFLINE_LLM:
+            GEMINI_API_KEY = _OFFLINE_PLACEHOLDER_SECRET
+        elif GCLOUD_PROJECT_ID:
             GEMINI_API_KEY = _get_secret("gemini-api-key")
         else:
             raise RuntimeError("Must set GEMINI_API_KEY env variable!")
@@ -53,7 +108,9 @@ match environ.get("OPENAI_API_KEY"):
     case str(api_key):
         OPENAI_API_KEY = api_key
     case _:
-        if GCLOUD_PROJECT_ID:
+        if OFFLINE_LLM:
+            OPENAI_API_KEY = _OFFLINE_PLACEHOLDER_SECRET
+        elif GCLOUD_PROJECT_ID:
             OPENAI_API_KEY = _get_secret("openai-api-key")
         else:
             raise RuntimeError("Must set OPENAI_API_KEY env variable!")
@@ -1,6 +1,9 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import timedelta
 from pathlib import Path
-import aiohttp
 import os
+from typing import AsyncIterator
 from pydantic import BaseModel
 from result import Err, Ok
 from temporalio import activity
@@ -9,6 +12,7 @@ from agent.adventofcode import (
     AoCProblem,
     AoCProblemExtractedExamples,
     ExamplesContext,
+    ExecutionWorkspace,
     FileToCommit,
     contextualize_examples,
     execute_generated_solution,
@@ -17,11 +21,21 @@ from agent.adventofcode import (
     generate_implementation,
     write_and_commit_changes,
 )
+from agent.adventofcode.debug.compact_prompt_history import compacted_debugging_prompt
 from agent.adventofcode.debug.RefactoringPlan import RefactoringPlan
 from agent.adventofcode.debug.debug_errors import theorize_solution, get_refactoring_plan
 from agent.adventofcode.debug.DebuggingPrompt import DebuggingPrompt
+from agent.adventofcode.debug.optimize_performance import optimize_implementation
 from agent.adventofcode.debug.TheorizedSolution import TheorizedSolution
-from agent.adventofcode.execute_generated_code import TestResults
+from agent.adventofcode.execute_generated_code import (
+    RuntimePrediction,
+    SolutionProfile,
+    SolutionWatchdogReport,
+    TestResults,
+    execute_candidate_tests,
+    execute_profiled_solution,
+    predict_solution_runtime,
+)
 from agent.adventofcode.generate_aoc_story_images import (
     ProblemStorySummary,
     extract_problem_story_summary,
@@ -38,23 +52,89 @@ from agent.adventofcode.generate_code.GeneratedImplementation import (
     GeneratedImplementation,
 )
 from agent.adventofcode.generate_code.GeneratedUnitTests import GeneratedUnitTests
+from agent.adventofcode.git_push_queue import push_pending_commits
+from agent.adventofcode.resource_limits import ResourceUsage
 from agent.adventofcode.scrape_problems import fetch_input, scrape_aoc
 from agent.adventofcode.submit_solution import submit
-from agent.llm.openai.generate_image import download_image, generate_image_to_url
-from agent.llm.usage.LLMUsage import configure_llm_usage_logging
+from agent.http_client import get_http_session
+from agent.llm.anthropic.models import AnthropicModel
+from agent.llm.gemini.models import GeminiModel
+from agent.llm.offline.prompt import clear_offline_problem, set_offline_problem_year
+from agent.llm.openai.generate_image import ImageResponseFormat, generate_image
+from agent.llm.usage.LLMRateLimiter import (
+    clear_llm_rate_limits,
+    configure_llm_rate_limits,
+    leave_llm_rate_limits,
+)
+from agent.llm.usage.LLMResponseCache import (
+    clear_llm_response_cache_config,
+    configure_llm_response_cache,
+)
+from agent.llm.usage.LLMUsage import clear_llm_usage_logging, configure_llm_usage_logging
+from agent.temporal.tracing import RECORD_SPANS_ACTIVITY_NAME, Span, log_spans
+
+
+class LLMProviderRateBudget(BaseModel):
+    # One of `KNOWN_LLM_PROVIDERS`.
+    provider: str
+    max_requests_per_minute: int
 
 
 class ConfigureLLMUsageLoggingArgs(BaseModel):
     year: int
     day: int
     log_dir: str
+    # Subtasks whose LLM responses may be served from the persistent response cache.
+    cached_llm_subtask_names: list[str] = []
+    # Shared by every workflow configured with the same rate limit scope (e.g. all the problems of a
+    # season run), until `clear_llm_rate_limits_for_workflow` is called with it.
+    llm_rate_limit_scope: str | None = None
+    llm_rate_budgets: list[LLMProviderRateBudget] = []
 
 
 @activity.defn
 async def configure_llm_usage_logging_for_workflow(args: ConfigureLLMUsageLoggingArgs) -> None:
     configure_llm_usage_logging(
-        execution_name=f"AgentOfCode-{args.year}-{args.day}", log_dir=Path(args.log_dir)
+        execution_name=f"AgentOfCode-{args.year}-{args.day}",
+        log_dir=Path(args.log_dir),
+        # Scoped to the workflow since other workflows may be running on this worker concurrently.
+        # See `LLMUsageLoggingScopeInterceptor`.
+        scope=activity.info().workflow_id,
     )
+    configure_llm_response_cache(
+        cache_dir=Path(args.log_dir),
+        cached_subtask_names=args.cached_llm_subtask_names,
+        scope=activity.info().workflow_id,
+    )
+    # Only matters when running offline, so that the right year's canned responses get served.
+    set_offline_problem_year(args.year, scope=activity.info().workflow_id)
+    if args.llm_rate_limit_scope is not None and args.llm_rate_budgets:
+        configure_llm_rate_limits(
+            {budget.provider: budget.max_requests_per_minute for budget in args.llm_rate_budgets},
+            scope=args.llm_rate_limit_scope,
+            logging_scope=activity.info().workflow_id,
+        )
+
+
+@activity.defn
+async def clear_llm_usage_logging_for_workflow() -> None:
+    """Undoes `configure_llm_usage_logging_for_workflow` once the workflow is done with it, since
+    the worker would otherwise hold on to every workflow's configs for as long as it runs."""
+    clear_llm_usage_logging(activity.info().workflow_id)
+    clear_llm_response_cache_config(activity.info().workflow_id)
+    leave_llm_rate_limits(activity.info().workflow_id)
+    clear_offline_problem(activity.info().workflow_id)
+
+
+@activity.defn
+async def clear_llm_rate_limits_for_workflow(llm_rate_limit_scope: str) -> None:
+    clear_llm_rate_limits(llm_rate_limit_scope)
+
+
+@activity.defn(name=RECORD_SPANS_ACTIVITY_NAME)
+async def record_spans(spans: list[Span]) -> None:
+    # Workflows can't write these out themselves. See `SpanTracingInterceptor`.
+    log_spans(spans)
 
 
 class ExtractProblemPartArgs(BaseModel):
@@ -73,26 +153,27 @@ async def extract_problem_part(args: ExtractProblemPartArgs) -> ExtractedProblem
     part_solutions_dir = os.path.join(args.solutions_dir, f"part{args.aoc_problem.part}")
     os.makedirs(part_solutions_dir, exist_ok=True)
 
-    async with aiohttp.ClientSession() as session:
-        return ExtractedProblemPart(
-            problem_html=await scrape_aoc(
-                session=session,
-                year=args.aoc_problem.year,
-                day=args.aoc_problem.day,
-                part=args.aoc_problem.part,
-                # Cache to `advent_of_code/year*/day*/part*/` dir, since this will NOT be shared
-                # between part1 and part2.
-                solutions_dir=part_solutions_dir,
-            ),
-            problem_input=await fetch_input(
-                session=session,
-                year=args.aoc_problem.year,
-                day=args.aoc_problem.day,
-                # Intentionally cache to top level `advent_of_code/year*/day*/` dir, since this will
-                # be shared between part1 and part2.
-                solutions_dir=args.solutions_dir,
-            ),
-        )
+    # Shared with every other activity on this worker, so connections to AoC get reused.
+    session = get_http_session()
+    return ExtractedProblemPart(
+        problem_html=await scrape_aoc(
+            session=session,
+            year=args.aoc_problem.year,
+            day=args.aoc_problem.day,
+            part=args.aoc_problem.part,
+            # Cache to `advent_of_code/year*/day*/part*/` dir, since this will NOT be shared
+            # between part1 and part2.
+            solutions_dir=part_solutions_dir,
+        ),
+        problem_input=await fetch_input(
+            session=session,
+            year=args.aoc_problem.year,
+            day=args.aoc_problem.day,
+            # Intentionally cache to top level `advent_of_code/year*/day*/` dir, since this will
+            # be shared between part1 and part2.
+            solutions_dir=args.solutions_dir,
+        ),
+    )
 
 
 class ExtractExamplesArgs(BaseModel):
@@ -130,11 +211,12 @@ class GetGeneratedUnitTestsArgs(BaseModel):
 
 @activity.defn
 async def get_generated_unit_tests(args: GetGeneratedUnitTestsArgs) -> GenerateUnitTestsOutput:
-    return await generate_unit_tests(
-        examples=args.examples,
-        examples_context=args.examples_context,
-        debugging_prompt=args.debugging_prompt,
-    )
+    with compacted_debugging_prompt(args.debugging_prompt) as debugging_prompt:
+        return await generate_unit_tests(
+            examples=args.examples,
+            examples_context=args.examples_context,
+            debugging_prompt=debugging_prompt,
+        )
 
 
 class GetGeneratedImplementationArgs(BaseModel):
@@ -143,19 +225,27 @@ class GetGeneratedImplementationArgs(BaseModel):
     solve_part_2: bool
     part_1_generated_implementation: GenerateImplementationOutput | None = None
     debugging_prompt: DebuggingPrompt | None = None
+    # Only applies to initial attempts. If unset, the default initial attempt model is used.
+    initial_attempt_model: AnthropicModel | GeminiModel | None = None
 
 
 @activity.defn
 async def get_generated_implementation(
     args: GetGeneratedImplementationArgs,
 ) -> GenerateImplementationOutput:
-    return await generate_implementation(
-        problem_html=args.extracted_problem_part.problem_html,
-        examples_context=args.examples_context,
-        solve_part_2=args.solve_part_2,
-        part_1_generated_implementation=args.part_1_generated_implementation,
-        debugging_prompt=args.debugging_prompt,
-    )
+    with compacted_debugging_prompt(args.debugging_prompt) as debugging_prompt:
+        return await generate_implementation(
+            problem_html=args.extracted_problem_part.problem_html,
+            examples_context=args.examples_context,
+            solve_part_2=args.solve_part_2,
+            part_1_generated_implementation=args.part_1_generated_implementation,
+            debugging_prompt=debugging_prompt,
+            **(
+                {"initial_attempt_model": args.initial_attempt_model}
+                if args.initial_attempt_model
+                else {}
+            ),
+        )
 
 
 class CommitChangesArgs(BaseModel):
@@ -170,7 +260,7 @@ class CommitChangesArgs(BaseModel):
 async def commit_changes(
     args: CommitChangesArgs,
 ) -> None:
-    return write_and_commit_changes(
+    return await write_and_commit_changes(
         basedir=args.solutions_dir,
         files=args.files,
         aoc_problem=args.aoc_problem,
@@ -180,17 +270,85 @@ async def commit_changes(
 
 
 @activity.defn
-async def run_generated_tests(aoc_problem: AoCProblem) -> TestResults:
-    return execute_tests(year=aoc_problem.year, day=aoc_problem.day, part=aoc_problem.part)
+async def push_committed_changes() -> None:
+    """Commits are otherwise only pushed in the background every so often, so this lets workflows
+    make sure that all of their progress has actually been pushed before they complete."""
+    await push_pending_commits()
+
+
+# Workflows should set a heartbeat timeout comfortably longer than this on activities that use
+# `_heartbeating()`.
+_HEARTBEAT_INTERVAL = timedelta(seconds=5)
+
+
+@asynccontextmanager
+async def _heartbeating() -> AsyncIterator[None]:
+    """Heartbeats for as long as the body of this context is running.
+
+    Lets Temporal tell that long running activities (e.g. running generated code) are still alive,
+    and is also what lets Temporal deliver cancellation to the activity at all.
+    """
+
+    async def heartbeat_forever() -> None:
+        while True:
+            activity.heartbeat()
+            await asyncio.sleep(_HEARTBEAT_INTERVAL.total_seconds())
+
+    heartbeat_task = asyncio.create_task(heartbeat_forever())
+    try:
+        yield
+    finally:
+        heartbeat_task.cancel()
+
+
+class RunGeneratedTestsArgs(BaseModel):
+    aoc_problem: AoCProblem
+    # Rerun only the previously failing tests first, stopping at the first failure. For quicker
+    # feedback while debugging.
+    quick: bool = False
+
+
+@activity.defn
+async def run_generated_tests(args: RunGeneratedTestsArgs) -> TestResults:
+    async with _heartbeating():
+        return await execute_tests(
+            ExecutionWorkspace.for_problem_part(
+                year=args.aoc_problem.year, day=args.aoc_problem.day, part=args.aoc_problem.part
+            ),
+            quick=args.quick,
+        )
+
+
+class RunCandidateImplementationTestsArgs(BaseModel):
+    unit_tests: GeneratedUnitTests
+    implementation: GeneratedImplementation
+    # If given, the implementation is statically checked to define it before running any tests.
+    tested_function_name: str | None = None
+
+
+@activity.defn
+async def run_candidate_implementation_tests(
+    args: RunCandidateImplementationTestsArgs,
+) -> TestResults:
+    async with _heartbeating():
+        return await execute_candidate_tests(
+            unit_tests_src=args.unit_tests.generated_unit_test_file_content,
+            implementation_src=args.implementation.generated_implementation_file_content,
+            tested_function_name=args.tested_function_name,
+        )
 
 
 class GeneratedSolutionRes(BaseModel):
     class Success(BaseModel):
         output: str
+        resource_usage: ResourceUsage | None = None
 
     class Failure(BaseModel):
         exit_code: int
         std_err: str
+        # Where the solution spent its time, e.g. which loop never terminated if it timed out.
+        watchdog_report: SolutionWatchdogReport | None = None
+        resource_usage: ResourceUsage | None = None
 
     result: Success | Failure
 
@@ -199,19 +357,73 @@ class GeneratedSolutionRes(BaseModel):
 async def run_generated_solution(
     aoc_problem: AoCProblem,
 ) -> GeneratedSolutionRes:
-    match execute_generated_solution(
-        year=aoc_problem.year, day=aoc_problem.day, part=aoc_problem.part
-    ):
-        case Ok(output):
-            return GeneratedSolutionRes(result=GeneratedSolutionRes.Success(output=output))
+    async with _heartbeating():
+        execute_generated_solution_result = await execute_generated_solution(
+            ExecutionWorkspace.for_problem_part(
+                year=aoc_problem.year, day=aoc_problem.day, part=aoc_problem.part
+            )
+        )
+    match execute_generated_solution_result:
+        case Ok(solution_output):
+            return GeneratedSolutionRes(
+                result=GeneratedSolutionRes.Success(
+                    output=solution_output.output, resource_usage=solution_output.resource_usage
+                )
+            )
         case Err(err):
             return GeneratedSolutionRes(
-                result=GeneratedSolutionRes.Failure(exit_code=err.returncode, std_err=err.stderr)
+                result=GeneratedSolutionRes.Failure(
+                    exit_code=err.returncode,
+                    std_err=err.stderr,
+                    watchdog_report=err.watchdog_report,
+                    resource_usage=err.resource_usage,
+                )
             )
         case _:
             raise ValueError("Unexpected execute generated solution result")
 
 
+@activity.defn
+async def predict_generated_solution_runtime(aoc_problem: AoCProblem) -> RuntimePrediction:
+    async with _heartbeating():
+        return await predict_solution_runtime(
+            ExecutionWorkspace.for_problem_part(
+                year=aoc_problem.year, day=aoc_problem.day, part=aoc_problem.part
+            )
+        )
+
+
+@activity.defn
+async def profile_generated_solution(aoc_problem: AoCProblem) -> SolutionProfile:
+    async with _heartbeating():
+        return await execute_profiled_solution(
+            ExecutionWorkspace.for_problem_part(
+                year=aoc_problem.year, day=aoc_problem.day, part=aoc_problem.part
+            )
+        )
+
+
+class GetOptimizedImplementationArgs(BaseModel):
+    implementation: GenerateImplementationOutput
+    solution_profile: SolutionProfile
+    timeout_secs: int
+    runtime_prediction: RuntimePrediction | None = None
+    watchdog_report: SolutionWatchdogReport | None = None
+
+
+@activity.defn
+async def get_optimized_implementation(
+    args: GetOptimizedImplementationArgs,
+) -> GenerateImplementationOutput:
+    return await optimize_implementation(
+        implementation=args.implementation,
+        solution_profile=args.solution_profile,
+        timeout_secs=args.timeout_secs,
+        runtime_prediction=args.runtime_prediction,
+        watchdog_report=args.watchdog_report,
+    )
+
+
 class DebugUnitTestFailuresArgs(BaseModel):
     problem_html: str
     examples_context: ExamplesContext
@@ -261,6 +473,7 @@ class SubmitSolutionArgs(BaseModel):
 @activity.defn
 async def submit_solution(args: SubmitSolutionArgs) -> bool:
     return await submit(
+        session=get_http_session(),
         year=args.aoc_problem.year,
         day=args.aoc_problem.day,
         part=args.aoc_problem.part,
@@ -282,11 +495,15 @@ async def meta_get_image_generation_prompt(problem_story_summary: ProblemStorySu
 class GenerateCelebratoryImageArgs(BaseModel):
     image_generation_prompt: str
     solutions_dir: str
+    # Inline base64 saves a second round trip to download the image from a url.
+    image_response_format: ImageResponseFormat = "b64_json"
 
 
 @activity.defn
 async def generate_celebratory_image(args: GenerateCelebratoryImageArgs) -> None:
-    await download_image(
-        await generate_image_to_url(args.image_generation_prompt),
+    await generate_image(
+        get_http_session(),
+        args.image_generation_prompt,
         os.path.join(args.solutions_dir, "generated_aoc_story_image.png"),
+        response_format=args.image_response_format,
     )
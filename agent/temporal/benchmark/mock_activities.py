@@ -0,0 +1,420 @@
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from enum import StrEnum
+from pathlib import Path
+from typing import Callable
+
+from temporalio import activity
+
+from agent.adventofcode.contextualize_examples import ExamplesContext
+from agent.adventofcode.debug.DebuggingPrompt import DebuggingPrompt
+from agent.adventofcode.debug.RefactoringPlan import RefactoringPlan
+from agent.adventofcode.debug.TheorizedSolution import TheorizedSolution
+from agent.adventofcode.execute_generated_code import (
+    RuntimePrediction,
+    SolutionProfile,
+    SolutionWatchdogReport,
+    TestResults,
+)
+from agent.adventofcode.extract_examples import AoCProblemExtractedExamples
+from agent.adventofcode.generate_code.GeneratedImplementation import GeneratedImplementation
+from agent.adventofcode.generate_code.GeneratedUnitTests import GeneratedUnitTests
+from agent.adventofcode.generate_code.generate_implementation import (
+    GenerateImplementationOutput,
+)
+from agent.adventofcode.generate_code.generate_unit_tests import GenerateUnitTestsOutput
+from agent.llm.gemini.prompt import ModelMessage, UserMessage
+from agent.temporal.activities import (
+    AoCProblem,
+    CommitChangesArgs,
+    ConfigureLLMUsageLoggingArgs,
+    DebugUnitTestFailuresArgs,
+    ExtractExamplesArgs,
+    ExtractProblemPartArgs,
+    ExtractedProblemPart,
+    GeneratedSolutionRes,
+    GetExamplesContextArgs,
+    GetGeneratedImplementationArgs,
+    GetGeneratedUnitTestsArgs,
+    GetOptimizedImplementationArgs,
+    PlanImplRefactoringArgs,
+    RunCandidateImplementationTestsArgs,
+    RunGeneratedTestsArgs,
+    SubmitSolutionArgs,
+)
+from agent.temporal.tracing import RECORD_SPANS_ACTIVITY_NAME, Span
+
+# Committed solution files just so that the payloads flowing through the workflow are roughly the
+# size of the real thing.
+_SAMPLE_SOLUTION_DIR = Path(__file__).parents[3] / "advent_of_code/year2024/day1"
+# Real problem descriptions are a few KB of HTML, and real inputs are usually 10-20KB.
+_SAMPLE_PROBLEM_HTML = (
+    "<article class='day-desc'><h2>--- Day 1: Benchmark ---</h2>"
+    + "<p>The Elves need your help benchmarking their orchestration overhead.</p>" * 80
+    + "</article>"
+)
+_SAMPLE_PROBLEM_INPUT = "".join(f"{i * 7919 % 99991}   {i * 104729 % 99991}\n" for i in range(1000))
+_SAMPLE_ERR_MSG = (
+    "FAILED tests.py::test_examples[example0] - AssertionError: assert 10 == 11\n" * 3
+)
+
+
+class WorkflowKind(StrEnum):
+    SOLVE_PROBLEM = "SolveAoCProblemWorkflow"
+    DEBUG_LOOP = "IterativelyMakeUnitTestsPassWorkflow"
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    workflow_kind: WorkflowKind
+    # Number of times the unit tests fail before passing, per part. Failing at least
+    # `_MAX_UNIT_TEST_FIX_ITERATIONS` times exhausts the debugging loop.
+    failing_unit_test_runs_by_part: dict[int, int] = field(default_factory=dict)
+    # Number of times running the solution on the problem input times out, per part. These get
+    # stopped by the solution's own watchdog, just short of the activity's timeout.
+    solution_timeouts_by_part: dict[int, int] = field(default_factory=dict)
+    # Number of times running the solution hangs until the activity itself times out, per part (e.g.
+    # stuck in C code that the watchdog can't interrupt). Counted after `solution_timeouts_by_part`.
+    solution_activity_timeouts_by_part: dict[int, int] = field(default_factory=dict)
+    # Number of times the solution crashes on the problem input (e.g. running into its memory
+    # limit) despite passing the unit tests, per part. Counted after all of the timeouts.
+    solution_crashes_by_part: dict[int, int] = field(default_factory=dict)
+    # Number of times the solution is predicted to blow way past its timeout, per part. Predictions
+    # only get made while a run is still going after a few seconds, i.e. one of the hanging ones.
+    slow_runtime_predictions_by_part: dict[int, int] = field(default_factory=dict)
+    # Whether the workflow is expected to fail (e.g. it ran out of debugging iterations).
+    expect_failure: bool = False
+
+
+SCENARIOS = [
+    Scenario(
+        name="first_try_pass",
+        description="The initial unit tests pass against the initial implementation.",
+        workflow_kind=WorkflowKind.DEBUG_LOOP,
+    ),
+    Scenario(
+        name="max_debug_iterations",
+        description="The unit tests never pass, so the debugging loop runs out of iterations.",
+        workflow_kind=WorkflowKind.DEBUG_LOOP,
+        failing_unit_test_runs_by_part={1: 1_000},
+        expect_failure=True,
+    ),
+    Scenario(
+        name="timeout_then_retry",
+        description="Part 1's solution times out once, so it's profiled and optimized before rerunning it.",  # noqa: E501
+        workflow_kind=WorkflowKind.SOLVE_PROBLEM,
+        solution_timeouts_by_part={1: 1},
+    ),
+    Scenario(
+        name="activity_timeout_then_retry",
+        description="Part 1's solution hangs past the activity's timeout once, so it's profiled and optimized before rerunning it.",  # noqa: E501
+        workflow_kind=WorkflowKind.SOLVE_PROBLEM,
+        solution_activity_timeouts_by_part={1: 1},
+    ),
+    Scenario(
+        name="always_times_out",
+        description="Part 1's solution always hangs past the activity's timeout, so every attempt runs out of optimization iterations.",  # noqa: E501
+        workflow_kind=WorkflowKind.SOLVE_PROBLEM,
+        solution_activity_timeouts_by_part={1: 1_000},
+        expect_failure=True,
+    ),
+    Scenario(
+        name="crash_then_retry",
+        description="Part 1's solution runs out of memory on the problem input once, so that attempt starts over from scratch.",  # noqa: E501
+        workflow_kind=WorkflowKind.SOLVE_PROBLEM,
+        solution_crashes_by_part={1: 1},
+    ),
+    Scenario(
+        name="predicted_timeout_on_first_run",
+        description="Part 1's solution is still running after a few seconds and is predicted to time out, so it's cancelled and optimized without waiting out the timeout.",  # noqa: E501
+        workflow_kind=WorkflowKind.SOLVE_PROBLEM,
+        solution_activity_timeouts_by_part={1: 1},
+        slow_runtime_predictions_by_part={1: 1},
+    ),
+    Scenario(
+        name="predicted_timeout",
+        description="Part 1's solution times out, and its optimized version is predicted to time out too, so that's cancelled and optimized again without waiting out the timeout.",  # noqa: E501
+        workflow_kind=WorkflowKind.SOLVE_PROBLEM,
+        solution_timeouts_by_part={1: 1},
+        solution_activity_timeouts_by_part={1: 1},
+        slow_runtime_predictions_by_part={1: 1},
+    ),
+    Scenario(
+        name="part_2_after_part_1",
+        description="Both parts are solved, each after a couple of debugging iterations.",
+        workflow_kind=WorkflowKind.SOLVE_PROBLEM,
+        failing_unit_test_runs_by_part={1: 2, 2: 2},
+    ),
+]
+
+
+class MockActivities:
+    """Stand-ins for every activity the workflows call, scripted by a `Scenario`.
+
+    These return instantly with realistically sized payloads (including prompt histories that grow
+    with every debugging iteration), so that everything measured is the orchestration itself.
+    """
+
+    def __init__(self, scenario: Scenario):
+        self.scenario = scenario
+        self._unit_test_runs_by_part: Counter[int] = Counter()
+        self._solution_runs_by_part: Counter[int] = Counter()
+        self._runtime_predictions_by_part: Counter[int] = Counter()
+
+    def all(self) -> list[Callable]:
+        return [
+            self.configure_llm_usage_logging_for_workflow,
+            self.clear_llm_usage_logging_for_workflow,
+            self.record_spans,
+            self.extract_problem_part,
+            self.extract_examples,
+            self.get_examples_context,
+            self.get_generated_unit_tests,
+            self.get_generated_implementation,
+            self.commit_changes,
+            self.run_generated_tests,
+            self.run_candidate_implementation_tests,
+            self.predict_generated_solution_runtime,
+            self.run_generated_solution,
+            self.profile_generated_solution,
+            self.get_optimized_implementation,
+            self.debug_unit_test_failures,
+            self.plan_impl_refactoring,
+            self.submit_solution,
+        ]
+
+    @activity.defn(name="configure_llm_usage_logging_for_workflow")
+    async def configure_llm_usage_logging_for_workflow(
+        self, args: ConfigureLLMUsageLoggingArgs
+    ) -> None:
+        pass
+
+    @activity.defn(name="clear_llm_usage_logging_for_workflow")
+    async def clear_llm_usage_logging_for_workflow(self) -> None:
+        pass
+
+    @activity.defn(name=RECORD_SPANS_ACTIVITY_NAME)
+    async def record_spans(self, spans: list[Span]) -> None:
+        pass
+
+    @activity.defn(name="extract_problem_part")
+    async def extract_problem_part(self, args: ExtractProblemPartArgs) -> ExtractedProblemPart:
+        problem_html = _SAMPLE_PROBLEM_HTML
+        if args.aoc_problem.part == 2:
+            problem_html += "<!-- Part 2 -->" + _SAMPLE_PROBLEM_HTML
+        return ExtractedProblemPart(problem_html=problem_html, problem_input=_SAMPLE_PROBLEM_INPUT)
+
+    @activity.defn(name="extract_examples")
+    async def extract_examples(self, args: ExtractExamplesArgs) -> AoCProblemExtractedExamples:
+        return AoCProblemExtractedExamples(
+            examples=[
+                AoCProblemExtractedExamples.Example(
+                    input="3   4\n4   3\n2   5\n1   3\n3   9\n3   3", output="11"
+                )
+            ]
+        )
+
+    @activity.defn(name="get_examples_context")
+    async def get_examples_context(self, args: GetExamplesContextArgs) -> ExamplesContext:
+        return ExamplesContext(
+            examples_context="Each example is a list of pairs of location IDs.",
+            tested_function_details=ExamplesContext.SuggestedTestedFunctionDetails(
+                name="total_distance",
+                input_type_annotations=["list[tuple[int, int]]"],
+                output_type_annotation="int",
+            ),
+        )
+
+    @activity.defn(name="get_generated_unit_tests")
+    async def get_generated_unit_tests(
+        self, args: GetGeneratedUnitTestsArgs
+    ) -> GenerateUnitTestsOutput:
+        generated_unit_tests = GeneratedUnitTests(
+            generated_unit_test_file_content=(_SAMPLE_SOLUTION_DIR / "part1/tests.py").read_text()
+        )
+        return GenerateUnitTestsOutput(
+            prompt_history=_extend_prompt_history(
+                args.debugging_prompt, generated_unit_tests.model_dump()
+            ),
+            generated_unit_tests=generated_unit_tests,
+        )
+
+    @activity.defn(name="get_generated_implementation")
+    async def get_generated_implementation(
+        self, args: GetGeneratedImplementationArgs
+    ) -> GenerateImplementationOutput:
+        part = 2 if args.solve_part_2 else 1
+        generated_implementation = GeneratedImplementation(
+            generated_implementation_file_content=(
+                _SAMPLE_SOLUTION_DIR / f"part{part}/solution.py"
+            ).read_text()
+        )
+        return GenerateImplementationOutput(
+            prompt_history=_extend_prompt_history(
+                args.debugging_prompt, generated_implementation.model_dump()
+            ),
+            generated_implementation=generated_implementation,
+        )
+
+    @activity.defn(name="commit_changes")
+    async def commit_changes(self, args: CommitChangesArgs) -> None:
+        pass
+
+    @activity.defn(name="run_generated_tests")
+    async def run_generated_tests(self, args: RunGeneratedTestsArgs) -> TestResults:
+        self._unit_test_runs_by_part[args.aoc_problem.part] += 1
+        if self._unit_test_runs_by_part[
+            args.aoc_problem.part
+        ] <= self.scenario.failing_unit_test_runs_by_part.get(args.aoc_problem.part, 0):
+            return TestResults(result=TestResults.Failure(err_msg=_SAMPLE_ERR_MSG))
+        return TestResults(result=TestResults.Success())
+
+    @activity.defn(name="run_candidate_implementation_tests")
+    async def run_candidate_implementation_tests(
+        self, args: RunCandidateImplementationTestsArgs
+    ) -> TestResults:
+        return TestResults(result=TestResults.Success())
+
+    @activity.defn(name="predict_generated_solution_runtime")
+    async def predict_generated_solution_runtime(
+        self, aoc_problem: AoCProblem
+    ) -> RuntimePrediction:
+        self._runtime_predictions_by_part[aoc_problem.part] += 1
+        slow = self._runtime_predictions_by_part[
+            aoc_problem.part
+        ] <= self.scenario.slow_runtime_predictions_by_part.get(aoc_problem.part, 0)
+        return RuntimePrediction(
+            total_input_lines=1_000,
+            samples=[
+                RuntimePrediction.Sample(input_lines=2**i * 31, secs=(4**i if slow else 2**i) / 100)
+                for i in range(5)
+            ],
+            growth_exponent=2.0 if slow else 1.0,
+            predicted_secs=10_000.0 if slow else 0.32,
+        )
+
+    @activity.defn(name="run_generated_solution")
+    async def run_generated_solution(self, aoc_problem: AoCProblem) -> GeneratedSolutionRes:
+        self._solution_runs_by_part[aoc_problem.part] += 1
+        solution_runs = self._solution_runs_by_part[aoc_problem.part]
+        watchdog_timeouts = self.scenario.solution_timeouts_by_part.get(aoc_problem.part, 0)
+        if watchdog_timeouts < solution_runs <= (
+            watchdog_timeouts
+            + self.scenario.solution_activity_timeouts_by_part.get(aoc_problem.part, 0)
+        ):
+            # Just hang without heartbeating. The time-skipping test server fast-forwards straight
+            # to the runtime prediction (which may get this cancelled) or else the activity's
+            # heartbeat timeout, and the worker cancels this on shutdown either way.
+            await asyncio.Future()
+        if solution_runs <= watchdog_timeouts:
+            # The solution's watchdog stops it just short of the activity's timeout.
+            return GeneratedSolutionRes(
+                result=GeneratedSolutionRes.Failure(
+                    exit_code=124,
+                    std_err="The solution ran out of its 220s time budget.",
+                    watchdog_report=SolutionWatchdogReport(
+                        timed_out=True,
+                        elapsed_secs=220.0,
+                        peak_rss_mb=160.2,
+                        baseline_rss_mb=155.1,
+                        hot_stacks=[
+                            SolutionWatchdogReport.HotStack(
+                                frames=["solution:20", "count_pairs:12"],
+                                source="if a < b:",
+                                samples=14_000,
+                            )
+                        ],
+                        total_samples=14_000,
+                    ),
+                )
+            )
+        if solution_runs <= (
+            watchdog_timeouts
+            + self.scenario.solution_activity_timeouts_by_part.get(aoc_problem.part, 0)
+            + self.scenario.solution_crashes_by_part.get(aoc_problem.part, 0)
+        ):
+            return GeneratedSolutionRes(
+                result=GeneratedSolutionRes.Failure(
+                    exit_code=1,
+                    std_err="MemoryError\nThe solution ran into its 2048MB memory limit.",
+                )
+            )
+        return GeneratedSolutionRes(result=GeneratedSolutionRes.Success(output="2164381"))
+
+    @activity.defn(name="profile_generated_solution")
+    async def profile_generated_solution(self, aoc_problem: AoCProblem) -> SolutionProfile:
+        return SolutionProfile(
+            profiled_secs=30.0,
+            completed=False,
+            hot_functions=[
+                SolutionProfile.HotFunction(
+                    function="count_pairs",
+                    lineno=8,
+                    calls=1,
+                    self_secs=29.5,
+                    cumulative_secs=29.9,
+                )
+            ],
+            hot_lines=[
+                SolutionProfile.HotLine(lineno=12, source="if a < b:", samples=4_000),
+                SolutionProfile.HotLine(lineno=13, source="total += 1", samples=2_000),
+            ],
+            total_samples=6_000,
+        )
+
+    @activity.defn(name="get_optimized_implementation")
+    async def get_optimized_implementation(
+        self, args: GetOptimizedImplementationArgs
+    ) -> GenerateImplementationOutput:
+        generated_implementation = args.implementation.generated_implementation
+        return GenerateImplementationOutput(
+            prompt_history=[
+                *args.implementation.prompt_history,
+                UserMessage(msg=args.solution_profile.model_dump_json()),
+                ModelMessage(msg=generated_implementation.model_dump()),
+            ],
+            generated_implementation=generated_implementation,
+        )
+
+    @activity.defn(name="debug_unit_test_failures")
+    async def debug_unit_test_failures(self, args: DebugUnitTestFailuresArgs) -> TheorizedSolution:
+        # Alternate between fixing just the implementation and fixing both files, so that both of
+        # the debugging loop's code paths get exercised.
+        fix_unit_tests = sum(self._unit_test_runs_by_part.values()) % 2 == 0
+        return TheorizedSolution(
+            problem_explanation="The implementation sorts the lists in the wrong order. " * 5,
+            optional_theorized_unit_test_fix=(
+                "The expected value in the second example is wrong." if fix_unit_tests else None
+            ),
+            optional_theorized_implementation_fix="Sort both lists ascending before pairing. " * 5,
+        )
+
+    @activity.defn(name="plan_impl_refactoring")
+    async def plan_impl_refactoring(self, args: PlanImplRefactoringArgs) -> RefactoringPlan:
+        return RefactoringPlan(
+            plan=[
+                RefactoringPlan.Step(step="Sort the left list ascending."),
+                RefactoringPlan.Step(step="Sort the right list ascending."),
+                RefactoringPlan.Step(step="Sum the absolute differences of the pairs."),
+            ]
+        )
+
+    @activity.defn(name="submit_solution")
+    async def submit_solution(self, args: SubmitSolutionArgs) -> bool:
+        return True
+
+
+def _extend_prompt_history(
+    debugging_prompt: DebuggingPrompt | None, response: dict
+) -> list[UserMessage | ModelMessage]:
+    # Mirrors how the real prompts carry the whole conversation forward on every debugging turn.
+    if debugging_prompt is None:
+        return [UserMessage(msg=_SAMPLE_PROBLEM_HTML), ModelMessage(msg=response)]
+    return [
+        *debugging_prompt.prior_msg_history,
+        UserMessage(msg=debugging_prompt.error_msg),
+        ModelMessage(msg=response),
+    ]
@@ -0,0 +1,281 @@
+import json
+import statistics
+import time
+from collections import defaultdict
+from typing import Any
+
+import asyncclick as click
+from temporalio.api.history.v1 import HistoryEvent
+from temporalio.client import Client, WorkflowFailureError, WorkflowHandle
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker
+
+from agent.temporal.activities import (
+    AoCProblem,
+    ExtractExamplesArgs,
+    ExtractProblemPartArgs,
+    GetExamplesContextArgs,
+    GetGeneratedImplementationArgs,
+    GetGeneratedUnitTestsArgs,
+)
+from agent.temporal.benchmark.mock_activities import (
+    SCENARIOS,
+    MockActivities,
+    Scenario,
+    WorkflowKind,
+)
+from agent.temporal.benchmark.workflows import (
+    IterativelyMakeUnitTestsPassWorkflow,
+    IterativelyMakeUnitTestsPassWorkflowArgs,
+)
+from agent.temporal.interceptors import SpanTracingInterceptor
+from agent.temporal.workflow import SolveAoCProblemWorkflow, SolveAoCProblemWorkflowArgs
+
+_TASK_QUEUE = "aoc-agent-benchmark"
+
+
+async def _start_scenario_workflow(
+    client: Client, mocks: MockActivities, workflow_id: str
+) -> WorkflowHandle:
+    match mocks.scenario.workflow_kind:
+        case WorkflowKind.SOLVE_PROBLEM:
+            return await client.start_workflow(
+                SolveAoCProblemWorkflow.run,
+                SolveAoCProblemWorkflowArgs(
+                    year=2024, day=1, solutions_dir="/dev/null", log_dir="/dev/null", dry_run=True
+                ),
+                id=workflow_id,
+                task_queue=_TASK_QUEUE,
+            )
+        case WorkflowKind.DEBUG_LOOP:
+            # The debugging loop picks up wherever the first half of `_solve_part` left off, so
+            # seed it with whatever the mocks would've generated up to that point. Calling the mocks
+            # directly here keeps these out of the measured workflow history.
+            aoc_problem = AoCProblem(year=2024, day=1, part=1)
+            problem_part = await mocks.extract_problem_part(
+                ExtractProblemPartArgs(aoc_problem=aoc_problem, solutions_dir="/dev/null")
+            )
+            extracted_examples = await mocks.extract_examples(
+                ExtractExamplesArgs(extracted_problem_part=problem_part, solve_part_2=False)
+            )
+            examples_context = await mocks.get_examples_context(
+                GetExamplesContextArgs(
+                    extracted_problem_part=problem_part,
+                    extracted_examples=extracted_examples,
+                    solve_part_2=False,
+                )
+            )
+            return await client.start_workflow(
+                IterativelyMakeUnitTestsPassWorkflow.run,
+                IterativelyMakeUnitTestsPassWorkflowArgs(
+                    solve_aoc_problem_req=aoc_problem,
+                    solutions_dir="/dev/null",
+                    problem_part=problem_part,
+                    extracted_examples=extracted_examples,
+                    examples_context=examples_context,
+                    unit_tests=await mocks.get_generated_unit_tests(
+                        GetGeneratedUnitTestsArgs(
+                            examples=extracted_examples, examples_context=examples_context
+                        )
+                    ),
+                    implementation=await mocks.get_generated_implementation(
+                        GetGeneratedImplementationArgs(
+                            extracted_problem_part=problem_part,
+                            examples_context=examples_context,
+                            solve_part_2=False,
+                        )
+                    ),
+                ),
+                id=workflow_id,
+                task_queue=_TASK_QUEUE,
+            )
+
+
+def _summarize_history(events: list[HistoryEvent]) -> dict[str, Any]:
+    """Per-activity-type execution counts, payload sizes and latencies, straight from the history.
+
+    Note that event timestamps come from the test server's clock, which gets skipped forward past
+    any timeouts. So latencies here only reflect orchestration overhead, not the activities' own
+    (mocked) work.
+    """
+    activity_type_by_scheduled_event_id: dict[int, str] = {}
+    scheduled_time_by_event_id: dict[int, float] = {}
+    started_time_by_event_id: dict[int, float] = {}
+    activity_stats: dict[str, dict[str, Any]] = defaultdict(
+        lambda: {
+            "executions": 0,
+            "timeouts": 0,
+            "failures": 0,
+            "input_bytes": 0,
+            "result_bytes": 0,
+            "schedule_to_start_ms": [],
+            "start_to_close_ms": [],
+        }
+    )
+    workflow_task_latencies_ms: list[float] = []
+    workflow_task_scheduled_time = 0.0
+
+    for event in events:
+        event_time = event.event_time.ToMicroseconds() / 1_000
+        if event.HasField("activity_task_scheduled_event_attributes"):
+            attrs = event.activity_task_scheduled_event_attributes
+            activity_type_by_scheduled_event_id[event.event_id] = attrs.activity_type.name
+            scheduled_time_by_event_id[event.event_id] = event_time
+            activity_stats[attrs.activity_type.name]["input_bytes"] += sum(
+                len(p.data) for p in attrs.input.payloads
+            )
+        elif event.HasField("activity_task_started_event_attributes"):
+            attrs = event.activity_task_started_event_attributes
+            stats = activity_stats[activity_type_by_scheduled_event_id[attrs.scheduled_event_id]]
+            # Started events are only recorded once the final attempt is done, so this includes
+            # any retries along the way.
+            stats["executions"] += attrs.attempt
+            stats["schedule_to_start_ms"].append(
+                event_time - scheduled_time_by_event_id[attrs.scheduled_event_id]
+            )
+            started_time_by_event_id[attrs.scheduled_event_id] = event_time
+        elif event.HasField("activity_task_completed_event_attributes"):
+            attrs = event.activity_task_completed_event_attributes
+            stats = activity_stats[activity_type_by_scheduled_event_id[attrs.scheduled_event_id]]
+            stats["result_bytes"] += sum(len(p.data) for p in attrs.result.payloads)
+            stats["start_to_close_ms"].append(
+                event_time - started_time_by_event_id[attrs.scheduled_event_id]
+            )
+        elif event.HasField("activity_task_timed_out_event_attributes"):
+            attrs = event.activity_task_timed_out_event_attributes
+            activity_stats[activity_type_by_scheduled_event_id[attrs.scheduled_event_id]][
+                "timeouts"
+            ] += 1
+        elif event.HasField("activity_task_failed_event_attributes"):
+            attrs = event.activity_task_failed_event_attributes
+            activity_stats[activity_type_by_scheduled_event_id[attrs.scheduled_event_id]][
+                "failures"
+            ] += 1
+        elif event.HasField("workflow_task_scheduled_event_attributes"):
+            workflow_task_scheduled_time = event_time
+        elif event.HasField("workflow_task_completed_event_attributes"):
+            workflow_task_latencies_ms.append(event_time - workflow_task_scheduled_time)
+
+    for stats in activity_stats.values():
+        for latency_key in ("schedule_to_start_ms", "start_to_close_ms"):
+            stats[latency_key] = _mean(stats[latency_key])
+    return {
+        "activities": dict(activity_stats),
+        "activity_executions": sum(s["executions"] for s in activity_stats.values()),
+        "payload_bytes": sum(s["input_bytes"] + s["result_bytes"] for s in activity_stats.values()),
+        "history_events": len(events),
+        "history_bytes": sum(event.ByteSize() for event in events),
+        "workflow_tasks": len(workflow_task_latencies_ms),
+        "workflow_task_latency_ms": _mean(workflow_task_latencies_ms),
+    }
+
+
+def _mean(latencies_ms: list[float]) -> float:
+    return round(statistics.mean(latencies_ms), 1) if latencies_ms else 0.0
+
+
+async def _run_scenario(env: WorkflowEnvironment, scenario: Scenario, run: int) -> dict[str, Any]:
+    mocks = MockActivities(scenario)
+    async with Worker(
+        env.client,
+        task_queue=_TASK_QUEUE,
+        workflows=[SolveAoCProblemWorkflow, IterativelyMakeUnitTestsPassWorkflow],
+        activities=mocks.all(),
+        # Tracing is part of the orchestration overhead of the real worker.
+        interceptors=[SpanTracingInterceptor()],
+    ):
+        start = time.perf_counter()
+        handle = await _start_scenario_workflow(
+            env.client, mocks, workflow_id=f"benchmark-{scenario.name}-{run}"
+        )
+        # Awaiting the result is what lets the test server automatically skip time forward (e.g.
+        # straight to an activity's timeout) whenever the workflow is just waiting around.
+        try:
+            await handle.result()
+            outcome = "succeeded"
+        except WorkflowFailureError:
+            outcome = "failed"
+        wall_clock_ms = (time.perf_counter() - start) * 1_000
+
+    if outcome != ("failed" if scenario.expect_failure else "succeeded"):
+        raise click.ClickException(f"Scenario {scenario.name} unexpectedly {outcome}.")
+    history = await handle.fetch_history()
+    return {
+        "outcome": outcome,
+        "wall_clock_ms": round(wall_clock_ms, 1),
+        **_summarize_history(list(history.events)),
+    }
+
+
+def _merge_runs(runs: list[dict[str, Any]]) -> dict[str, Any]:
+    """Everything but the timings is deterministic across runs, so just take the median timings."""
+    merged = runs[0]
+    merged["wall_clock_ms"] = round(statistics.median(r["wall_clock_ms"] for r in runs), 1)
+    merged["workflow_task_latency_ms"] = round(
+        statistics.median(r["workflow_task_latency_ms"] for r in runs), 1
+    )
+    for activity_type, stats in merged["activities"].items():
+        for latency_key in ("schedule_to_start_ms", "start_to_close_ms"):
+            stats[latency_key] = round(
+                statistics.median(r["activities"][activity_type][latency_key] for r in runs), 1
+            )
+    return merged
+
+
+@click.command()
+@click.option(
+    "--output",
+    default="workflow_benchmarks.json",
+    type=click.Path(dir_okay=False),
+    help="File to write the results to. Commit-to-commit diffs of this file show any regressions.",
+)
+@click.option(
+    "--scenario",
+    "scenario_names",
+    multiple=True,
+    type=click.Choice([s.name for s in SCENARIOS]),
+    help="Only run the given scenario. May be repeated. Defaults to every scenario.",
+)
+@click.option(
+    "--repeat",
+    default=3,
+    type=click.IntRange(min=1),
+    help="Number of times to run each scenario. Timings are reported as the median over runs.",
+)
+@click.option(
+    "--test-server-path",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Existing Temporal test server binary to use instead of downloading one.",
+)
+async def main(
+    output: str,
+    scenario_names: tuple[str, ...],
+    repeat: int,
+    test_server_path: str | None,
+) -> None:
+    scenarios = [s for s in SCENARIOS if not scenario_names or s.name in scenario_names]
+    results: dict[str, Any] = {}
+    async with await WorkflowEnvironment.start_time_skipping(
+        test_server_existing_path=test_server_path
+    ) as env:
+        for scenario in scenarios:
+            click.echo(f"Running {scenario.name} ({scenario.description})")
+            results[scenario.name] = _merge_runs(
+                [await _run_scenario(env, scenario, run) for run in range(repeat)]
+            )
+            click.echo(
+                f"  {results[scenario.name]['activity_executions']} activity executions, "
+                f"{results[scenario.name]['payload_bytes']} payload bytes, "
+                f"{results[scenario.name]['wall_clock_ms']}ms wall clock"
+            )
+
+    with open(output, "w") as f:
+        # Sorted and indented so that the results diff cleanly between commits.
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    click.echo(f"Wrote results to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+from pydantic import BaseModel
+from temporalio import workflow
+
+
+# Imports passed through Temporal's sandbox without overriding stdlib.
+with workflow.unsafe.imports_passed_through():
+    from agent.adventofcode.contextualize_examples import ExamplesContext
+    from agent.adventofcode.extract_examples import AoCProblemExtractedExamples
+    from agent.adventofcode.generate_code.generate_implementation import (
+        GenerateImplementationOutput,
+    )
+    from agent.adventofcode.generate_code.generate_unit_tests import (
+        GenerateUnitTestsOutput,
+    )
+    from agent.temporal.activities import AoCProblem, ExtractedProblemPart
+    from agent.temporal.workflow import iteratively_make_unit_tests_pass
+
+
+class IterativelyMakeUnitTestsPassWorkflowArgs(BaseModel):
+    solve_aoc_problem_req: AoCProblem
+    solutions_dir: str
+    problem_part: ExtractedProblemPart
+    extracted_examples: AoCProblemExtractedExamples
+    examples_context: ExamplesContext
+    unit_tests: GenerateUnitTestsOutput
+    implementation: GenerateImplementationOutput
+
+
+# The debugging loop is just a helper called from within `SolveAoCProblemWorkflow`, so it needs its
+# own workflow to be benchmarked in isolation.
+@workflow.defn
+class IterativelyMakeUnitTestsPassWorkflow:
+    @workflow.run
+    async def run(self, args: IterativelyMakeUnitTestsPassWorkflowArgs) -> None:
+        await iteratively_make_unit_tests_pass(
+            solve_aoc_problem_req=args.solve_aoc_problem_req,
+            solutions_dir=args.solutions_dir,
+            problem_part=args.problem_part,
+            dry_run=True,
+            extracted_examples=args.extracted_examples,
+            examples_context=args.examples_context,
+            unit_tests=args.unit_tests,
+            implementation=args.implementation,
+        )
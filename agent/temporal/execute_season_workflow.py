@@ -0,0 +1,142 @@
+import os
+import subprocess
+import time
+
+import asyncclick as click
+
+from agent import settings
+from agent.llm.anthropic.models import AnthropicModel
+from agent.llm.gemini.models import GeminiModel
+from agent.llm.usage.LLMRateLimiter import KNOWN_LLM_PROVIDERS
+from agent.temporal.activities import LLMProviderRateBudget
+from agent.temporal.client import get_temporal_client
+from agent.temporal.workflow import (
+    SolveAoCSeasonWorkflow,
+    SolveAoCSeasonWorkflowArgs,
+    SolveAoCSeasonWorkflowResult,
+)
+
+
+def _parse_problems(problems_spec: str) -> list[SolveAoCSeasonWorkflowArgs.Problem]:
+    """Parses specs like `2023:1-25` or `2024:3,5,7-9` into the individual problems."""
+    year, _, days_spec = problems_spec.partition(":")
+    if not days_spec:
+        raise click.BadParameter(f"Expected YEAR:DAYS, got {problems_spec!r}.")
+    days: list[int] = []
+    for days_range in days_spec.split(","):
+        first_day, _, last_day = days_range.partition("-")
+        days.extend(range(int(first_day), int(last_day or first_day) + 1))
+    return [SolveAoCSeasonWorkflowArgs.Problem(year=int(year), day=day) for day in days]
+
+
+def _parse_rate_budget(rate_budget_spec: str) -> LLMProviderRateBudget:
+    provider, _, max_requests_per_minute = rate_budget_spec.rpartition("=")
+    if not provider:
+        raise click.BadParameter(f"Expected PROVIDER=RPM, got {rate_budget_spec!r}.")
+    if provider not in KNOWN_LLM_PROVIDERS:
+        raise click.BadParameter(
+            f"Unknown provider {provider!r}, expected one of {sorted(KNOWN_LLM_PROVIDERS)}."
+        )
+    return LLMProviderRateBudget(
+        provider=provider, max_requests_per_minute=int(max_requests_per_minute)
+    )
+
+
+def _fmt_report(result: SolveAoCSeasonWorkflowResult) -> str:
+    lines = [
+        "| Year | Day | Part 1 | Part 2 | Time (s) | Error |",
+        "|:---:|:---:|:---:|:---:|:---:|:---|",
+    ]
+    for report in result.problem_reports:
+        lines.append(
+            f"| {report.year} | {report.day} "
+            f"| {'✅' if report.part_1_solved else '❌'} "
+            f"| {'✅' if report.part_2_solved else '❌'} "
+            f"| {report.duration_secs:.1f} | {report.error or ''} |"
+        )
+    num_stars = sum(r.part_1_solved + r.part_2_solved for r in result.problem_reports)
+    lines.append(
+        f"\n{num_stars} of {2 * len(result.problem_reports)} stars in {result.total_duration_secs:.1f}s."  # noqa: E501
+    )
+    return "\n".join(lines)
+
+
+@click.command()
+@click.option(
+    "--problems",
+    "problems_specs",
+    required=True,
+    multiple=True,
+    help="Problems to solve as YEAR:DAYS, e.g. 2023:1-25 or 2024:3,5,7-9. May be repeated.",
+)
+@click.option("--dry-run", default=False, is_flag=True)
+@click.option(
+    "--max-in-flight",
+    default=3,
+    type=click.IntRange(min=1),
+    help="Max number of problems to solve concurrently.",
+)
+@click.option(
+    "--llm-rate-budget",
+    "llm_rate_budget_specs",
+    multiple=True,
+    help="Per-provider LLM request budget shared by all concurrent problems, as PROVIDER=REQUESTS_PER_MINUTE (e.g. Anthropic=50 or Google=60). May be repeated.",  # noqa: E501
+)
+@click.option(
+    "--cache-llm-subtask",
+    "cached_llm_subtask_names",
+    multiple=True,
+    help="LLM subtask name (e.g. extract-examples) whose responses may be served from the persistent response cache.",  # noqa: E501
+)
+@click.option("--num-speculative-implementations", default=1, type=click.IntRange(min=1))
+@click.option(
+    "--speculative-implementation-model",
+    "speculative_implementation_models",
+    multiple=True,
+    type=click.Choice([*AnthropicModel, *GeminiModel]),
+)
+async def main(
+    problems_specs: tuple[str, ...],
+    dry_run: bool,
+    max_in_flight: int,
+    llm_rate_budget_specs: tuple[str, ...],
+    cached_llm_subtask_names: tuple[str, ...],
+    num_speculative_implementations: int,
+    speculative_implementation_models: tuple[str, ...],
+) -> None:
+    aoc_solutions_root_dir = os.path.realpath(
+        os.path.join(os.path.dirname(__file__), "../../advent_of_code")
+    )
+    llm_usage_log_dir = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"], check=True, text=True, capture_output=True
+    ).stdout.strip()
+
+    client = await get_temporal_client()
+
+    result = await client.execute_workflow(
+        SolveAoCSeasonWorkflow.run,
+        SolveAoCSeasonWorkflowArgs(
+            problems=[
+                problem for spec in problems_specs for problem in _parse_problems(spec)
+            ],
+            solutions_root_dir=aoc_solutions_root_dir,
+            log_dir=llm_usage_log_dir,
+            dry_run=dry_run,
+            max_in_flight=max_in_flight,
+            llm_rate_budgets=[_parse_rate_budget(spec) for spec in llm_rate_budget_specs],
+            cached_llm_subtask_names=list(cached_llm_subtask_names),
+            num_speculative_implementations=num_speculative_implementations,
+            speculative_implementation_models=[
+                AnthropicModel(model) if model in AnthropicModel else GeminiModel(model)
+                for model in speculative_implementation_models
+            ],
+        ),
+        id=f"solve-aoc-season-{int(time.time())}",
+        task_queue=settings.TEMPORAL_TASK_QUEUE_NAME,
+    )
+
+    click.echo(_fmt_report(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ import asyncclick as click
 import subprocess
 
 from agent import settings
+from agent.llm.anthropic.models import AnthropicModel
+from agent.llm.gemini.models import GeminiModel
 from agent.temporal.client import get_temporal_client
 from agent.temporal.workflow import (
     GenerateCelebratoryImageWorkflow,
@@ -17,10 +19,32 @@ from agent.temporal.workflow import (
 @click.option("--year", required=True)
 @click.option("--day", required=True)
 @click.option("--dry-run", default=False, is_flag=True)
+@click.option(
+    "--cache-llm-subtask",
+    "cached_llm_subtask_names",
+    multiple=True,
+    help="LLM subtask name (e.g. extract-examples) whose responses may be served from the persistent response cache. Useful for quickly re-running a workflow after a worker crash.",  # noqa: E501
+)
+@click.option(
+    "--num-speculative-implementations",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of initial implementations to generate concurrently per attempt. The first one to pass the unit tests wins and the rest are cancelled.",  # noqa: E501
+)
+@click.option(
+    "--speculative-implementation-model",
+    "speculative_implementation_models",
+    multiple=True,
+    type=click.Choice([*AnthropicModel, *GeminiModel]),
+    help="Model to generate speculative implementations with. Repeat to spread candidates across models round-robin.",  # noqa: E501
+)
 async def main(
     year: int,
     day: int,
     dry_run: bool,
+    cached_llm_subtask_names: tuple[str, ...],
+    num_speculative_implementations: int,
+    speculative_implementation_models: tuple[str, ...],
 ) -> None:
     # Need to get the path to the dir where solutions should be written. Implementing this to work
     # on various machines.
@@ -50,6 +74,12 @@ async def main(
             solutions_dir=aoc_solutions_dir,
             log_dir=llm_usage_log_dir,
             dry_run=dry_run,
+            cached_llm_subtask_names=list(cached_llm_subtask_names),
+            num_speculative_implementations=num_speculative_implementations,
+            speculative_implementation_models=[
+                AnthropicModel(model) if model in AnthropicModel else GeminiModel(model)
+                for model in speculative_implementation_models
+            ],
         ),
         id=f"solve-aoc-problem-{year}-{day}",
         task_queue=settings.TEMPORAL_TASK_QUEUE_NAME,
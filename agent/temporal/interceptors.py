@@ -0,0 +1,141 @@
+from datetime import UTC, datetime, timedelta
+from typing import Any, Mapping, Type
+
+from temporalio import activity, workflow
+from temporalio.api.common.v1 import Payload
+from temporalio.common import RetryPolicy
+from temporalio.converter import PayloadConverter
+from temporalio.worker import (
+    ActivityInboundInterceptor,
+    ExecuteActivityInput,
+    ExecuteWorkflowInput,
+    Interceptor,
+    StartActivityInput,
+    StartChildWorkflowInput,
+    WorkflowInboundInterceptor,
+    WorkflowInterceptorClassInput,
+    WorkflowOutboundInterceptor,
+)
+
+from agent.llm.usage.LLMUsage import llm_usage_logging_scope
+from agent.temporal.tracing import (
+    RECORD_SPANS_ACTIVITY_NAME,
+    SPAN_CONTEXT_HEADER,
+    Span,
+    SpanContext,
+    get_current_workflow_span_context,
+    log_spans,
+    workflow_span,
+    workflow_tracing,
+)
+
+
+class _LLMUsageLoggingScopeActivityInboundInterceptor(ActivityInboundInterceptor):
+    async def execute_activity(self, input: ExecuteActivityInput) -> Any:
+        with llm_usage_logging_scope(activity.info().workflow_id):
+            return await super().execute_activity(input)
+
+
+class LLMUsageLoggingScopeInterceptor(Interceptor):
+    """Runs every activity within its workflow's LLM usage logging scope, so that workflows running
+    concurrently on the same worker each log their LLM usage under their own execution."""
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _LLMUsageLoggingScopeActivityInboundInterceptor(next)
+
+
+def _with_span_context_header(
+    headers: Mapping[str, Payload], payload_converter: PayloadConverter
+) -> Mapping[str, Payload]:
+    span_context = get_current_workflow_span_context()
+    if span_context is None:
+        return headers
+    return {**headers, SPAN_CONTEXT_HEADER: payload_converter.to_payloads([span_context])[0]}
+
+
+def _get_span_context_header(
+    headers: Mapping[str, Payload], payload_converter: PayloadConverter
+) -> SpanContext | None:
+    if SPAN_CONTEXT_HEADER not in headers:
+        return None
+    return payload_converter.from_payloads([headers[SPAN_CONTEXT_HEADER]], [SpanContext])[0]
+
+
+class _SpanTracingActivityInboundInterceptor(ActivityInboundInterceptor):
+    async def execute_activity(self, input: ExecuteActivityInput) -> Any:
+        info = activity.info()
+        # Persisting spans is itself an activity, but not an interesting one.
+        if info.activity_type == RECORD_SPANS_ACTIVITY_NAME:
+            return await super().execute_activity(input)
+
+        parent = _get_span_context_header(input.headers, activity.payload_converter())
+        start_timestamp = datetime.now(UTC)
+        error: str | None = None
+        try:
+            return await super().execute_activity(input)
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            log_spans(
+                [
+                    Span(
+                        span_id=f"{info.workflow_run_id}/{info.activity_id}/{info.attempt}",
+                        parent_span_id=parent.span_id if parent else None,
+                        workflow_id=info.workflow_id,
+                        name=info.activity_type,
+                        kind=Span.Kind.ACTIVITY,
+                        start_timestamp=start_timestamp,
+                        end_timestamp=datetime.now(UTC),
+                        scheduled_timestamp=info.current_attempt_scheduled_time,
+                        attempt=parent.attempt if parent else None,
+                        debug_iteration=parent.debug_iteration if parent else None,
+                        activity_attempt=info.attempt,
+                        error=error,
+                    )
+                ]
+            )
+
+
+class _SpanTracingWorkflowOutboundInterceptor(WorkflowOutboundInterceptor):
+    def start_activity(self, input: StartActivityInput) -> workflow.ActivityHandle:
+        input.headers = _with_span_context_header(input.headers, workflow.payload_converter())
+        return super().start_activity(input)
+
+    async def start_child_workflow(
+        self, input: StartChildWorkflowInput
+    ) -> workflow.ChildWorkflowHandle:
+        input.headers = _with_span_context_header(input.headers, workflow.payload_converter())
+        return await super().start_child_workflow(input)
+
+
+class _SpanTracingWorkflowInboundInterceptor(WorkflowInboundInterceptor):
+    def init(self, outbound: WorkflowOutboundInterceptor) -> None:
+        super().init(_SpanTracingWorkflowOutboundInterceptor(outbound))
+
+    async def execute_workflow(self, input: ExecuteWorkflowInput) -> Any:
+        parent = _get_span_context_header(input.headers, workflow.payload_converter())
+        with workflow_tracing(parent) as recorded_spans:
+            try:
+                with workflow_span(workflow.info().workflow_type):
+                    return await super().execute_workflow(input)
+            finally:
+                await workflow.execute_activity(
+                    RECORD_SPANS_ACTIVITY_NAME,
+                    recorded_spans,
+                    start_to_close_timeout=timedelta(seconds=15),
+                    retry_policy=RetryPolicy(maximum_attempts=3),
+                )
+
+
+class SpanTracingInterceptor(Interceptor):
+    """Records spans for every activity execution and for every `workflow_span(...)` within
+    workflows, parented according to the span context that workflows pass along in headers."""
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _SpanTracingActivityInboundInterceptor(next)
+
+    def workflow_interceptor_class(
+        self, input: WorkflowInterceptorClassInput
+    ) -> Type[WorkflowInboundInterceptor]:
+        return _SpanTracingWorkflowInboundInterceptor
@@ -0,0 +1,183 @@
+import os
+import subprocess
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+
+import asyncclick as click
+import duckdb
+
+
+@dataclass
+class _SpanRow:
+    span_id: str
+    parent_span_id: str | None
+    name: str
+    kind: str
+    start_timestamp: datetime
+    end_timestamp: datetime
+    scheduled_timestamp: datetime | None
+    attempt: int | None
+    debug_iteration: int | None
+
+    @property
+    def effective_start_timestamp(self) -> datetime:
+        # Activities are on the hook for the time they spent waiting on the task queue too.
+        return self.scheduled_timestamp or self.start_timestamp
+
+
+@dataclass
+class _CriticalPathSegment:
+    label: str
+    span: _SpanRow
+    start_timestamp: datetime
+    end_timestamp: datetime
+
+    @property
+    def duration_secs(self) -> float:
+        return (self.end_timestamp - self.start_timestamp).total_seconds()
+
+
+def _get_critical_path(
+    span: _SpanRow,
+    children_by_parent_span_id: dict[str, list[_SpanRow]],
+    end_timestamp: datetime,
+) -> list[_CriticalPathSegment]:
+    """Walks backwards from the end of the span, always following whichever child finished last.
+
+    Any time within the span that isn't covered by a child on the critical path is attributed to the
+    span itself. Segments are returned in reverse chronological order.
+    """
+    segments: list[_CriticalPathSegment] = []
+    cursor = min(span.end_timestamp, end_timestamp)
+    span_start_timestamp = min(span.effective_start_timestamp, cursor)
+    if span.kind == "ACTIVITY":
+        run_start_timestamp = min(max(span.start_timestamp, span_start_timestamp), cursor)
+        segments.append(_CriticalPathSegment(span.name, span, run_start_timestamp, cursor))
+        if span_start_timestamp < run_start_timestamp:
+            segments.append(
+                _CriticalPathSegment(
+                    f"{span.name} [queued]", span, span_start_timestamp, run_start_timestamp
+                )
+            )
+        return segments
+
+    remaining_children = list(children_by_parent_span_id[span.span_id])
+    while True:
+        # Clocks can disagree between the workflow and activities, so children are clamped to fit.
+        candidates = [c for c in remaining_children if c.effective_start_timestamp < cursor]
+        if not candidates:
+            break
+        child = max(candidates, key=lambda c: min(c.end_timestamp, cursor))
+        remaining_children.remove(child)
+        child_end_timestamp = min(child.end_timestamp, cursor)
+        if child_end_timestamp < cursor:
+            segments.append(
+                _CriticalPathSegment(f"{span.name} [workflow]", span, child_end_timestamp, cursor)
+            )
+        segments.extend(_get_critical_path(child, children_by_parent_span_id, child_end_timestamp))
+        cursor = max(child.effective_start_timestamp, span_start_timestamp)
+        if cursor <= span_start_timestamp:
+            break
+    if span_start_timestamp < cursor:
+        segments.append(
+            _CriticalPathSegment(f"{span.name} [workflow]", span, span_start_timestamp, cursor)
+        )
+    return segments
+
+
+def _fmt_context(span: _SpanRow) -> str:
+    context = []
+    if span.attempt is not None:
+        context.append(f"attempt {span.attempt}")
+    if span.debug_iteration is not None:
+        context.append(f"debug iteration {span.debug_iteration}")
+    return ", ".join(context)
+
+
+@click.command()
+@click.option("--workflow-id", required=True, help="E.g. solve-aoc-problem-2024-1")
+@click.option(
+    "--execution-id",
+    default=None,
+    type=int,
+    help="Which execution of the workflow to show. Defaults to the latest.",
+)
+@click.option(
+    "--log-dir",
+    default=None,
+    help="Dir containing llm_usage.db. Defaults to the root of this repo.",
+)
+async def main(workflow_id: str, execution_id: int | None, log_dir: str | None) -> None:
+    if log_dir is None:
+        log_dir = subprocess.run(
+            ["git", "rev-parse", "--show-toplevel"], check=True, text=True, capture_output=True
+        ).stdout.strip()
+
+    with duckdb.connect(os.path.join(log_dir, "llm_usage.db"), read_only=True) as conn:
+        if execution_id is None:
+            execution_id = conn.execute(
+                "SELECT max(execution_id) FROM spans WHERE workflow_id = $1;", [workflow_id]
+            ).fetchall()[0][0]
+        spans = [
+            _SpanRow(*row)
+            for row in conn.execute(
+                """
+                SELECT
+                    span_id,
+                    parent_span_id,
+                    name,
+                    kind,
+                    start_timestamp,
+                    end_timestamp,
+                    scheduled_timestamp,
+                    attempt,
+                    debug_iteration
+                FROM spans
+                WHERE workflow_id = $1 AND execution_id = $2
+                ORDER BY start_timestamp;
+                """,
+                [workflow_id, execution_id],
+            ).fetchall()
+        ]
+    if not spans:
+        raise click.ClickException(f"No spans recorded for workflow {workflow_id}.")
+
+    span_ids = {span.span_id for span in spans}
+    children_by_parent_span_id: dict[str, list[_SpanRow]] = defaultdict(list)
+    for span in spans:
+        if span.parent_span_id is not None:
+            children_by_parent_span_id[span.parent_span_id].append(span)
+    # The workflow's own span, whose parent (if any) belongs to some other parent workflow.
+    root = max(
+        (span for span in spans if span.parent_span_id not in span_ids),
+        key=lambda span: span.end_timestamp - span.effective_start_timestamp,
+    )
+    critical_path = _get_critical_path(root, children_by_parent_span_id, root.end_timestamp)[::-1]
+    total_secs = sum(segment.duration_secs for segment in critical_path)
+    if total_secs == 0:
+        raise click.ClickException(f"No time recorded for workflow {workflow_id}.")
+
+    click.echo(
+        f"Critical path of {workflow_id} (execution {execution_id}): {total_secs:.1f}s total\n"
+    )
+    click.echo(f"{'Offset (s)':>10}  {'Time (s)':>8}  {'%':>5}  {'Stage':<45}  Context")
+    for segment in critical_path:
+        click.echo(
+            f"{(segment.start_timestamp - root.effective_start_timestamp).total_seconds():>10.1f}"
+            f"  {segment.duration_secs:>8.1f}"
+            f"  {100 * segment.duration_secs / total_secs:>5.1f}"
+            f"  {segment.label:<45}  {_fmt_context(segment.span)}"
+        )
+
+    # Where the time actually went, e.g. how much of it was test subprocesses or Temporal queueing.
+    secs_by_label: dict[str, float] = defaultdict(float)
+    for segment in critical_path:
+        secs_by_label[segment.label] += segment.duration_secs
+    click.echo(f"\n{'Time (s)':>8}  {'%':>5}  Stage (summed over the critical path)")
+    for label, secs in sorted(secs_by_label.items(), key=lambda item: item[1], reverse=True):
+        click.echo(f"{secs:>8.1f}  {100 * secs / total_secs:>5.1f}  {label}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+import enum
+from pathlib import Path
+from typing import Any, Iterator
+
+from pydantic import BaseModel
+from temporalio import workflow
+
+from agent.llm.usage.LLMUsage import get_persisted_llm_usage_logs_config
+from agent.llm.usage.LLMUsageWriter import get_writer
+
+# Temporal header that carries the current span context from workflows to the activities and child
+# workflows that they start. See `SpanTracingInterceptor`.
+SPAN_CONTEXT_HEADER = "aoc-span-context"
+# Workflow spans are buffered in the workflow and only persisted at the very end by this activity,
+# since workflows themselves can't do any I/O.
+RECORD_SPANS_ACTIVITY_NAME = "record_spans"
+
+
+class Span(BaseModel):
+    class Kind(enum.StrEnum):
+        WORKFLOW = "WORKFLOW"
+        ACTIVITY = "ACTIVITY"
+
+    span_id: str
+    parent_span_id: str | None
+    workflow_id: str
+    name: str
+    kind: Kind
+    start_timestamp: datetime
+    end_timestamp: datetime
+    # Activity spans only. How long the activity waited in Temporal's task queue is the difference
+    # between this and `start_timestamp`.
+    scheduled_timestamp: datetime | None = None
+    # The `_solve_part` attempt and debugging loop iteration that this span was a part of, if any.
+    attempt: int | None = None
+    debug_iteration: int | None = None
+    # Activity spans only. Temporal's own retry attempt number.
+    activity_attempt: int | None = None
+    error: str | None = None
+
+    def dict(self, **kwargs: Any) -> dict[str, Any]:  # type: ignore[override]
+        # Temporal's default JSON converter serializes pydantic models via .dict(), which would
+        # otherwise leave the datetimes in there for the JSON encoder to choke on.
+        return self.model_dump(mode="json", **kwargs)
+
+
+class SpanContext(BaseModel):
+    span_id: str | None
+    attempt: int | None = None
+    debug_iteration: int | None = None
+
+
+@dataclass
+class _WorkflowSpanContext:
+    context: SpanContext
+    # Shared by every span in the workflow, these get persisted when the workflow completes.
+    recorded_spans: list[Span] = field(default_factory=list)
+
+
+# Only ever set within workflows that are running with the `SpanTracingInterceptor`, so that spans
+# are silently skipped otherwise (e.g. in the benchmarks).
+_CURRENT_WORKFLOW_SPAN: ContextVar[_WorkflowSpanContext | None] = ContextVar(
+    "current_workflow_span", default=None
+)
+
+
+@contextmanager
+def workflow_span(
+    name: str, attempt: int | None = None, debug_iteration: int | None = None
+) -> Iterator[None]:
+    """Records a span covering the body of this context from within a workflow.
+
+    Spans started within this context (including by activities and child workflows) are its
+    children, and inherit its attempt/debug_iteration unless they set their own.
+    """
+    parent = _CURRENT_WORKFLOW_SPAN.get()
+    if parent is None:
+        yield
+        return
+
+    # Both workflow.uuid4() and workflow.now() are deterministic, so these spans come out exactly
+    # the same on replay.
+    span_context = SpanContext(
+        span_id=str(workflow.uuid4()),
+        attempt=attempt or parent.context.attempt,
+        debug_iteration=debug_iteration or parent.context.debug_iteration,
+    )
+    start_timestamp = workflow.now()
+    error: str | None = None
+    token = _CURRENT_WORKFLOW_SPAN.set(
+        _WorkflowSpanContext(context=span_context, recorded_spans=parent.recorded_spans)
+    )
+    try:
+        yield
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _CURRENT_WORKFLOW_SPAN.reset(token)
+        parent.recorded_spans.append(
+            Span(
+                span_id=span_context.span_id,  # type: ignore
+                parent_span_id=parent.context.span_id,
+                workflow_id=workflow.info().workflow_id,
+                name=name,
+                kind=Span.Kind.WORKFLOW,
+                start_timestamp=start_timestamp,
+                end_timestamp=workflow.now(),
+                attempt=span_context.attempt,
+                debug_iteration=span_context.debug_iteration,
+                error=error,
+            )
+        )
+
+
+@contextmanager
+def workflow_tracing(parent: SpanContext | None) -> Iterator[list[Span]]:
+    """Enables `workflow_span(...)` for the rest of the workflow. Yields the recorded spans."""
+    recorded_spans: list[Span] = []
+    token = _CURRENT_WORKFLOW_SPAN.set(
+        _WorkflowSpanContext(
+            context=parent or SpanContext(span_id=None), recorded_spans=recorded_spans
+        )
+    )
+    try:
+        yield recorded_spans
+    finally:
+        _CURRENT_WORKFLOW_SPAN.reset(token)
+
+
+def get_current_workflow_span_context() -> SpanContext | None:
+    match _CURRENT_WORKFLOW_SPAN.get():
+        case None:
+            return None
+        case workflow_span_context:
+            return workflow_span_context.context
+
+
+_CREATED_SPANS_TABLES: set[Path] = set()
+
+
+def log_spans(spans: list[Span]) -> None:
+    """Persists the given spans alongside the current execution's LLM usage (if it's persisted)."""
+    logs_config = get_persisted_llm_usage_logs_config()
+    if logs_config is None or not spans:
+        return
+
+    writer = get_writer(logs_config.log_file)
+    if logs_config.log_file not in _CREATED_SPANS_TABLES:
+        with writer.connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS spans (
+                    -- Same as llm_usage.execution_id, so spans can be joined against LLM usage.
+                    execution_id INTEGER NOT NULL,
+                    workflow_id VARCHAR NOT NULL,
+                    span_id VARCHAR NOT NULL,
+                    -- NULL for the root span of the top level workflow.
+                    parent_span_id VARCHAR,
+                    name VARCHAR NOT NULL,
+                    -- WORKFLOW for stages of the workflow itself, ACTIVITY for activity executions.
+                    kind VARCHAR NOT NULL,
+                    -- All timestamps are in UTC.
+                    start_timestamp TIMESTAMP NOT NULL,
+                    end_timestamp TIMESTAMP NOT NULL,
+                    -- ACTIVITY spans only. When the activity (attempt) was put on the task queue.
+                    scheduled_timestamp TIMESTAMP,
+                    -- The `_solve_part` attempt and debugging loop iteration, if any.
+                    attempt INTEGER,
+                    debug_iteration INTEGER,
+                    -- ACTIVITY spans only. Temporal's own retry attempt number.
+                    activity_attempt INTEGER,
+                    error VARCHAR
+                );
+                """  # noqa: E501
+            )
+        _CREATED_SPANS_TABLES.add(logs_config.log_file)
+
+    for span in spans:
+        writer.submit(
+            _SPANS_INSERT_SQL,
+            (
+                logs_config.execution_id,
+                span.workflow_id,
+                span.span_id,
+                span.parent_span_id,
+                span.name,
+                span.kind,
+                _to_naive_utc(span.start_timestamp),
+                _to_naive_utc(span.end_timestamp),
+                _to_naive_utc(span.scheduled_timestamp),
+                span.attempt,
+                span.debug_iteration,
+                span.activity_attempt,
+                span.error,
+            ),
+        )
+
+
+_SPANS_INSERT_SQL = """
+INSERT INTO spans (
+    execution_id,
+    workflow_id,
+    span_id,
+    parent_span_id,
+    name,
+    kind,
+    start_timestamp,
+    end_timestamp,
+    scheduled_timestamp,
+    attempt,
+    debug_iteration,
+    activity_attempt,
+    error
+)
+VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13);
+"""
+
+
+def _to_naive_utc(timestamp: datetime | None) -> datetime | None:
+    # DuckDB would otherwise convert timezone aware datetimes to local time for TIMESTAMP columns.
+    if timestamp is None or timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(UTC).replace(tzinfo=None)
@@ -4,10 +4,25 @@ import asyncclick as click
 from temporalio.worker import Worker
 
 from agent import settings
+from agent.adventofcode.execute_generated_code import warm_test_runner_pool
+from agent.adventofcode.execution_cache import get_execution_cache_metrics
+from agent.adventofcode.git_push_queue import get_git_metrics, push_pending_commits, request_push
+from agent.adventofcode.resource_limits import ResourceLimits, configure_resource_limits
+from agent.http_client import close_http_session
 from agent.llm.gemini.configure_genai import configure_genai
+from agent.llm.usage.LLMRouter import get_llm_router_metrics
+from agent.llm.usage.LLMUsage import flush_llm_usage_logs
 from agent.temporal import activities
 from agent.temporal.client import get_temporal_client
-from agent.temporal.workflow import GenerateCelebratoryImageWorkflow, SolveAoCProblemWorkflow
+from agent.temporal.interceptors import (
+    LLMUsageLoggingScopeInterceptor,
+    SpanTracingInterceptor,
+)
+from agent.temporal.workflow import (
+    GenerateCelebratoryImageWorkflow,
+    SolveAoCProblemWorkflow,
+    SolveAoCSeasonWorkflow,
+)
 
 
 @click.command()
@@ -17,23 +32,46 @@ async def main() -> None:
 
     # Configuring this here ensures all activities in this worker are automatically configured.
     configure_genai()
+    configure_resource_limits(
+        ResourceLimits(
+            max_memory_mb=settings.GENERATED_CODE_MAX_MEMORY_MB,
+            max_cpu_secs=settings.GENERATED_CODE_MAX_CPU_SECS,
+        )
+    )
+    # Get the test runners importing everything now, rather than on the first debugging iteration.
+    await warm_test_runner_pool()
+    # Anything committed but never pushed by a previous worker (e.g. because it crashed) goes out
+    # in the background now, rather than waiting around for the next commit.
+    request_push()
 
     # Create a worker for the workflow
     worker = Worker(
         await get_temporal_client(),
         # TODO(steving) Generalize this to enable running locally or against prod Temporal Cloud.
         task_queue=settings.TEMPORAL_TASK_QUEUE_NAME,
-        workflows=[SolveAoCProblemWorkflow, GenerateCelebratoryImageWorkflow],
+        workflows=[
+            SolveAoCProblemWorkflow,
+            SolveAoCSeasonWorkflow,
+            GenerateCelebratoryImageWorkflow,
+        ],
         activities=[
             activities.configure_llm_usage_logging_for_workflow,
+            activities.clear_llm_usage_logging_for_workflow,
+            activities.clear_llm_rate_limits_for_workflow,
+            activities.record_spans,
             activities.extract_problem_part,
             activities.extract_examples,
             activities.get_examples_context,
             activities.get_generated_unit_tests,
             activities.get_generated_implementation,
             activities.commit_changes,
+            activities.push_committed_changes,
             activities.run_generated_tests,
+            activities.run_candidate_implementation_tests,
+            activities.predict_generated_solution_runtime,
             activities.run_generated_solution,
+            activities.profile_generated_solution,
+            activities.get_optimized_implementation,
             activities.debug_unit_test_failures,
             activities.plan_impl_refactoring,
             activities.submit_solution,
@@ -41,10 +79,29 @@ async def main() -> None:
             activities.meta_get_image_generation_prompt,
             activities.generate_celebratory_image,
         ],
+        # Lets multiple workflows (e.g. a whole season's worth of problems) run concurrently on this
+        # worker while still logging their LLM usage separately. Order matters here, since spans are
+        # logged alongside the LLM usage of whichever workflow they belong to.
+        interceptors=[LLMUsageLoggingScopeInterceptor(), SpanTracingInterceptor()],
     )
 
     # Run the worker indefinitely, so that it polls for tasks.
-    await worker.run()
+    try:
+        await worker.run()
+    finally:
+        # LLM usage logs are written in batches in the background, so don't lose the last batch.
+        await flush_llm_usage_logs()
+        # Activities all share the one pooled HTTP session, which only gets closed along with the
+        # worker.
+        await close_http_session()
+        # Commits are pushed lazily in the background, so don't leave any behind either.
+        try:
+            await push_pending_commits()
+        except RuntimeError as e:
+            print(f"Failed to push commits, they'll be pushed by the next worker instead: {e}")
+        print(f"Git: {get_git_metrics().summary()}")
+        print(f"Execution cache: {get_execution_cache_metrics().summary()}")
+        print(f"LLM router: {get_llm_router_metrics().summary()}")
 
 
 if __name__ == "__main__":
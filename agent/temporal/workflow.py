@@ -4,7 +4,12 @@ from datetime import timedelta
 from pydantic import BaseModel
 from temporalio import workflow
 from temporalio.common import RetryPolicy
-from temporalio.exceptions import ApplicationError, TimeoutError
+from temporalio.exceptions import (
+    ActivityError,
+    ApplicationError,
+    ChildWorkflowError,
+    TimeoutError,
+)
 
 
 # Imports passed through Temporal's sandbox without overriding stdlib.
@@ -18,6 +23,8 @@ with workflow.unsafe.imports_passed_through():
     from agent.adventofcode.generate_code.generate_unit_tests import (
         GenerateUnitTestsOutput,
     )
+    from agent.llm.anthropic.models import AnthropicModel
+    from agent.llm.gemini.models import GeminiModel
     from agent.temporal.activities import (
         AoCProblem,
         CommitChangesArgs,
@@ -32,9 +39,17 @@ with workflow.unsafe.imports_passed_through():
         GetExamplesContextArgs,
         GetGeneratedImplementationArgs,
         GetGeneratedUnitTestsArgs,
+        GetOptimizedImplementationArgs,
+        LLMProviderRateBudget,
         PlanImplRefactoringArgs,
+        RunCandidateImplementationTestsArgs,
+        RunGeneratedTestsArgs,
+        RuntimePrediction,
+        SolutionWatchdogReport,
         SubmitSolutionArgs,
         TestResults,
+        clear_llm_rate_limits_for_workflow,
+        clear_llm_usage_logging_for_workflow,
         commit_changes,
         configure_llm_usage_logging_for_workflow,
         debug_unit_test_failures,
@@ -46,11 +61,17 @@ with workflow.unsafe.imports_passed_through():
         generate_celebratory_image,
         get_generated_implementation,
         get_generated_unit_tests,
+        get_optimized_implementation,
         plan_impl_refactoring,
+        predict_generated_solution_runtime,
+        profile_generated_solution,
+        push_committed_changes,
+        run_candidate_implementation_tests,
         run_generated_solution,
         run_generated_tests,
         submit_solution,
     )
+    from agent.temporal.tracing import workflow_span
     from os.path import join as path_join
 
 # Independent attempts starting from scratch.
@@ -59,6 +80,20 @@ _MAX_PROBLEM_PART_ATTEMPTS = 3
 _MAX_EXTRACT_EXAMPLES_ATTEMPTS = 3
 # Debugging loop iterations.
 _MAX_UNIT_TEST_FIX_ITERATIONS = 6
+# Rounds of profiling and optimizing a solution that passes its unit tests but times out.
+_MAX_SOLUTION_OPTIMIZATION_ITERATIONS = 2
+# The real problem input is usually far bigger than the examples, so this is where slow algorithms
+# actually get caught.
+_SOLUTION_TIMEOUT = timedelta(minutes=4)
+# Runtime predictions are rough extrapolations, so only trust them when they're way off.
+_PREDICTED_TIMEOUT_SAFETY_FACTOR = 2
+# Predicting a solution's runtime takes several runs of it in fresh processes, which would be pure
+# overhead for the vast majority of solutions that finish in well under a second. So it only starts
+# (alongside the solution itself) once the solution has been running for this long.
+_RUNTIME_PREDICTION_DELAY = timedelta(seconds=5)
+# Activities running generated code heartbeat every few seconds while the code runs. Missing
+# heartbeats means the worker died, so there's no point waiting out the full 4 minute timeout.
+_GENERATED_CODE_HEARTBEAT_TIMEOUT = timedelta(seconds=30)
 
 
 class SolveAoCProblemWorkflowArgs(BaseModel):
@@ -67,6 +102,19 @@ class SolveAoCProblemWorkflowArgs(BaseModel):
     solutions_dir: str
     log_dir: str
     dry_run: bool
+    # Opt-in per subtask, since serving a cached response only makes sense for LLM calls whose
+    # retries aren't relying on getting a *different* response.
+    cached_llm_subtask_names: list[str] = []
+    # When >1, each attempt races this many independently generated initial implementations against
+    # the unit tests and moves forward with the first one to pass. Trades tokens for wall-clock.
+    num_speculative_implementations: int = 1
+    # Models to generate the speculative implementations with, assigned round-robin. If empty, every
+    # candidate just uses the default initial attempt model.
+    speculative_implementation_models: list[AnthropicModel | GeminiModel] = []
+    # Budgets shared with every other workflow using the same rate limit scope. Whoever sets the
+    # scope is responsible for clearing it again, see `SolveAoCSeasonWorkflow`.
+    llm_rate_limit_scope: str | None = None
+    llm_rate_budgets: list[LLMProviderRateBudget] = []
 
 
 class SolveAoCProblemWorkflowResult(BaseModel):
@@ -85,29 +133,56 @@ class SolveAoCProblemWorkflowResult(BaseModel):
 class SolveAoCProblemWorkflow:
     @workflow.run
     async def run(self, args: SolveAoCProblemWorkflowArgs) -> SolveAoCProblemWorkflowResult:
+        try:
+            return await self._run(args)
+        finally:
+            if not args.dry_run:
+                # Even if the problem wasn't solved, all the progress made along the way should be
+                # pushed before the workflow completes. A failed push mustn't mask how solving the
+                # problem went though, and the worker pushes whatever's still pending on shutdown.
+                try:
+                    await _push_committed_changes()
+                except ActivityError as e:
+                    workflow.logger.warning(f"Failed to push committed changes: {e.cause}")
+            await workflow.execute_activity(
+                clear_llm_usage_logging_for_workflow,
+                start_to_close_timeout=timedelta(seconds=15),
+                retry_policy=RetryPolicy(maximum_attempts=3),
+            )
+
+    async def _run(self, args: SolveAoCProblemWorkflowArgs) -> SolveAoCProblemWorkflowResult:
         # Configure logging LLM usage statistics. Note that this technique only works if 100% of
         # activities run on the same worker & thread.
         await workflow.execute_activity(
             configure_llm_usage_logging_for_workflow,
-            ConfigureLLMUsageLoggingArgs(year=args.year, day=args.day, log_dir=args.log_dir),
+            ConfigureLLMUsageLoggingArgs(
+                year=args.year,
+                day=args.day,
+                log_dir=args.log_dir,
+                cached_llm_subtask_names=args.cached_llm_subtask_names,
+                llm_rate_limit_scope=args.llm_rate_limit_scope,
+                llm_rate_budgets=args.llm_rate_budgets,
+            ),
             start_to_close_timeout=timedelta(seconds=15),
             retry_policy=RetryPolicy(
                 maximum_attempts=1,
             ),
         )
 
-        solve_aoc_part_1_problem_req = AoCProblem(year=args.year, day=args.day, part=1)
-        problem_part = await self._scrape_problem_part(
-            problem_req=solve_aoc_part_1_problem_req, solutions_dir=args.solutions_dir
-        )
-
         # Start by solving part 1.
-        part_1_solution, part_1_implementation = await self._solve_part(
-            solve_aoc_part_1_problem_req,
-            problem_part,
-            solutions_dir=path_join(args.solutions_dir, "part1"),
-            dry_run=args.dry_run,
-        )
+        solve_aoc_part_1_problem_req = AoCProblem(year=args.year, day=args.day, part=1)
+        with workflow_span("solve_part_1"):
+            problem_part = await self._scrape_problem_part(
+                problem_req=solve_aoc_part_1_problem_req, solutions_dir=args.solutions_dir
+            )
+            part_1_solution, part_1_implementation = await self._solve_part(
+                solve_aoc_part_1_problem_req,
+                problem_part,
+                solutions_dir=path_join(args.solutions_dir, "part1"),
+                dry_run=args.dry_run,
+                num_speculative_implementations=args.num_speculative_implementations,
+                speculative_implementation_models=args.speculative_implementation_models,
+            )
         if isinstance(part_1_solution.result, GeneratedSolutionRes.Failure):
             # If we weren't even able to solve part 1, we can't move on to part 2.
             return SolveAoCProblemWorkflowResult(
@@ -116,16 +191,19 @@ class SolveAoCProblemWorkflow:
 
         # Now move on to solving part 2.
         solve_aoc_part_2_problem_req = AoCProblem(year=args.year, day=args.day, part=2)
-        problem_part = await self._scrape_problem_part(
-            problem_req=solve_aoc_part_2_problem_req, solutions_dir=args.solutions_dir
-        )
-        part_2_solution, _ = await self._solve_part(
-            solve_aoc_part_2_problem_req,
-            problem_part,
-            solutions_dir=path_join(args.solutions_dir, "part2"),
-            dry_run=args.dry_run,
-            part_1_generated_implementation=part_1_implementation,
-        )
+        with workflow_span("solve_part_2"):
+            problem_part = await self._scrape_problem_part(
+                problem_req=solve_aoc_part_2_problem_req, solutions_dir=args.solutions_dir
+            )
+            part_2_solution, _ = await self._solve_part(
+                solve_aoc_part_2_problem_req,
+                problem_part,
+                solutions_dir=path_join(args.solutions_dir, "part2"),
+                dry_run=args.dry_run,
+                part_1_generated_implementation=part_1_implementation,
+                num_speculative_implementations=args.num_speculative_implementations,
+                speculative_implementation_models=args.speculative_implementation_models,
+            )
 
         # Return the solutions we were able to get.
         return SolveAoCProblemWorkflowResult(
@@ -162,153 +240,284 @@ class SolveAoCProblemWorkflow:
         solutions_dir: str,
         dry_run: bool,
         part_1_generated_implementation: GenerateImplementationOutput | None = None,
+        num_speculative_implementations: int = 1,
+        speculative_implementation_models: list[AnthropicModel | GeminiModel] = [],
     ) -> tuple[GeneratedSolutionRes, GenerateImplementationOutput]:
         # Some of the prompts get modified to extract solutions to part 2.
         solve_part_2 = solve_aoc_problem_req.part == 2
 
         for i in range(_MAX_PROBLEM_PART_ATTEMPTS):
-            extracted_examples = await workflow.execute_activity(
-                extract_examples,
-                ExtractExamplesArgs(extracted_problem_part=problem_part, solve_part_2=solve_part_2),
-                start_to_close_timeout=timedelta(seconds=60),
-                retry_policy=RetryPolicy(maximum_attempts=5),
-            )
+            with workflow_span("attempt", attempt=i + 1):
+                with workflow_span("extract_examples"):
+                    extracted_examples = await workflow.execute_activity(
+                        extract_examples,
+                        ExtractExamplesArgs(
+                            extracted_problem_part=problem_part, solve_part_2=solve_part_2
+                        ),
+                        start_to_close_timeout=timedelta(seconds=60),
+                        retry_policy=RetryPolicy(maximum_attempts=5),
+                    )
 
-            examples_context = await workflow.execute_activity(
-                get_examples_context,
-                GetExamplesContextArgs(
-                    extracted_problem_part=problem_part,
-                    extracted_examples=extracted_examples,
-                    solve_part_2=solve_part_2,
-                ),
-                start_to_close_timeout=timedelta(seconds=60),
-                retry_policy=RetryPolicy(maximum_attempts=5),
-            )
+                    examples_context = await workflow.execute_activity(
+                        get_examples_context,
+                        GetExamplesContextArgs(
+                            extracted_problem_part=problem_part,
+                            extracted_examples=extracted_examples,
+                            solve_part_2=solve_part_2,
+                        ),
+                        start_to_close_timeout=timedelta(seconds=60),
+                        retry_policy=RetryPolicy(maximum_attempts=5),
+                    )
 
-            # Since I don't think I should show the unit tests to the LLM when asking it to generate
-            # the implementation, I can just go ahead and generate the initial implementation
-            # concurrently.
-            unit_tests, implementation = await asyncio.gather(
-                workflow.execute_activity(
-                    get_generated_unit_tests,
-                    GetGeneratedUnitTestsArgs(
-                        examples=extracted_examples, examples_context=examples_context
-                    ),
-                    start_to_close_timeout=timedelta(seconds=60),
-                    retry_policy=RetryPolicy(maximum_attempts=5),
-                ),
-                workflow.execute_activity(
-                    get_generated_implementation,
-                    GetGeneratedImplementationArgs(
+                # Since I don't think I should show the unit tests to the LLM when asking it to
+                # generate the implementation, I can just go ahead and generate the initial
+                # implementation concurrently.
+                with workflow_span("generate_initial_attempt"):
+                    unit_tests_task = asyncio.create_task(
+                        workflow.execute_activity(
+                            get_generated_unit_tests,
+                            GetGeneratedUnitTestsArgs(
+                                examples=extracted_examples, examples_context=examples_context
+                            ),
+                            start_to_close_timeout=timedelta(seconds=60),
+                            retry_policy=RetryPolicy(maximum_attempts=5),
+                        )
+                    )
+                    get_generated_implementation_args = GetGeneratedImplementationArgs(
                         extracted_problem_part=problem_part,
                         examples_context=examples_context,
                         solve_part_2=solve_part_2,
                         part_1_generated_implementation=part_1_generated_implementation,
-                    ),
-                    start_to_close_timeout=timedelta(seconds=60),
-                    retry_policy=RetryPolicy(maximum_attempts=5),
-                ),
-            )
+                    )
+                    initial_unit_test_results: TestResults | None = None
+                    commit_message = "Initial Attempt"
+                    if num_speculative_implementations > 1:
+                        (
+                            implementation,
+                            initial_unit_test_results,
+                            candidate_num,
+                        ) = await _race_speculative_implementations(
+                            unit_tests_task=unit_tests_task,
+                            get_generated_implementation_args=get_generated_implementation_args,
+                            num_speculative_implementations=num_speculative_implementations,
+                            speculative_implementation_models=speculative_implementation_models,
+                        )
+                        unit_tests = await unit_tests_task
+                        commit_message = f"Initial Attempt (speculative candidate #{candidate_num} of {num_speculative_implementations})"  # noqa: E501
+                    else:
+                        unit_tests, implementation = await asyncio.gather(
+                            unit_tests_task,
+                            workflow.execute_activity(
+                                get_generated_implementation,
+                                get_generated_implementation_args,
+                                start_to_close_timeout=timedelta(seconds=60),
+                                retry_policy=RetryPolicy(maximum_attempts=5),
+                            ),
+                        )
 
-            # Commit these initial tests and implementation files right away before executing any
-            # tests. At this point, we're just ensuring that we can actually track the progress that
-            # this agent makes since it'll be really interesting to go back through and evaluate
-            # this later on.
-            await workflow.execute_activity(
-                commit_changes,
-                CommitChangesArgs(
-                    aoc_problem=solve_aoc_problem_req,
-                    files=[
-                        FileToCommit(
-                            filename="tests.py",
-                            content=unit_tests.generated_unit_tests.generated_unit_test_file_content,
-                        ),
-                        FileToCommit(
-                            filename="solution.py",
-                            content=implementation.generated_implementation.generated_implementation_file_content,
+                # Commit these initial tests and implementation files right away before executing
+                # any tests. At this point, we're just ensuring that we can actually track the
+                # progress that this agent makes since it'll be really interesting to go back
+                # through and evaluate this later on.
+                with workflow_span("commit_initial_attempt"):
+                    await workflow.execute_activity(
+                        commit_changes,
+                        CommitChangesArgs(
+                            aoc_problem=solve_aoc_problem_req,
+                            files=[
+                                FileToCommit(
+                                    filename="tests.py",
+                                    content=unit_tests.generated_unit_tests.generated_unit_test_file_content,
+                                ),
+                                FileToCommit(
+                                    filename="solution.py",
+                                    content=implementation.generated_implementation.generated_implementation_file_content,
+                                ),
+                            ],
+                            solutions_dir=solutions_dir,
+                            commit_message=commit_message,
+                            dry_run=dry_run,
                         ),
-                    ],
-                    solutions_dir=solutions_dir,
-                    commit_message="Initial Attempt",
-                    dry_run=dry_run,
-                ),
-                start_to_close_timeout=timedelta(seconds=60),
-                retry_policy=RetryPolicy(maximum_attempts=5),
-            )
+                        start_to_close_timeout=timedelta(seconds=60),
+                        retry_policy=RetryPolicy(maximum_attempts=5),
+                    )
+
+                # Now, actually run the generated unit tests to see if we're gonna be able to move
+                # forward. We'll iterate on making changes to the tests and the implementation
+                # itself until we can get these tests to pass, before we'll move on to executing the
+                # full solution on the overall problem input.
+                try:
+                    with workflow_span("make_unit_tests_pass"):
+                        unit_tests, implementation = await iteratively_make_unit_tests_pass(
+                            solve_aoc_problem_req=solve_aoc_problem_req,
+                            solutions_dir=solutions_dir,
+                            problem_part=problem_part,
+                            dry_run=dry_run,
+                            extracted_examples=extracted_examples,
+                            examples_context=examples_context,
+                            unit_tests=unit_tests,
+                            implementation=implementation,
+                            initial_unit_test_results=initial_unit_test_results,
+                        )
+                except ApplicationError as e:
+                    if i + 1 < _MAX_PROBLEM_PART_ATTEMPTS:
+                        workflow.logger.warning(f"{e.message}...Retrying...")
+                        continue
+                    raise e
 
-            # Now, actually run the generated unit tests to see if we're gonna be able to move
-            # forward. We'll iterate on making changes to the tests and the implementation itself
-            # until we can get these tests to pass, before we'll move on to executing the full
-            # solution on the overall problem input.
-            try:
-                unit_tests, implementation = await iteratively_make_unit_tests_pass(
+                match await _run_solution_optimizing_timeouts(
                     solve_aoc_problem_req=solve_aoc_problem_req,
                     solutions_dir=solutions_dir,
-                    problem_part=problem_part,
                     dry_run=dry_run,
-                    extracted_examples=extracted_examples,
-                    examples_context=examples_context,
-                    unit_tests=unit_tests,
                     implementation=implementation,
-                )
-            except ApplicationError as e:
-                if i + 1 < _MAX_PROBLEM_PART_ATTEMPTS:
-                    workflow.logger.warning(f"{e.message}...Retrying...")
-                    continue
-                raise e
-
-            try:
-                problem_solution_result = await workflow.execute_activity(
-                    run_generated_solution,
-                    solve_aoc_problem_req,
-                    start_to_close_timeout=timedelta(minutes=4),
-                    # Don't allow any retries for execution of the actual problem solution.
-                    retry_policy=RetryPolicy(maximum_attempts=1),
-                )
-            except TimeoutError:
-                # Timeouts here are ok, we just retry. We should've hooked this into the agent's
-                # debugging path so it can try to make it more efficient.
-                continue
-
-            match problem_solution_result.result:
-                case GeneratedSolutionRes.Failure:
-                    raise ApplicationError(
-                        "Problem solution threw an exception! Need to figure out how to correct it."
-                    )
-                case GeneratedSolutionRes.Success(output=output):
-                    # Check if the solution is actually valid.
-                    is_correct_solution = await workflow.execute_activity(
-                        submit_solution,
-                        SubmitSolutionArgs(
-                            aoc_problem=solve_aoc_problem_req,
-                            solution=output,
-                            base_dir=solutions_dir,
-                        ),
-                        start_to_close_timeout=timedelta(seconds=15),
-                        retry_policy=RetryPolicy(
-                            maximum_attempts=5,
-                            # Try being a good citizen and don't spam retries to AoC's servers.
-                            initial_interval=timedelta(minutes=1),
-                            maximum_interval=timedelta(minutes=1),
-                        ),
-                    )
-                    if is_correct_solution:
-                        # If the solution is correct, then we're done!
-                        break
-                    else:
-                        # Otherwise, potentially try again. But first hacky check to ensure that we
-                        # don't misconstrue this as a success just because we exceeded max retries.
-                        problem_solution_result = GeneratedSolutionRes(
-                            result=GeneratedSolutionRes.Failure(
-                                exit_code=-1, std_err="INCORRECT SOLUTION"
+                ):
+                    case (problem_solution_result, implementation):
+                        pass
+                    case None:
+                        # Still too slow even after optimizing it, so just start over from scratch.
+                        if i + 1 < _MAX_PROBLEM_PART_ATTEMPTS:
+                            continue
+                        # Otherwise there's no result to return at all. Failing outright, since
+                        # anything else (e.g. an exception escaping) would just fail the workflow
+                        # task and get retried forever.
+                        raise ApplicationError(
+                            f"Exhausted all {_MAX_PROBLEM_PART_ATTEMPTS} attempts without a "
+                            "solution that finishes in time.",
+                            non_retryable=True,
+                        )
+
+                match problem_solution_result.result:
+                    case GeneratedSolutionRes.Failure(exit_code=exit_code, std_err=std_err):
+                        # It crashed (or ran into its memory/CPU limit) on the full problem input
+                        # despite passing the unit tests, so start over from scratch, same as when
+                        # it's still too slow.
+                        if i + 1 < _MAX_PROBLEM_PART_ATTEMPTS:
+                            workflow.logger.warning(
+                                f"Solution failed on the problem input with exit code {exit_code}"
+                                "...Retrying..."
                             )
+                            continue
+                        raise ApplicationError(
+                            f"Exhausted all {_MAX_PROBLEM_PART_ATTEMPTS} attempts without a "
+                            f"solution that runs on the problem input. The last one failed with "
+                            f"exit code {exit_code}:\n{std_err}",
+                            non_retryable=True,
                         )
-                case _:
-                    raise ValueError("Unexpected result type!")
+                    case GeneratedSolutionRes.Success(output=output):
+                        # Check if the solution is actually valid.
+                        with workflow_span("submit_solution"):
+                            is_correct_solution = await workflow.execute_activity(
+                                submit_solution,
+                                SubmitSolutionArgs(
+                                    aoc_problem=solve_aoc_problem_req,
+                                    solution=output,
+                                    base_dir=solutions_dir,
+                                ),
+                                start_to_close_timeout=timedelta(seconds=15),
+                                retry_policy=RetryPolicy(
+                                    maximum_attempts=5,
+                                    # Try being a good citizen and don't spam retries to AoC's
+                                    # servers.
+                                    initial_interval=timedelta(minutes=1),
+                                    maximum_interval=timedelta(minutes=1),
+                                ),
+                            )
+                        if is_correct_solution:
+                            # If the solution is correct, then we're done!
+                            break
+                        else:
+                            # Otherwise, potentially try again. But first hacky check to ensure
+                            # that we don't misconstrue this as a success just because we
+                            # exceeded max retries.
+                            problem_solution_result = GeneratedSolutionRes(
+                                result=GeneratedSolutionRes.Failure(
+                                    exit_code=-1, std_err="INCORRECT SOLUTION"
+                                )
+                            )
+                    case _:
+                        raise ValueError("Unexpected result type!")
 
         return problem_solution_result, implementation
 
 
+async def _race_speculative_implementations(
+    unit_tests_task: asyncio.Task[GenerateUnitTestsOutput],
+    get_generated_implementation_args: GetGeneratedImplementationArgs,
+    num_speculative_implementations: int,
+    speculative_implementation_models: list[AnthropicModel | GeminiModel],
+) -> tuple[GenerateImplementationOutput, TestResults, int]:
+    """Generates independent candidate implementations concurrently, testing each one against the
+    unit tests in its own isolated workspace as soon as both are ready.
+
+    Returns the first candidate to pass the unit tests (cancelling all the others), along with its
+    test results and its 1-based candidate number. If no candidate passes, falls back to the first
+    one that finished so that the usual debugging loop can take it from there.
+    """
+
+    async def generate_and_test_candidate(
+        model: AnthropicModel | GeminiModel | None,
+    ) -> tuple[GenerateImplementationOutput, TestResults]:
+        implementation = await workflow.execute_activity(
+            get_generated_implementation,
+            get_generated_implementation_args.model_copy(update={"initial_attempt_model": model}),
+            start_to_close_timeout=timedelta(seconds=60),
+            retry_policy=RetryPolicy(maximum_attempts=5),
+        )
+        # Shielded since every candidate shares the one unit tests activity, which must not be
+        # cancelled along with the losing candidates.
+        unit_tests = await asyncio.shield(unit_tests_task)
+        test_results = await workflow.execute_activity(
+            run_candidate_implementation_tests,
+            RunCandidateImplementationTestsArgs(
+                unit_tests=unit_tests.generated_unit_tests,
+                implementation=implementation.generated_implementation,
+                tested_function_name=(
+                    get_generated_implementation_args.examples_context.tested_function_details.name
+                ),
+            ),
+            start_to_close_timeout=timedelta(minutes=4),
+            heartbeat_timeout=_GENERATED_CODE_HEARTBEAT_TIMEOUT,
+            retry_policy=RetryPolicy(maximum_attempts=2),
+        )
+        return implementation, test_results
+
+    candidates = [
+        asyncio.create_task(
+            generate_and_test_candidate(
+                speculative_implementation_models[i % len(speculative_implementation_models)]
+                if speculative_implementation_models
+                else None
+            )
+        )
+        for i in range(num_speculative_implementations)
+    ]
+    fallback: tuple[GenerateImplementationOutput, TestResults, int] | None = None
+    pending = candidates
+    try:
+        while pending:
+            done, pending = await workflow.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Check in candidate order so that ties are broken deterministically.
+            for candidate_num, candidate in enumerate(candidates, start=1):
+                if candidate not in done or candidate.exception() is not None:
+                    continue
+                implementation, test_results = candidate.result()
+                if isinstance(test_results.result, TestResults.Success):
+                    workflow.logger.info(
+                        f"Speculative candidate #{candidate_num} passed the unit tests first."
+                    )
+                    return implementation, test_results, candidate_num
+                if fallback is None:
+                    fallback = (implementation, test_results, candidate_num)
+    finally:
+        for candidate in pending:
+            candidate.cancel()
+
+    if fallback is None:
+        # Every single candidate failed outright, so just surface the first failure.
+        raise candidates[0].exception()  # type: ignore[misc]
+    return fallback
+
+
 async def iteratively_make_unit_tests_pass(
     solve_aoc_problem_req: AoCProblem,
     solutions_dir: str,
@@ -318,117 +527,113 @@ async def iteratively_make_unit_tests_pass(
     examples_context: ExamplesContext,
     unit_tests: GenerateUnitTestsOutput,
     implementation: GenerateImplementationOutput,
+    initial_unit_test_results: TestResults | None = None,
 ) -> tuple[GenerateUnitTestsOutput, GenerateImplementationOutput]:
-    # Run an initial test to see where we're at. Maybe we get lucky and it works first try.
-    unit_test_results = await _run_unit_tests(solve_aoc_problem_req)
+    # Run an initial test to see where we're at. Maybe we get lucky and it works first try. Skipped
+    # if the caller already ran these exact tests against this exact implementation.
+    unit_test_results = initial_unit_test_results or await _run_unit_tests(solve_aoc_problem_req)
 
     attempt = 0
     while True:
         attempt += 1
         match unit_test_results.result:
             case TestResults.Failure() as test_failure:
-                if attempt >= _MAX_UNIT_TEST_FIX_ITERATIONS:
-                    break  # Failed too many times, fallthrough to throwing exception.
+                with workflow_span("debug_iteration", debug_iteration=attempt):
+                    if attempt >= _MAX_UNIT_TEST_FIX_ITERATIONS:
+                        break  # Failed too many times, fallthrough to throwing exception.
 
-                theorized_solution = await workflow.execute_activity(
-                    debug_unit_test_failures,
-                    DebugUnitTestFailuresArgs(
-                        problem_html=problem_part.problem_html,
-                        examples_context=examples_context,
-                        unit_tests_src=unit_tests.generated_unit_tests,
-                        generated_impl_src=implementation.generated_implementation,
-                        error_msg=test_failure.err_msg,
-                    ),
-                    start_to_close_timeout=timedelta(seconds=120),
-                    retry_policy=RetryPolicy(maximum_attempts=3),
-                )
-                if theorized_solution.optional_theorized_implementation_fix:
-                    # Use the theorized solution to plan a refactoring.
-                    impl_refactoring_plan = await workflow.execute_activity(
-                        plan_impl_refactoring,
-                        PlanImplRefactoringArgs(
-                            examples=extracted_examples,
+                    theorized_solution = await workflow.execute_activity(
+                        debug_unit_test_failures,
+                        DebugUnitTestFailuresArgs(
+                            problem_html=problem_part.problem_html,
                             examples_context=examples_context,
+                            unit_tests_src=unit_tests.generated_unit_tests,
                             generated_impl_src=implementation.generated_implementation,
-                            theorized_solution=theorized_solution,
+                            error_msg=test_failure.err_msg,
                         ),
-                        start_to_close_timeout=timedelta(seconds=60),
+                        start_to_close_timeout=timedelta(seconds=120),
                         retry_policy=RetryPolicy(maximum_attempts=3),
                     )
-
-                async def fix_unit_tests() -> GenerateUnitTestsOutput:
-                    return await workflow.execute_activity(
-                        get_generated_unit_tests,
-                        GetGeneratedUnitTestsArgs(
-                            examples=extracted_examples,
-                            examples_context=examples_context,
-                            debugging_prompt=DebuggingPrompt(
-                                prior_msg_history=unit_tests.prompt_history,
-                                error_msg=test_failure.err_msg,
+                    if theorized_solution.optional_theorized_implementation_fix:
+                        # Use the theorized solution to plan a refactoring.
+                        impl_refactoring_plan = await workflow.execute_activity(
+                            plan_impl_refactoring,
+                            PlanImplRefactoringArgs(
+                                examples=extracted_examples,
+                                examples_context=examples_context,
+                                generated_impl_src=implementation.generated_implementation,
                                 theorized_solution=theorized_solution,
-                                impl_refactoring_plan=None,
                             ),
-                        ),
-                        start_to_close_timeout=timedelta(seconds=60),
-                        retry_policy=RetryPolicy(maximum_attempts=5),
-                    )
+                            start_to_close_timeout=timedelta(seconds=60),
+                            retry_policy=RetryPolicy(maximum_attempts=3),
+                        )
 
-                async def fix_implementation() -> GenerateImplementationOutput:
-                    return await workflow.execute_activity(
-                        get_generated_implementation,
-                        GetGeneratedImplementationArgs(
-                            extracted_problem_part=problem_part,
-                            examples_context=examples_context,
-                            solve_part_2=solve_aoc_problem_req.part == 2,
-                            debugging_prompt=DebuggingPrompt(
-                                prior_msg_history=implementation.prompt_history,
-                                error_msg=test_failure.err_msg,
-                                theorized_solution=theorized_solution,
-                                impl_refactoring_plan=impl_refactoring_plan,
+                    async def fix_unit_tests() -> GenerateUnitTestsOutput:
+                        return await workflow.execute_activity(
+                            get_generated_unit_tests,
+                            GetGeneratedUnitTestsArgs(
+                                examples=extracted_examples,
+                                examples_context=examples_context,
+                                debugging_prompt=DebuggingPrompt(
+                                    prior_msg_history=unit_tests.prompt_history,
+                                    error_msg=test_failure.err_msg,
+                                    theorized_solution=theorized_solution,
+                                    impl_refactoring_plan=None,
+                                ),
                             ),
-                        ),
-                        start_to_close_timeout=timedelta(seconds=120),
-                        retry_policy=RetryPolicy(maximum_attempts=5),
-                    )
-                    # TODO(steving) Reconsider if this may be helpful.
-                    # return GenerateImplementationOutput(
-                    #     # Let's just keep the context short for now and only include the original
-                    #     # prompt and the latest implementation.
-                    #     prompt_history=[res.prompt_history[0], res.prompt_history[-1]],
-                    #     generated_implementation=res.generated_implementation,
-                    # )
-
-                # Determine which source files the LLM wants to make changes to. Separate cases
-                # for now literally just to execute these in parallel if LLM decides it needs to
-                # update BOTH files at the same time.
-                if (
-                    theorized_solution.optional_theorized_unit_test_fix
-                    and theorized_solution.optional_theorized_implementation_fix
-                ):
-                    unit_tests, implementation = await asyncio.gather(
-                        fix_unit_tests(), fix_implementation()
-                    )
-                if theorized_solution.optional_theorized_unit_test_fix:
-                    unit_tests = await fix_unit_tests()
-                if theorized_solution.optional_theorized_implementation_fix:
-                    implementation = await fix_implementation()
+                            start_to_close_timeout=timedelta(seconds=60),
+                            retry_policy=RetryPolicy(maximum_attempts=5),
+                        )
 
-                await workflow.execute_activity(
-                    commit_changes,
-                    CommitChangesArgs(
-                        aoc_problem=solve_aoc_problem_req,
-                        files=[
-                            FileToCommit(
-                                filename="tests.py",
-                                content=unit_tests.generated_unit_tests.generated_unit_test_file_content,
-                            ),
-                            FileToCommit(
-                                filename="solution.py",
-                                content=implementation.generated_implementation.generated_implementation_file_content,
+                    async def fix_implementation() -> GenerateImplementationOutput:
+                        return await workflow.execute_activity(
+                            get_generated_implementation,
+                            GetGeneratedImplementationArgs(
+                                extracted_problem_part=problem_part,
+                                examples_context=examples_context,
+                                solve_part_2=solve_aoc_problem_req.part == 2,
+                                debugging_prompt=DebuggingPrompt(
+                                    prior_msg_history=implementation.prompt_history,
+                                    error_msg=test_failure.err_msg,
+                                    theorized_solution=theorized_solution,
+                                    impl_refactoring_plan=impl_refactoring_plan,
+                                ),
                             ),
-                        ],
-                        solutions_dir=solutions_dir,
-                        commit_message=f"""Unit Test Failure Fixes (#{attempt})
+                            start_to_close_timeout=timedelta(seconds=120),
+                            retry_policy=RetryPolicy(maximum_attempts=5),
+                        )
+
+                    # Determine which source files the LLM wants to make changes to. Separate cases
+                    # for now literally just to execute these in parallel if LLM decides it needs to
+                    # update BOTH files at the same time.
+                    if (
+                        theorized_solution.optional_theorized_unit_test_fix
+                        and theorized_solution.optional_theorized_implementation_fix
+                    ):
+                        unit_tests, implementation = await asyncio.gather(
+                            fix_unit_tests(), fix_implementation()
+                        )
+                    if theorized_solution.optional_theorized_unit_test_fix:
+                        unit_tests = await fix_unit_tests()
+                    if theorized_solution.optional_theorized_implementation_fix:
+                        implementation = await fix_implementation()
+
+                    await workflow.execute_activity(
+                        commit_changes,
+                        CommitChangesArgs(
+                            aoc_problem=solve_aoc_problem_req,
+                            files=[
+                                FileToCommit(
+                                    filename="tests.py",
+                                    content=unit_tests.generated_unit_tests.generated_unit_test_file_content,
+                                ),
+                                FileToCommit(
+                                    filename="solution.py",
+                                    content=implementation.generated_implementation.generated_implementation_file_content,
+                                ),
+                            ],
+                            solutions_dir=solutions_dir,
+                            commit_message=f"""Unit Test Failure Fixes (#{attempt})
 
 ### Addressing the following unit test failures:
 ```json
@@ -443,14 +648,15 @@ async def iteratively_make_unit_tests_pass(
 {impl_refactoring_plan.model_dump_json(indent=4)}
 """ if theorized_solution.optional_theorized_implementation_fix else ""}
 """,
-                        dry_run=dry_run,
-                    ),
-                    start_to_close_timeout=timedelta(seconds=60),
-                    retry_policy=RetryPolicy(maximum_attempts=5),
-                )
+                            dry_run=dry_run,
+                        ),
+                        start_to_close_timeout=timedelta(seconds=60),
+                        retry_policy=RetryPolicy(maximum_attempts=5),
+                    )
 
-                # Finally, rerun the tests against the latest changes.
-                unit_test_results = await _run_unit_tests(solve_aoc_problem_req)
+                    # Finally, rerun the tests against the latest changes. Quickly, since this only
+                    # needs to find the next failure to debug, if there is one.
+                    unit_test_results = await _run_unit_tests(solve_aoc_problem_req, quick=True)
             case _:
                 # The tests passed! Return the latest updated source code.
                 return unit_tests, implementation
@@ -460,17 +666,323 @@ async def iteratively_make_unit_tests_pass(
     )
 
 
-async def _run_unit_tests(solve_aoc_problem_req: AoCProblem) -> TestResults:
+async def _run_solution_optimizing_timeouts(
+    solve_aoc_problem_req: AoCProblem,
+    solutions_dir: str,
+    dry_run: bool,
+    implementation: GenerateImplementationOutput,
+) -> tuple[GeneratedSolutionRes, GenerateImplementationOutput] | None:
+    """Runs the solution on the actual problem input.
+
+    A solution that times out has already passed all of the unit tests, so rather than throwing it
+    away, it gets profiled and the LLM is asked to optimize its hot spots. The optimized version is
+    only run once it passes the very same unit tests. A solution that's still running after a few
+    seconds gets its runtime predicted from how it scales on smaller inputs, and if it's clearly
+    going to time out, it skips straight to optimizing it instead of waiting out the timeout.
+
+    Returns None if the solution is still too slow after `_MAX_SOLUTION_OPTIMIZATION_ITERATIONS`,
+    or if an optimization breaks the unit tests.
+    """
+    optimization_iteration = 0
+    while True:
+        watchdog_report: SolutionWatchdogReport | None = None
+        problem_solution_result, runtime_prediction = await _run_solution_unless_predicted_too_slow(
+            solve_aoc_problem_req
+        )
+        match problem_solution_result:
+            case GeneratedSolutionRes(
+                result=GeneratedSolutionRes.Failure(
+                    watchdog_report=SolutionWatchdogReport(timed_out=True) as watchdog_report
+                )
+            ):
+                workflow.logger.warning(
+                    f"Solution timed out, stuck at:\n{_fmt_hottest_stack(watchdog_report)}"
+                )
+            case GeneratedSolutionRes():
+                return problem_solution_result, implementation
+
+        optimization_iteration += 1
+        if optimization_iteration > _MAX_SOLUTION_OPTIMIZATION_ITERATIONS:
+            return None
+        with workflow_span("optimize_solution"):
+            solution_profile = await workflow.execute_activity(
+                profile_generated_solution,
+                solve_aoc_problem_req,
+                start_to_close_timeout=timedelta(minutes=2),
+                heartbeat_timeout=_GENERATED_CODE_HEARTBEAT_TIMEOUT,
+                retry_policy=RetryPolicy(maximum_attempts=2),
+            )
+            implementation = await workflow.execute_activity(
+                get_optimized_implementation,
+                GetOptimizedImplementationArgs(
+                    implementation=implementation,
+                    solution_profile=solution_profile,
+                    timeout_secs=int(_SOLUTION_TIMEOUT.total_seconds()),
+                    runtime_prediction=runtime_prediction,
+                    watchdog_report=watchdog_report,
+                ),
+                start_to_close_timeout=timedelta(seconds=120),
+                retry_policy=RetryPolicy(maximum_attempts=3),
+            )
+            await workflow.execute_activity(
+                commit_changes,
+                CommitChangesArgs(
+                    aoc_problem=solve_aoc_problem_req,
+                    files=[
+                        FileToCommit(
+                            filename="solution.py",
+                            content=implementation.generated_implementation.generated_implementation_file_content,
+                        ),
+                    ],
+                    solutions_dir=solutions_dir,
+                    commit_message=f"""Performance Optimization (#{optimization_iteration})
+
+### Optimizing the following profile of the solution timing out:
+```json
+{solution_profile.model_dump_json(indent=4)}
+```{f"""
+### Where the solution was stuck when it timed out:
+```json
+{watchdog_report.model_dump_json(indent=4)}
+```
+""" if watchdog_report else ""}
+""",
+                    dry_run=dry_run,
+                ),
+                start_to_close_timeout=timedelta(seconds=60),
+                retry_policy=RetryPolicy(maximum_attempts=5),
+            )
+
+            # Faster is worthless if it's no longer correct.
+            match (await _run_unit_tests(solve_aoc_problem_req)).result:
+                case TestResults.Failure():
+                    workflow.logger.warning(
+                        "Optimized solution no longer passes the unit tests...Giving up on it..."
+                    )
+                    return None
+
+
+async def _run_solution_unless_predicted_too_slow(
+    solve_aoc_problem_req: AoCProblem,
+) -> tuple[GeneratedSolutionRes | None, RuntimePrediction | None]:
+    """Runs the solution, predicting its runtime concurrently once it's been running for
+    `_RUNTIME_PREDICTION_DELAY`, and cancelling it as soon as it's predicted to time out.
+
+    The result is None if the solution hit the activity's timeout, or if it got cancelled for being
+    predicted to. Returned along with the runtime prediction, if it got that far.
+    """
+
+    async def run_solution() -> GeneratedSolutionRes:
+        with workflow_span("run_solution"):
+            return await workflow.execute_activity(
+                run_generated_solution,
+                solve_aoc_problem_req,
+                start_to_close_timeout=_SOLUTION_TIMEOUT,
+                heartbeat_timeout=_GENERATED_CODE_HEARTBEAT_TIMEOUT,
+                # Don't allow any retries for execution of the actual problem solution.
+                retry_policy=RetryPolicy(maximum_attempts=1),
+            )
+
+    run_task = asyncio.create_task(run_solution())
+    runtime_prediction: RuntimePrediction | None = None
+    done, _ = await workflow.wait([run_task], timeout=_RUNTIME_PREDICTION_DELAY.total_seconds())
+    if not done:
+        predict_task = asyncio.create_task(_predict_solution_runtime(solve_aoc_problem_req))
+        done, _ = await workflow.wait([run_task, predict_task], return_when=asyncio.FIRST_COMPLETED)
+        if predict_task not in done:
+            predict_task.cancel()
+        elif (runtime_prediction := predict_task.result()) is not None and (
+            runtime_prediction.predicted_secs is not None
+            and runtime_prediction.predicted_secs
+            > _SOLUTION_TIMEOUT.total_seconds() * _PREDICTED_TIMEOUT_SAFETY_FACTOR
+        ):
+            workflow.logger.warning(
+                f"Solution is predicted to take {runtime_prediction.predicted_secs:.0f}s on the "
+                "full input...Optimizing it without waiting for it to time out..."
+            )
+            run_task.cancel()
+            # Waited on (without raising the cancellation) so that the solution is already being
+            # killed before its optimization starts profiling it.
+            await workflow.wait([run_task])
+            return None, runtime_prediction
+
+    try:
+        return await run_task, runtime_prediction
+    except ActivityError as e:
+        if not _is_timeout(e):
+            raise e
+        return None, runtime_prediction
+
+
+async def _predict_solution_runtime(
+    solve_aoc_problem_req: AoCProblem,
+) -> RuntimePrediction | None:
+    with workflow_span("predict_solution_runtime"):
+        try:
+            return await workflow.execute_activity(
+                predict_generated_solution_runtime,
+                solve_aoc_problem_req,
+                start_to_close_timeout=timedelta(minutes=3),
+                heartbeat_timeout=_GENERATED_CODE_HEARTBEAT_TIMEOUT,
+                retry_policy=RetryPolicy(maximum_attempts=1),
+            )
+        except ActivityError as e:
+            # Just an optimization, so it's fine to go ahead and run the solution without it.
+            workflow.logger.warning(f"Failed to predict the solution's runtime: {e.cause}")
+            return None
+
+
+def _fmt_hottest_stack(watchdog_report: SolutionWatchdogReport) -> str:
+    if not watchdog_report.hot_stacks:
+        return "<no samples of the solution's own code>"
+    hottest_stack = watchdog_report.hot_stacks[0]
+    return f"{' -> '.join(hottest_stack.frames)}: `{hottest_stack.source}`"
+
+
+def _is_timeout(e: ActivityError) -> bool:
+    # Activity timeouts only ever surface wrapped in an ActivityError. The activity may also notice
+    # that the solution ran out of time before Temporal does, in which case it fails on its own.
+    return isinstance(e.cause, TimeoutError) or (
+        isinstance(e.cause, ApplicationError) and e.cause.type == "TimeoutError"
+    )
+
+
+async def _push_committed_changes() -> None:
+    await workflow.execute_activity(
+        push_committed_changes,
+        start_to_close_timeout=timedelta(minutes=1),
+        retry_policy=RetryPolicy(maximum_attempts=5, initial_interval=timedelta(seconds=10)),
+    )
+
+
+async def _run_unit_tests(solve_aoc_problem_req: AoCProblem, quick: bool = False) -> TestResults:
     return await workflow.execute_activity(
         run_generated_tests,
-        solve_aoc_problem_req,
+        RunGeneratedTestsArgs(aoc_problem=solve_aoc_problem_req, quick=quick),
         # The implementation times out pytest execution at 60 seconds so this should be longer just
         # so the timeouts can also be signaled to the agent.
         start_to_close_timeout=timedelta(minutes=4),
+        heartbeat_timeout=_GENERATED_CODE_HEARTBEAT_TIMEOUT,
         retry_policy=RetryPolicy(maximum_attempts=2),
     )
 
 
+class SolveAoCSeasonWorkflowArgs(BaseModel):
+    class Problem(BaseModel):
+        year: int
+        day: int
+
+    problems: list[Problem]
+    # Each problem's solutions get written to `<solutions_root_dir>/year*/day*/`.
+    solutions_root_dir: str
+    log_dir: str
+    dry_run: bool
+    # Max number of problems being solved at any given time.
+    max_in_flight: int = 3
+    # Shared by all problems being solved concurrently. Providers without a budget are unlimited.
+    llm_rate_budgets: list[LLMProviderRateBudget] = []
+    # Forwarded along to each individual problem's workflow.
+    cached_llm_subtask_names: list[str] = []
+    num_speculative_implementations: int = 1
+    speculative_implementation_models: list[AnthropicModel | GeminiModel] = []
+
+
+class SolveAoCSeasonWorkflowResult(BaseModel):
+    class ProblemReport(BaseModel):
+        year: int
+        day: int
+        part_1_solved: bool
+        part_2_solved: bool
+        # Only counts the time spent actually solving, not time spent waiting for a free slot.
+        duration_secs: float
+        # Only populated if the problem's workflow failed outright.
+        error: str | None = None
+        # Only populated if the problem's workflow completed.
+        result: SolveAoCProblemWorkflowResult | None = None
+
+    problem_reports: list[ProblemReport]
+    total_duration_secs: float
+
+
+# Runs a whole batch of problems (e.g. back-filling an entire season) as child workflows, mostly so
+# that the agent can be benchmarked across many problems with a single command.
+@workflow.defn
+class SolveAoCSeasonWorkflow:
+    @workflow.run
+    async def run(self, args: SolveAoCSeasonWorkflowArgs) -> SolveAoCSeasonWorkflowResult:
+        try:
+            return await self._run(args)
+        finally:
+            if args.llm_rate_budgets:
+                # Otherwise the budgets would go on throttling unrelated workflows on the worker.
+                await workflow.execute_activity(
+                    clear_llm_rate_limits_for_workflow,
+                    workflow.info().workflow_id,
+                    start_to_close_timeout=timedelta(seconds=15),
+                    retry_policy=RetryPolicy(maximum_attempts=3),
+                )
+
+    async def _run(self, args: SolveAoCSeasonWorkflowArgs) -> SolveAoCSeasonWorkflowResult:
+        start_time = workflow.now()
+        in_flight = asyncio.Semaphore(args.max_in_flight)
+
+        async def solve_problem(
+            problem: SolveAoCSeasonWorkflowArgs.Problem,
+        ) -> SolveAoCSeasonWorkflowResult.ProblemReport:
+            speculative_implementation_models = args.speculative_implementation_models
+            async with in_flight:
+                problem_start_time = workflow.now()
+                try:
+                    result = await workflow.execute_child_workflow(
+                        SolveAoCProblemWorkflow.run,
+                        SolveAoCProblemWorkflowArgs(
+                            year=problem.year,
+                            day=problem.day,
+                            solutions_dir=path_join(
+                                args.solutions_root_dir, f"year{problem.year}", f"day{problem.day}"
+                            ),
+                            log_dir=args.log_dir,
+                            dry_run=args.dry_run,
+                            cached_llm_subtask_names=args.cached_llm_subtask_names,
+                            num_speculative_implementations=args.num_speculative_implementations,
+                            speculative_implementation_models=speculative_implementation_models,
+                            # The budgets are shared by all of the season's problems.
+                            llm_rate_limit_scope=workflow.info().workflow_id,
+                            llm_rate_budgets=args.llm_rate_budgets,
+                        ),
+                        id=f"{workflow.info().workflow_id}-{problem.year}-{problem.day}",
+                    )
+                except ChildWorkflowError as e:
+                    # One problem failing shouldn't take down the rest of the batch.
+                    workflow.logger.warning(f"Failed solving {problem}: {e.cause}")
+                    return SolveAoCSeasonWorkflowResult.ProblemReport(
+                        year=problem.year,
+                        day=problem.day,
+                        part_1_solved=False,
+                        part_2_solved=False,
+                        duration_secs=(workflow.now() - problem_start_time).total_seconds(),
+                        error=str(e.cause),
+                    )
+
+            return SolveAoCSeasonWorkflowResult.ProblemReport(
+                year=problem.year,
+                day=problem.day,
+                part_1_solved=isinstance(
+                    result.part_1_solution.result, GeneratedSolutionRes.Success
+                ),
+                part_2_solved=result.part_2_solution is not None
+                and isinstance(result.part_2_solution.result, GeneratedSolutionRes.Success),
+                duration_secs=(workflow.now() - problem_start_time).total_seconds(),
+                result=result,
+            )
+
+        problem_reports = await asyncio.gather(*(solve_problem(p) for p in args.problems))
+        return SolveAoCSeasonWorkflowResult(
+            problem_reports=list(problem_reports),
+            total_duration_secs=(workflow.now() - start_time).total_seconds(),
+        )
+
+
 class GenerateCelebratoryImageWorkflowArgs(BaseModel):
     problem_req: AoCProblem
     problem_part: ExtractedProblemPart
@@ -544,3 +1056,5 @@ class GenerateCelebratoryImageWorkflow:
             start_to_close_timeout=timedelta(seconds=60),
             retry_policy=RetryPolicy(maximum_attempts=5),
         )
+        if not args.dry_run:
+            await _push_committed_changes()
@@ -0,0 +1,5 @@
+import os
+
+# `agent.settings` insists on these at import time, but no test ever talks to the real services.
+for _secret in ("AOC_COOKIE", "ANTHROPIC_API_KEY", "GEMINI_API_KEY", "OPENAI_API_KEY"):
+    os.environ.setdefault(_secret, "test")
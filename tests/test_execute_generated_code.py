@@ -0,0 +1,55 @@
+import asyncio
+import uuid
+
+from agent.adventofcode import execute_generated_code
+from agent.adventofcode.execution_cache import get_execution_cache_metrics
+from agent.adventofcode.execution_workspace import ephemeral_workspace
+from agent.adventofcode.unit_test_outcomes import get_previously_failing_tests
+
+
+def test_cached_test_results_follow_the_code_into_a_new_workspace() -> None:
+    # Unique, so that the first run can't already be cached by some other test.
+    solution_src = f"""# {uuid.uuid4()}
+def double(x: int) -> int:
+    raise ValueError("not implemented yet")
+
+
+def solution() -> int:
+    return double(int(input()))
+"""
+    tests_src = """from solution import double
+
+
+def test_passes() -> None:
+    assert True
+
+
+def test_fails() -> None:
+    assert double(2) == 4
+"""
+
+    async def run_in_new_workspace() -> tuple[str, str, execute_generated_code.TestResults]:
+        with ephemeral_workspace(solution_src=solution_src, tests_src=tests_src) as workspace:
+            test_results = await execute_generated_code.execute_tests(workspace)
+            return workspace.root_dir, workspace.tests_file, test_results
+
+    async def run_twice() -> list[tuple[str, str, execute_generated_code.TestResults]]:
+        return [await run_in_new_workspace(), await run_in_new_workspace()]
+
+    hits_before = get_execution_cache_metrics().hits
+    [(first_dir, _, first_results), (second_dir, second_tests_file, second_results)] = asyncio.run(
+        run_twice()
+    )
+
+    assert get_execution_cache_metrics().hits == hits_before + 1
+    assert isinstance(first_results.result, execute_generated_code.TestResults.Failure)
+    assert isinstance(second_results.result, execute_generated_code.TestResults.Failure)
+    assert first_dir in first_results.result.err_msg
+    # Served from the cache, but pointing at the workspace that the code actually ran in this time.
+    assert first_dir not in second_results.result.err_msg
+    assert second_dir in second_results.result.err_msg
+    assert second_results.result.err_msg == first_results.result.err_msg.replace(
+        first_dir, second_dir
+    )
+    # The cache hit still leaves the failing tests behind for the next quick run to start with.
+    assert get_previously_failing_tests(second_tests_file, tests_src) == ["test_fails"]
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from typing import Any, AsyncGenerator
+
+import pytest
+
+from agent.llm.gemini import prompt as gemini_prompt
+
+
+class _AbandonedResponse:
+    def __init__(self, iterator: Any) -> None:
+        self._iterator = iterator
+
+    async def __aiter__(self) -> AsyncGenerator[str, None]:
+        async for chunk in self._iterator:
+            yield chunk
+
+
+async def _grpc_stream(closed: list[str]) -> AsyncGenerator[str, None]:
+    try:
+        while True:
+            yield "chunk"
+    finally:
+        closed.append("stream")
+
+
+def test_closing_an_abandoned_stream_closes_the_stream_underneath_it() -> None:
+    closed: list[str] = []
+
+    async def abandon() -> None:
+        res = _AbandonedResponse(_grpc_stream(closed))
+        chunks = aiter(res)
+        await anext(chunks)
+        await gemini_prompt._close_stream(res, chunks)
+
+    asyncio.run(abandon())
+
+    assert closed == ["stream"]
+
+
+def test_closing_a_stream_that_cannot_be_found_is_logged(caplog: pytest.LogCaptureFixture) -> None:
+    async def abandon() -> None:
+        res = _AbandonedResponse(_grpc_stream([]))
+        chunks = aiter(res)
+        await anext(chunks)
+        del res._iterator
+        await gemini_prompt._close_stream(res, chunks)
+
+    with caplog.at_level(logging.WARNING, logger=gemini_prompt.__name__):
+        asyncio.run(abandon())
+
+    assert "Unable to close the stream underneath an abandoned _AbandonedResponse" in caplog.text
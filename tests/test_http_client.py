@@ -0,0 +1,163 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Iterator
+
+import pytest
+from aiohttp import web
+
+from agent import http_client, settings
+from agent.adventofcode.scrape_problems import fetch_input, fetch_problem
+from agent.adventofcode.submit_solution import submit
+from agent.llm.openai.generate_image import download_image
+
+
+class _StandInAoCServer:
+    """Serves just enough of adventofcode.com for the client's call sites, while recording which
+    connection each request arrived on, when, and how many were in flight at once."""
+
+    def __init__(self, response_delay_secs: float = 0) -> None:
+        self.response_delay_secs = response_delay_secs
+        self.client_ports: list[int] = []
+        self.request_times: list[float] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        self.app = web.Application()
+        self.app.router.add_get("/{year}/day/{day}", self._handle)
+        self.app.router.add_get("/{year}/day/{day}/input", self._handle)
+        self.app.router.add_post("/{year}/day/{day}/answer", self._handle)
+        self.app.router.add_get("/image.png", self._handle)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.client_ports.append(request.transport.get_extra_info("peername")[1])
+        self.request_times.append(time.monotonic())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.response_delay_secs)
+        finally:
+            self.in_flight -= 1
+        match request.path.rsplit("/", 1)[-1]:
+            case "answer":
+                return web.Response(text="That's the right answer!")
+            case "image.png":
+                return web.Response(body=b"\x89PNG" * 1024)
+            case "input":
+                return web.Response(text="1\n2\n3\n")
+            case _:
+                return web.Response(text="<main><article class='day-desc'></article></main>")
+
+
+@pytest.fixture(autouse=True)
+def restore_http_client_config() -> Iterator[None]:
+    yield
+    http_client.configure_http_client(http_client.HTTPClientConfig())
+
+
+async def _run_against(
+    server: _StandInAoCServer,
+    monkeypatch: pytest.MonkeyPatch,
+    test: Callable[[str], Awaitable[None]],
+) -> None:
+    runner = web.AppRunner(server.app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    (_, port) = runner.addresses[0]
+    base_url = f"http://127.0.0.1:{port}"
+    monkeypatch.setattr(settings, "AOC_BASE_URL", base_url)
+    try:
+        await test(base_url)
+    finally:
+        await http_client.close_http_session()
+        await runner.cleanup()
+
+
+def test_one_connection_is_reused_across_scraping_submitting_and_downloading(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    http_client.configure_http_client(http_client.HTTPClientConfig(min_secs_between_aoc_requests=0))
+    server = _StandInAoCServer()
+
+    async def test(base_url: str) -> None:
+        session = http_client.get_http_session()
+        await fetch_problem(session, year=2024, day=1, solutions_dir=None)
+        await fetch_input(session, year=2024, day=1, solutions_dir=str(tmp_path))
+        assert await submit(session, year=2024, day=1, part=1, answer="6", base_dir=str(tmp_path))
+        await download_image(session, f"{base_url}/image.png", os.path.join(tmp_path, "img.png"))
+        assert http_client.get_http_session() is session
+
+    asyncio.run(_run_against(server, monkeypatch, test))
+
+    assert len(server.client_ports) == 4
+    assert len(set(server.client_ports)) == 1
+
+
+def test_aoc_requests_are_spaced_out_by_the_rate_limit(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    min_secs_between_requests = 0.2
+    http_client.configure_http_client(
+        http_client.HTTPClientConfig(min_secs_between_aoc_requests=min_secs_between_requests)
+    )
+    server = _StandInAoCServer()
+
+    async def test(base_url: str) -> None:
+        session = http_client.get_http_session()
+        await asyncio.gather(
+            *(fetch_problem(session, year=2024, day=day, solutions_dir=None) for day in range(4))
+        )
+
+    asyncio.run(_run_against(server, monkeypatch, test))
+
+    assert len(server.request_times) == 4
+    gaps = [
+        later - earlier for earlier, later in zip(server.request_times, server.request_times[1:])
+    ]
+    # A little slack for the gap measured on the server's side of the connection.
+    assert min(gaps) >= min_secs_between_requests * 0.9
+
+
+def test_aoc_requests_never_exceed_the_concurrency_cap(monkeypatch: pytest.MonkeyPatch) -> None:
+    http_client.configure_http_client(
+        http_client.HTTPClientConfig(max_concurrent_aoc_requests=2, min_secs_between_aoc_requests=0)
+    )
+    server = _StandInAoCServer(response_delay_secs=0.1)
+
+    async def test(base_url: str) -> None:
+        session = http_client.get_http_session()
+        await asyncio.gather(
+            *(fetch_problem(session, year=2024, day=day, solutions_dir=None) for day in range(6))
+        )
+
+    asyncio.run(_run_against(server, monkeypatch, test))
+
+    assert len(server.request_times) == 6
+    assert server.max_in_flight == 2
+
+
+def test_close_shuts_the_session_down_and_the_next_request_gets_a_new_one(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    http_client.configure_http_client(http_client.HTTPClientConfig(min_secs_between_aoc_requests=0))
+    server = _StandInAoCServer()
+
+    async def test(base_url: str) -> None:
+        session = http_client.get_http_session()
+        await fetch_problem(session, year=2024, day=1, solutions_dir=None)
+
+        await http_client.close_http_session()
+        assert session.closed
+        # Safe to call again, e.g. from more than one shutdown hook.
+        await http_client.close_http_session()
+
+        new_session = http_client.get_http_session()
+        assert new_session is not session
+        await fetch_problem(new_session, year=2024, day=2, solutions_dir=None)
+
+    asyncio.run(_run_against(server, monkeypatch, test))
+
+    # The closed session's pooled connection went away with it.
+    assert len(set(server.client_ports)) == 2
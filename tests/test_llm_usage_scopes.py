@@ -0,0 +1,55 @@
+import atexit
+from collections import defaultdict
+from pathlib import Path
+
+import pytest
+
+from agent.llm.gemini.models import GEMINI_PROVIDER_NAME
+from agent.llm.usage import LLMRateLimiter, LLMResponseCache, LLMUsage
+
+
+def test_clearing_a_scope_forgets_its_configs_but_not_its_usage_summary(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(LLMUsage, "_CLEARED_EXECUTION_IDS_BY_LOG_FILE", defaultdict(list))
+    finished, running = "finished-workflow-id", "running-workflow-id"
+    for scope in (finished, running):
+        LLMUsage.configure_llm_usage_logging(scope, log_dir=tmp_path, scope=scope)
+        LLMResponseCache.configure_llm_response_cache(
+            tmp_path, cached_subtask_names=["extract-examples"], scope=scope
+        )
+        LLMRateLimiter.configure_llm_rate_limits(
+            {GEMINI_PROVIDER_NAME: 60}, scope="season-workflow-id", logging_scope=scope
+        )
+    finished_logs_config = LLMUsage._SCOPED_CONFIGS[finished].persisted_logs_config
+    assert finished_logs_config is not None
+
+    LLMUsage.clear_llm_usage_logging(finished)
+    LLMResponseCache.clear_llm_response_cache_config(finished)
+    LLMRateLimiter.leave_llm_rate_limits(finished)
+
+    assert finished not in LLMUsage._SCOPED_CONFIGS
+    assert finished not in LLMResponseCache._SCOPED_CONFIGS
+    assert finished not in LLMRateLimiter._RATE_LIMIT_SCOPE_BY_LOGGING_SCOPE
+    # Anything still running within the cleared scope just falls back to the process-wide defaults.
+    assert LLMResponseCache.get_llm_response_cache_config(finished) is LLMResponseCache._CONFIG
+    # The rest of the season run is unaffected.
+    assert running in LLMUsage._SCOPED_CONFIGS
+    assert LLMResponseCache.get_llm_response_cache_config(running) is not None
+    assert "season-workflow-id" in LLMRateLimiter._RATE_LIMITERS
+    assert LLMRateLimiter._RATE_LIMIT_SCOPE_BY_LOGGING_SCOPE[running] == "season-workflow-id"
+    # The finished workflow's LLM usage still gets summarized at exit.
+    assert LLMUsage._CLEARED_EXECUTION_IDS_BY_LOG_FILE == {
+        finished_logs_config.log_file: [finished_logs_config.execution_id]
+    }
+
+    # Clearing is idempotent, e.g. for activity retries.
+    LLMUsage.clear_llm_usage_logging(finished)
+    LLMResponseCache.clear_llm_response_cache_config(finished)
+    LLMRateLimiter.leave_llm_rate_limits(finished)
+
+    for scope in (finished, running):
+        LLMUsage.clear_llm_usage_logging(scope)
+        LLMResponseCache.clear_llm_response_cache_config(scope)
+    LLMRateLimiter.clear_llm_rate_limits("season-workflow-id")
+    atexit.unregister(LLMUsage._show_usage_summary)
@@ -0,0 +1,147 @@
+import json
+
+import pytest
+from pydantic import BaseModel
+from result import Err, Ok
+
+from agent.llm.streaming.partial_json_validator import PartialJSONValidator
+
+
+class _Step(BaseModel):
+    description: str
+    done: bool
+
+
+class _Plan(BaseModel):
+    summary: str
+    steps: list[_Step]
+    confidence: float | None = None
+
+
+_PLAN = _Plan(
+    summary='Parse the "grid", then walk it\\n',
+    steps=[_Step(description="parse 🗺️", done=True), _Step(description="walk", done=False)],
+    confidence=0.75,
+)
+
+
+def _feed(response_type: type[BaseModel], *chunks: str) -> Ok[None] | Err[str]:
+    validator = PartialJSONValidator(response_type)
+    result: Ok[None] | Err[str] = Ok(None)
+    for chunk in chunks:
+        result = validator.feed(chunk)
+    return result
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1_000])
+def test_a_complete_valid_response_passes_however_it_is_chunked(chunk_size: int) -> None:
+    response = json.dumps(_PLAN.model_dump(), indent=2)
+
+    assert _feed(
+        _Plan, *(response[i : i + chunk_size] for i in range(0, len(response), chunk_size))
+    ) == Ok(None)
+
+
+def test_every_truncated_prefix_of_a_valid_response_passes() -> None:
+    response = _PLAN.model_dump_json()
+
+    for prefix_len in range(len(response) + 1):
+        assert _feed(_Plan, response[:prefix_len]) == Ok(None), response[:prefix_len]
+
+
+@pytest.mark.parametrize(
+    "escaped_string",
+    [
+        r'"quotes \" inside"',
+        r'"a backslash \\"',
+        r'"a closing brace \" } and bracket ]"',
+        r'"unicode é and 😀"',
+        r'"every escape \/ \b \f \n \r \t"',
+    ],
+)
+def test_escaped_strings_do_not_end_the_string_early(escaped_string: str) -> None:
+    response = f'{{"summary": {escaped_string}, "steps": []}}'
+
+    assert _feed(_Plan, response) == Ok(None)
+    # Nothing in the string may leak out and get mistaken for the end of the object.
+    assert isinstance(_feed(_Plan, response, "}"), Err)
+
+
+@pytest.mark.parametrize(
+    ("response", "bad_char", "expected_err"),
+    [
+        (r'{"summary": "\x"', "x", "invalid escape"),
+        (r'{"summary": "\u12g4"', "g", "invalid unicode escape"),
+    ],
+)
+def test_invalid_escapes_are_rejected(response: str, bad_char: str, expected_err: str) -> None:
+    assert _feed(_Plan, response) == Err(
+        f"Invalid JSON response at char {response.index(bad_char)} ({bad_char!r}): {expected_err}"
+    )
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        "Sure! Here's the plan you asked for:",
+        "```json\n{",
+        "I'm sorry, but I can't help with that.",
+    ],
+)
+def test_prose_instead_of_json_is_rejected_at_the_first_char(response: str) -> None:
+    match _feed(_Plan, response):
+        case Err(err_msg):
+            assert err_msg.startswith(f"Invalid JSON response at char 0 ({response[0]!r}): ")
+        case Ok():
+            raise AssertionError(f"Expected {response!r} to be rejected.")
+
+
+@pytest.mark.parametrize(
+    ("response", "expected_err"),
+    [
+        ('["summary"]', "expected object at $, got array"),
+        ('"summary"', "expected object at $, got string"),
+        ('{"summary": ["a"]', "expected string at $.summary, got array"),
+        ('{"steps": {"description"', "expected array at $.steps, got object"),
+        ('{"steps": [{"description": "a", "done": "yes"', "expected boolean at $.steps[0].done"),
+        ('{"steps": [{"done": true}, 5', "expected object at $.steps[1], got number"),
+        ('{"confidence": "high"', "expected null or number at $.confidence, got string"),
+    ],
+)
+def test_the_wrong_type_anywhere_is_rejected(response: str, expected_err: str) -> None:
+    match _feed(_Plan, response):
+        case Err(err_msg):
+            assert expected_err in err_msg
+        case Ok():
+            raise AssertionError(f"Expected {response!r} to be rejected.")
+
+
+def test_integers_are_accepted_where_numbers_are_expected() -> None:
+    assert _feed(_Plan, '{"confidence": 1, "summary": "x"}') == Ok(None)
+
+
+def test_unknown_keys_are_not_checked() -> None:
+    assert _feed(_Plan, '{"notes": [{"anything": [1, "goes"]}], "summary": "x"') == Ok(None)
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        '{"summary": "x", "steps": []} and that is the plan',
+        '{"summary": "x"} {',
+        '{"summary": "x",,',
+        '{"summary" "x"',
+        '{"confidence": 1.2.3,',
+        '{"steps": [{"done": truthy',
+    ],
+)
+def test_malformed_json_is_rejected(response: str) -> None:
+    assert isinstance(_feed(_Plan, response), Err)
+
+
+def test_once_rejected_it_stays_rejected() -> None:
+    validator = PartialJSONValidator(_Plan)
+
+    err = validator.feed("Here you go: ")
+    assert isinstance(err, Err)
+    assert validator.feed('{"summary": "x"}') == err
@@ -0,0 +1,152 @@
+import pytest
+from result import Err, Ok
+
+from agent.adventofcode.precheck_generated_code import precheck_generated_code
+
+_SOLUTION_SRC = """import sys
+from collections import Counter
+
+MODULUS = 1_000_000_007
+
+if sys.version_info >= (3, 11):
+    def parse(line: str) -> list[int]:
+        return [int(x) for x in line.split()]
+else:
+    from typing import List
+
+
+def double(x: int) -> int:
+    return 2 * x
+
+
+def solution(verbose: bool = False) -> int:
+    return sum(double(x) for x in parse(input())) % MODULUS + len(Counter())
+"""
+
+_TESTS_SRC = """import pytest
+from solution import MODULUS, double, parse
+
+
+@pytest.mark.parametrize("x", [1, 2])
+def test_double(x: int) -> None:
+    assert double(x) == 2 * x
+
+
+def test_parse() -> None:
+    assert parse("1 2") == [1, 2]
+    assert MODULUS > 0
+"""
+
+
+def _problems(
+    solution_src: str, tests_src: str | None = None, tested_function_name: str | None = None
+) -> str:
+    match precheck_generated_code(solution_src, tests_src, tested_function_name):
+        case Err(problems):
+            return problems
+        case Ok():
+            raise AssertionError("Expected the precheck to reject the generated code.")
+
+
+@pytest.mark.parametrize(
+    ("solution_src", "tests_src", "tested_function_name"),
+    [
+        (_SOLUTION_SRC, _TESTS_SRC, "double"),
+        (_SOLUTION_SRC, None, None),
+        # Names pulled in by a star import can't be known statically, so they're given the benefit
+        # of the doubt.
+        (
+            "from math import *\n\ndef solution():\n    return floor(1.5)\n",
+            "from solution import floor\n",
+            None,
+        ),
+    ],
+)
+def test_valid_solution_and_tests_pass(
+    solution_src: str, tests_src: str | None, tested_function_name: str | None
+) -> None:
+    assert precheck_generated_code(solution_src, tests_src, tested_function_name) == Ok(None)
+
+
+def test_rejects_syntax_errors_in_either_file() -> None:
+    problems = _problems("def solution(:\n    pass\n", "def test_x(\n")
+
+    assert "solution.py has a syntax error at line 1" in problems
+    assert "tests.py has a syntax error at line 1" in problems
+
+
+def test_rejects_a_missing_solution_function() -> None:
+    assert "missing the top-level `solution()` function" in _problems(
+        "def solve() -> int:\n    return 1\n"
+    )
+
+
+def test_rejects_a_nested_solution_function() -> None:
+    problems = _problems("class Solver:\n    def solution(self) -> int:\n        return 1\n")
+
+    assert "missing the top-level `solution()` function" in problems
+
+
+@pytest.mark.parametrize(
+    ("signature", "required_args"),
+    [("lines, verbose=False", "lines"), ("*, lines", "lines"), ("a, /, b", "a, b")],
+)
+def test_rejects_a_solution_function_that_requires_args(signature: str, required_args: str) -> None:
+    problems = _problems(f"def solution({signature}):\n    pass\n")
+
+    assert "The `solution()` function must take no args" in problems
+    assert problems.endswith(f"but it requires: {required_args}.")
+
+
+def test_rejects_a_missing_tested_function() -> None:
+    problems = _problems("def solution():\n    pass\n", tested_function_name="double")
+
+    assert "solution.py is missing the tested function `double()`." in problems
+
+
+def test_rejects_tests_importing_names_the_solution_does_not_define() -> None:
+    problems = _problems(_SOLUTION_SRC, "from solution import double, triple\n")
+
+    assert (
+        "tests.py imports `triple` from solution.py, but solution.py doesn't define it." in problems
+    )
+    assert "`double`" not in problems
+
+
+@pytest.mark.parametrize("import_stmt", ["import numpy as np", "from numpy.linalg import inv"])
+def test_rejects_third_party_imports_in_the_solution(import_stmt: str) -> None:
+    problems = _problems(f"{import_stmt}\n\ndef solution():\n    pass\n")
+
+    assert "solution.py imports `numpy" in problems
+    assert "at line 1, but ONLY Python's stdlib may be used." in problems
+
+
+def test_rejects_third_party_imports_in_the_tests_but_allows_pytest() -> None:
+    problems = _problems(_SOLUTION_SRC, "import pytest\nimport hypothesis\n")
+
+    assert "tests.py imports `hypothesis` at line 2" in problems
+    assert "`pytest`" not in problems
+
+
+def test_rejects_importing_the_solution_from_within_the_solution() -> None:
+    assert "solution.py imports `solution`" in _problems(
+        "import solution\n\ndef solution():\n    pass\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "call", ["open('input.txt')", "io.open('input.txt')", "os.open('input.txt', 0)"]
+)
+def test_rejects_a_solution_that_opens_files(call: str) -> None:
+    problems = _problems(f"import io\nimport os\n\ndef solution():\n    return {call}\n")
+
+    assert f"solution.py calls `{call.split('(')[0]}()` at line 5" in problems
+
+
+def test_reports_every_problem_at_once() -> None:
+    problems = _problems("import requests\n\ndef solve(lines):\n    return open('input.txt')\n")
+
+    assert problems.startswith(
+        "Static checks of the generated code failed (before running any tests):\n"
+    )
+    assert len(problems.splitlines()) == 4
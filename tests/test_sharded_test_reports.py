@@ -0,0 +1,187 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from agent.adventofcode import execute_generated_code
+from agent.adventofcode.resource_limits import ResourceLimits
+
+_TESTS_FILE = "/workspace/test_solution.py"
+
+
+def _test(name: str, outcome: str, lineno: int = 1) -> dict[str, Any]:
+    return {
+        "nodeid": f"test_solution.py::{name}",
+        "lineno": lineno,
+        "outcome": outcome,
+        "call": {"longrepr": f"AssertionError: {name} went wrong"},
+    }
+
+
+def _shard_report(exitcode: int, *tests: dict[str, Any], **summary: int) -> dict[str, Any]:
+    return {
+        "exitcode": exitcode,
+        "summary": {"total": len(tests), "collected": len(tests), **summary},
+        "collectors": [],
+        "tests": list(tests),
+    }
+
+
+def _collection_failure(exitcode: int = 2) -> dict[str, Any]:
+    return {
+        "exitcode": exitcode,
+        "summary": {"total": 0, "collected": 0},
+        "collectors": [
+            {"nodeid": "test_solution.py", "outcome": "failed", "longrepr": "ImportError: nope"}
+        ],
+        "tests": [],
+    }
+
+
+def test_merged_report_sums_counts_and_keeps_tests_in_file_order() -> None:
+    merged = execute_generated_code._merge_test_reports(
+        [
+            _shard_report(
+                1, _test("test_a", "passed"), _test("test_c", "failed"), passed=1, failed=1
+            ),
+            _shard_report(
+                1, _test("test_b", "failed"), _test("test_d", "passed"), passed=1, failed=1
+            ),
+            _shard_report(0, _test("test_e", "passed"), passed=1),
+        ],
+        test_names=["test_a", "test_b", "test_c", "test_d", "test_e"],
+    )
+
+    assert merged["exitcode"] == 1
+    assert merged["summary"] == {"total": 5, "collected": 5, "passed": 3, "failed": 2}
+    assert [t["nodeid"].split("::")[-1] for t in merged["tests"]] == [
+        "test_a",
+        "test_b",
+        "test_c",
+        "test_d",
+        "test_e",
+    ]
+
+
+def test_merged_failures_are_reported_together() -> None:
+    merged = execute_generated_code._merge_test_reports(
+        [
+            _shard_report(1, _test("test_a", "failed", lineno=4), failed=1),
+            _shard_report(1, _test("test_b", "failed", lineno=8), failed=1),
+            _shard_report(0, _test("test_c", "passed"), passed=1),
+        ],
+        test_names=["test_a", "test_b", "test_c"],
+    )
+
+    test_results = execute_generated_code._parse_test_report(merged)
+
+    assert isinstance(test_results.result, execute_generated_code.TestResults.Failure)
+    err_msg = test_results.result.err_msg
+    assert "Unit Test Results: 2 of 3 Failed" in err_msg
+    assert "### test_a at line 4" in err_msg
+    assert "### test_b at line 8" in err_msg
+    assert err_msg.index("test_a went wrong") < err_msg.index("test_b went wrong")
+    assert "test_c went wrong" not in err_msg
+
+
+@pytest.mark.parametrize("ok_exitcode", [0, 5])
+def test_shards_that_all_pass_merge_into_a_pass(ok_exitcode: int) -> None:
+    merged = execute_generated_code._merge_test_reports(
+        [_shard_report(0, _test("test_a", "passed"), passed=1), _shard_report(ok_exitcode)],
+        test_names=["test_a"],
+    )
+
+    assert merged["exitcode"] == 0
+    assert isinstance(
+        execute_generated_code._parse_test_report(merged).result,
+        execute_generated_code.TestResults.Success,
+    )
+
+
+def test_collection_failure_takes_precedence_over_test_failures() -> None:
+    collection_failure = _collection_failure()
+    merged = execute_generated_code._merge_test_reports(
+        [_shard_report(1, _test("test_a", "failed"), failed=1), collection_failure],
+        test_names=["test_a", "test_b"],
+    )
+
+    assert merged is collection_failure
+    test_results = execute_generated_code._parse_test_report(merged)
+    assert isinstance(test_results.result, execute_generated_code.TestResults.Failure)
+    assert test_results.result.err_msg == "ImportError: nope"
+
+
+def test_usage_error_takes_precedence_over_test_failures() -> None:
+    usage_error = _shard_report(4)
+    merged = execute_generated_code._merge_test_reports(
+        [_shard_report(1, _test("test_a", "failed"), failed=1), usage_error],
+        test_names=["test_a", "test_b"],
+    )
+
+    assert merged is usage_error
+    with pytest.raises(ValueError, match="unexpected Pytest exit code: 4"):
+        execute_generated_code._parse_test_report(merged)
+
+
+def test_sharded_report_merges_every_shard_from_the_pool(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    requested_shards: list[list[str]] = []
+
+    async def get_test_report(
+        test_file: str,
+        resource_limits: ResourceLimits,
+        timeout: float,
+        test_names: list[str] | None = None,
+        exit_first: bool = False,
+    ) -> dict[str, Any] | None:
+        assert test_file == _TESTS_FILE and test_names is not None
+        requested_shards.append(test_names)
+        return _shard_report(
+            1 if "test_b" in test_names else 0,
+            *(_test(name, "failed" if name == "test_b" else "passed") for name in test_names),
+            passed=len([name for name in test_names if name != "test_b"]),
+            failed=int("test_b" in test_names),
+        )
+
+    monkeypatch.setattr(execute_generated_code, "_MAX_TEST_SHARDS", 2)
+    monkeypatch.setattr(
+        execute_generated_code._TEST_RUNNER_POOL, "get_test_report", get_test_report
+    )
+
+    merged = asyncio.run(
+        execute_generated_code._get_sharded_test_report(
+            _TESTS_FILE, ResourceLimits(), test_names=["test_a", "test_b", "test_c"]
+        )
+    )
+
+    assert sorted(requested_shards) == [["test_a", "test_c"], ["test_b"]]
+    assert merged is not None
+    assert merged["exitcode"] == 1
+    assert merged["summary"] == {"total": 3, "collected": 3, "passed": 2, "failed": 1}
+    assert [t["nodeid"].split("::")[-1] for t in merged["tests"]] == ["test_a", "test_b", "test_c"]
+
+
+def test_sharded_report_is_none_if_any_shard_crashed(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def get_test_report(
+        test_file: str,
+        resource_limits: ResourceLimits,
+        timeout: float,
+        test_names: list[str] | None = None,
+        exit_first: bool = False,
+    ) -> dict[str, Any] | None:
+        return None if test_names == ["test_b"] else _shard_report(0, passed=1)
+
+    monkeypatch.setattr(execute_generated_code, "_MAX_TEST_SHARDS", 2)
+    monkeypatch.setattr(
+        execute_generated_code._TEST_RUNNER_POOL, "get_test_report", get_test_report
+    )
+
+    assert (
+        asyncio.run(
+            execute_generated_code._get_sharded_test_report(
+                _TESTS_FILE, ResourceLimits(), test_names=["test_a", "test_b"]
+            )
+        )
+        is None
+    )
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import signal
+import sys
+from typing import Awaitable, Callable
+
+from agent.adventofcode.execution_workspace import ephemeral_workspace
+from agent.adventofcode.resource_limits import ResourceLimits
+from agent.adventofcode import warm_test_runner_pool
+
+# Candidates for the same problem all import their implementation as the same `solution` module,
+# along with whatever helper modules they happen to write alongside it.
+_CANDIDATE_SOLUTION_SRC = """from helpers import ANSWER
+
+
+def answer() -> int:
+    return ANSWER
+"""
+_CANDIDATE_TESTS_SRC = """from solution import answer
+
+
+def test_answer() -> None:
+    assert answer() == {answer}
+"""
+
+
+def _run_with_pool(test: Callable[[warm_test_runner_pool.TestRunnerPool], Awaitable[None]]) -> None:
+    pool = warm_test_runner_pool.TestRunnerPool(
+        worker_cmd=[
+            sys.executable,
+            "-m",
+            "agent.adventofcode.execute_generated_code",
+            "test-runner-worker",
+        ],
+        # A single worker, so that every run in a test lands on the same one (until it dies).
+        max_workers=1,
+        max_runs_per_worker=20,
+    )
+
+    async def run() -> None:
+        await pool.warm()
+        try:
+            await test(pool)
+        finally:
+            pool.shutdown()
+
+    asyncio.run(run())
+
+
+def test_candidates_with_the_same_module_names_do_not_see_each_others_code() -> None:
+    async def test(pool: warm_test_runner_pool.TestRunnerPool) -> None:
+        [warm_worker] = pool._idle_workers
+        for answer in (1, 2):
+            with ephemeral_workspace(
+                solution_src=_CANDIDATE_SOLUTION_SRC,
+                tests_src=_CANDIDATE_TESTS_SRC.format(answer=answer),
+            ) as workspace:
+                with open(os.path.join(workspace.root_dir, "helpers.py"), "w") as f:
+                    f.write(f"ANSWER = {answer}\n")
+                report = await pool.get_test_report(
+                    workspace.tests_file, resource_limits=ResourceLimits(), timeout=60
+                )
+
+            assert report is not None
+            assert report["exitcode"] == 0, report["tests"]
+        # Both ran in the very same warm process.
+        assert pool._idle_workers == [warm_worker]
+        assert warm_worker.runs == 2
+
+    _run_with_pool(test)
+
+
+def test_a_worker_killed_mid_run_is_replaced() -> None:
+    async def test(pool: warm_test_runner_pool.TestRunnerPool) -> None:
+        [killed_worker] = pool._idle_workers
+        with ephemeral_workspace(solution_src="") as workspace:
+            started_file = os.path.join(workspace.root_dir, "started")
+            with open(workspace.tests_file, "w") as f:
+                f.write(
+                    f"""import time
+
+
+def test_hangs() -> None:
+    open({started_file!r}, "w").close()
+    time.sleep(60)
+"""
+                )
+            run = asyncio.create_task(
+                pool.get_test_report(
+                    workspace.tests_file, resource_limits=ResourceLimits(), timeout=60
+                )
+            )
+            while not os.path.exists(started_file):
+                await asyncio.sleep(0.01)
+            os.killpg(killed_worker.proc.pid, signal.SIGKILL)
+
+            assert await run is None
+
+        assert await killed_worker.proc.wait() == -signal.SIGKILL
+        [replacement_worker] = pool._idle_workers
+        assert replacement_worker is not killed_worker
+        assert replacement_worker.is_alive()
+
+        # And the replacement picks up where the killed worker left off.
+        with ephemeral_workspace(
+            solution_src=_CANDIDATE_SOLUTION_SRC,
+            tests_src=_CANDIDATE_TESTS_SRC.format(answer=3),
+        ) as workspace:
+            with open(os.path.join(workspace.root_dir, "helpers.py"), "w") as f:
+                f.write("ANSWER = 3\n")
+            report = await pool.get_test_report(
+                workspace.tests_file, resource_limits=ResourceLimits(), timeout=60
+            )
+        assert report is not None
+        assert report["exitcode"] == 0, report["tests"]
+        assert pool._idle_workers == [replacement_worker]
+
+    _run_with_pool(test)